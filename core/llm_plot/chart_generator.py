@@ -142,7 +142,10 @@ class ChartGenerator:
             ValueError: 生成图表失败时抛出
         """
         try:
-            logger.debug(f"发送图表配置到 AntV: {json.dumps(config, ensure_ascii=False)}")
+            # 图表数据可能较大，仅在开启调试日志时才序列化用于输出
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+            if debug_enabled:
+                logger.debug(f"发送图表配置到 AntV: {json.dumps(config, ensure_ascii=False)}")
             
             response = requests.post(
                 ChartConfig.ANTV_API_URL,
@@ -157,7 +160,8 @@ class ChartGenerator:
             response.raise_for_status()
             response_data = response.json()
             
-            logger.debug(f"AntV 响应: {json.dumps(response_data, ensure_ascii=False)}")
+            if debug_enabled:
+                logger.debug(f"AntV 响应: {json.dumps(response_data, ensure_ascii=False)}")
             
             # 检查响应状态
             if 'success' in response_data and not response_data['success']:
@@ -1,11 +1,15 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from sqlalchemy import (
     MetaData,
-    Table,
+    column,
+    inspect,
     select,
+    table,
 )
 
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, Inspector
 from core.m_schema.sql_database import SQLDatabase
 from utils import examples_to_str, normalize_dameng_schema_name
 from core.m_schema.m_schema import MSchema
@@ -26,6 +30,7 @@ class SchemaEngine(SQLDatabase):
         max_string_length: int = 300,
         mschema: Optional[MSchema] = None,
         db_name: Optional[str] = "",
+        max_workers: int = 1,
     ):
         # Some dialects (notably Dameng) represent the "database name" as a schema/owner.
         # SQLDatabase must receive the effective schema up-front so inspector/metadata reflect
@@ -49,6 +54,9 @@ class SchemaEngine(SQLDatabase):
         )
 
         self._db_name = db_name
+        # 并行生成 M-Schema 时，每个工作线程持有独立的 Inspector
+        self._max_workers = max(1, max_workers)
+        self._thread_local = threading.local()
         # Dictionary to store table names and their corresponding schema
         self._tables_schemas: Dict[
             str, str
@@ -103,14 +111,23 @@ class SchemaEngine(SQLDatabase):
         """Return M-Schema"""
         return self._mschema
 
+    def _table_inspector(self) -> Inspector:
+        """返回当前线程使用的 Inspector"""
+        inspector = getattr(self._thread_local, "inspector", None)
+        return inspector if inspector is not None else self._inspector
+
+    def _init_worker_inspector(self):
+        """为工作线程创建独立的 Inspector"""
+        self._thread_local.inspector = inspect(self._engine)
+
     def get_pk_constraint(self, table_name: str) -> Dict:
-        return self._inspector.get_pk_constraint(
+        return self._table_inspector().get_pk_constraint(
             table_name, self._tables_schemas[table_name]
         )["constrained_columns"]
 
     def get_table_comment(self, table_name: str):
         try:
-            return self._inspector.get_table_comment(
+            return self._table_inspector().get_table_comment(
                 table_name, self._tables_schemas[table_name]
             )["text"]
         except Exception:  # sqlite does not support comments
@@ -123,26 +140,25 @@ class SchemaEngine(SQLDatabase):
         return self._inspector.get_schema_names()
 
     def get_foreign_keys(self, table_name: str):
-        return self._inspector.get_foreign_keys(
+        return self._table_inspector().get_foreign_keys(
             table_name, self._tables_schemas[table_name]
         )
 
     def get_unique_constraints(self, table_name: str):
-        return self._inspector.get_unique_constraints(
+        return self._table_inspector().get_unique_constraints(
             table_name, self._tables_schemas[table_name]
         )
 
     def fectch_distinct_values(
         self, table_name: str, column_name: str, max_num: int = 5
     ):
-        table = Table(
-            table_name,
-            self.metadata_obj,
-            autoload_with=self._engine,
-            schema=self._tables_schemas[table_name],
-        )
+        # 表名和列名已由 Inspector 取得，直接构造查询，不再反射表结构，
+        # 也不修改共享的 MetaData，并行工作线程之间无需加锁
+        source = table(table_name, schema=self._tables_schemas[table_name])
         # Construct SELECT DISTINCT query
-        query = select(table.c[column_name]).distinct().limit(max_num)
+        query = (
+            select(column(column_name)).select_from(source).distinct().limit(max_num)
+        )
         values = []
         with self._engine.connect() as connection:
             result = connection.execute(query)
@@ -159,66 +175,101 @@ class SchemaEngine(SQLDatabase):
         # print(f"Debug: Usable tables = {self._usable_tables}")
         # print(f"Debug: Tables schemas mapping = {self._tables_schemas}")
 
-        for table_name in self._usable_tables:
-            table_comment = self.get_table_comment(table_name)
-            table_comment = (
-                "" if table_comment is None else table_comment.strip()
-            )  # For different database types, handle schema naming
-            schema_name = self._tables_schemas[table_name]
-            dialect_name = self._engine.dialect.name
+        # 逐表的元数据查询和示例值采样是主要耗时，可按表并行；
+        # 结果按原表顺序写入 MSchema，保证输出稳定
+        workers = min(self._max_workers, len(self._usable_tables))
+        if workers > 1:
+            with ThreadPoolExecutor(
+                max_workers=workers, initializer=self._init_worker_inspector
+            ) as executor:
+                descriptions = list(
+                    executor.map(self._describe_table, self._usable_tables)
+                )
+        else:
+            descriptions = [
+                self._describe_table(table_name) for table_name in self._usable_tables
+            ]
 
-            if dialect_name in ["mysql", "doris"] and schema_name == self._db_name:
-                # MySQL 和 Doris 使用数据库名作为 schema，不需要前缀
-                table_with_schema = table_name
-            elif dialect_name == "postgresql" and schema_name == "public":
-                table_with_schema = table_name
-            elif dialect_name in ["mssql", "oracle", "dm", "dameng"]:
-                # For SQL Server, Oracle, and Dameng, include schema if not default
-                if schema_name and schema_name.lower() not in ["dbo", "public", "main"]:
-                    table_with_schema = schema_name + "." + table_name
-                else:
-                    table_with_schema = table_name
-            else:
-                table_with_schema = schema_name + "." + table_name
-            self._mschema.add_table(table_with_schema, fields={}, comment=table_comment)
-            pks = self.get_pk_constraint(table_name)
-
-            fks = self.get_foreign_keys(table_name)
-            for fk in fks:
-                referred_schema = fk["referred_schema"]
-                for c, r in zip(fk["constrained_columns"], fk["referred_columns"]):
-                    self._mschema.add_foreign_key(
-                        table_with_schema, c, referred_schema, fk["referred_table"], r
-                    )
-
-            fields = self._inspector.get_columns(
-                table_name, schema=self._tables_schemas[table_name]
+        for description in descriptions:
+            table_with_schema = description["name"]
+            self._mschema.add_table(
+                table_with_schema, fields={}, comment=description["comment"]
             )
-            for field in fields:
-                field_type = f"{field['type']!s}"
-                field_name = field["name"]
-                primary_key = field_name in pks
-                field_comment = field.get("comment", None)
-                field_comment = "" if field_comment is None else field_comment.strip()
-                autoincrement = field.get("autoincrement", False)
-                default = field.get("default", None)
-                if default is not None:
-                    default = f"{default}"
-
-                try:
-                    examples = self.fectch_distinct_values(table_name, field_name, 5)
-                except Exception:
-                    examples = []
-                examples = examples_to_str(examples)
-
-                self._mschema.add_field(
-                    table_with_schema,
-                    field_name,
-                    field_type=field_type,
-                    primary_key=primary_key,
-                    nullable=field["nullable"],
-                    default=default,
-                    autoincrement=autoincrement,
-                    comment=field_comment,
-                    examples=examples,
+            for c, referred_schema, referred_table, r in description["foreign_keys"]:
+                self._mschema.add_foreign_key(
+                    table_with_schema, c, referred_schema, referred_table, r
                 )
+            for field in description["fields"]:
+                self._mschema.add_field(table_with_schema, **field)
+
+    def _describe_table(self, table_name: str) -> Dict:
+        """查询单个表的注释、外键和字段信息"""
+        table_comment = self.get_table_comment(table_name)
+        table_comment = (
+            "" if table_comment is None else table_comment.strip()
+        )  # For different database types, handle schema naming
+        schema_name = self._tables_schemas[table_name]
+        dialect_name = self._engine.dialect.name
+
+        if dialect_name in ["mysql", "doris"] and schema_name == self._db_name:
+            # MySQL 和 Doris 使用数据库名作为 schema，不需要前缀
+            table_with_schema = table_name
+        elif dialect_name == "postgresql" and schema_name == "public":
+            table_with_schema = table_name
+        elif dialect_name in ["mssql", "oracle", "dm", "dameng"]:
+            # For SQL Server, Oracle, and Dameng, include schema if not default
+            if schema_name and schema_name.lower() not in ["dbo", "public", "main"]:
+                table_with_schema = schema_name + "." + table_name
+            else:
+                table_with_schema = table_name
+        else:
+            table_with_schema = schema_name + "." + table_name
+        pks = self.get_pk_constraint(table_name)
+
+        foreign_keys = []
+        fks = self.get_foreign_keys(table_name)
+        for fk in fks:
+            referred_schema = fk["referred_schema"]
+            for c, r in zip(fk["constrained_columns"], fk["referred_columns"]):
+                foreign_keys.append((c, referred_schema, fk["referred_table"], r))
+
+        field_infos = []
+        fields = self._table_inspector().get_columns(
+            table_name, schema=self._tables_schemas[table_name]
+        )
+        for field in fields:
+            field_type = f"{field['type']!s}"
+            field_name = field["name"]
+            primary_key = field_name in pks
+            field_comment = field.get("comment", None)
+            field_comment = "" if field_comment is None else field_comment.strip()
+            autoincrement = field.get("autoincrement", False)
+            default = field.get("default", None)
+            if default is not None:
+                default = f"{default}"
+
+            try:
+                examples = self.fectch_distinct_values(table_name, field_name, 5)
+            except Exception:
+                examples = []
+            examples = examples_to_str(examples)
+
+            field_infos.append(
+                {
+                    "field_name": field_name,
+                    "field_type": field_type,
+                    "primary_key": primary_key,
+                    "nullable": field["nullable"],
+                    "default": default,
+                    "autoincrement": autoincrement,
+                    "comment": field_comment,
+                    "examples": examples,
+                }
+            )
+
+        return {
+            "name": table_with_schema,
+            "comment": table_comment,
+            "foreign_keys": foreign_keys,
+            "fields": field_infos,
+        }
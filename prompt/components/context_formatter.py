@@ -4,9 +4,25 @@
 负责将对话历史格式化为提示词片段
 """
 
+import re
 from typing import List, Dict, Any, Optional
 
 
+# 上下文引用关键词：中文关键词不受大小写影响，直接做子串匹配；
+# 英文关键词按单词匹配，避免 "with" 之类的单词误命中 "it"
+_CJK_REFERENCE_KEYWORDS = (
+    '它', '这', '那', '上面', '上述', '刚才', '之前', '前面',
+    '这个', '那个', '这些', '那些', '同样', '也', '还',
+)
+_ASCII_REFERENCE_KEYWORDS = frozenset(
+    ('it', 'this', 'that', 'above', 'previous', 'same', 'also')
+)
+_ASCII_WORD_PATTERN = re.compile(r"[a-z]+")
+
+# 单轮对话历史模板，预先绑定 format 方法
+_HISTORY_ITEM_TEMPLATE = "问题 {0}: {1}\nSQL {0}: {2}".format
+
+
 class ContextFormatter:
     """上下文格式化组件，负责将上下文历史格式化为合适的提示词片段"""
     
@@ -27,24 +43,35 @@ class ContextFormatter:
         """
         if not conversation_history:
             return ""
-            
+
+        # 无长度限制是最常见的路径，直接拼接，省去逐条截断判断
+        if not max_length:
+            return "\n\n".join(
+                _HISTORY_ITEM_TEMPLATE(i, conv.get('query', ''), conv.get('sql', ''))
+                for i, conv in enumerate(conversation_history, 1)
+            )
+
+        return ContextFormatter._format_truncated_history(conversation_history, max_length)
+
+    @staticmethod
+    def _format_truncated_history(
+        conversation_history: List[Dict[str, Any]],
+        max_length: int
+    ) -> str:
+        """格式化对话历史，并截断超过最大长度的问题和SQL"""
         history_items = []
         for i, conv in enumerate(conversation_history, 1):
             query = conv.get('query', '')
             sql = conv.get('sql', '')
-            
-            # 如果有最大长度限制，截断过长的内容
-            if max_length:
-                if len(query) > max_length:
-                    query = query[:max_length] + "..."
-                if len(sql) > max_length:
-                    sql = sql[:max_length] + "..."
-            
-            history_items.append(f"问题 {i}: {query}\nSQL {i}: {sql}")
-        
-        history_content = "\n\n".join(history_items)
-        
-        return history_content
+
+            if len(query) > max_length:
+                query = query[:max_length] + "..."
+            if len(sql) > max_length:
+                sql = sql[:max_length] + "..."
+
+            history_items.append(_HISTORY_ITEM_TEMPLATE(i, query, sql))
+
+        return "\n\n".join(history_items)
     
     @staticmethod
     def format_for_llm(conversation_history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
@@ -91,16 +118,10 @@ class ContextFormatter:
         if not conversation_history:
             return False
         
-        # 检查查询中是否包含引用词
-        reference_keywords = [
-            '它', '这', '那', '上面', '上述', '刚才', '之前', '前面',
-            '这个', '那个', '这些', '那些', '同样', '也', '还',
-            'it', 'this', 'that', 'above', 'previous', 'same', 'also'
-        ]
-        
-        query_lower = current_query.lower()
-        for keyword in reference_keywords:
-            if keyword in query_lower:
-                return True
-        
-        return False
+        # 先检查中文引用词，命中时无需构建小写副本
+        if any(keyword in current_query for keyword in _CJK_REFERENCE_KEYWORDS):
+            return True
+
+        # 仅在需要时转小写一次，按单词做集合查找
+        words = _ASCII_WORD_PATTERN.findall(current_query.lower())
+        return not _ASCII_REFERENCE_KEYWORDS.isdisjoint(words)
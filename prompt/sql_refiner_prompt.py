@@ -2,22 +2,23 @@
 SQL Refiner Prompt - 用于SQL自动纠错的提示词模板
 """
 
-def _build_refiner_system_prompt(dialect: str) -> str:
-    """
-    构建 SQL Refiner 的 system prompt
-    
-    Args:
-        dialect: 数据库方言 (mysql, postgresql, mssql, oracle, dameng)
-    
-    Returns:
-        System prompt 字符串
-    """
-    system_prompt = f"""You are an expert {dialect} SQL debugger and error correction specialist. Your task is to analyze failed SQL queries, identify the root cause of errors, and generate corrected SQL that will execute successfully.
+import functools
+import io
+import sys
+
+
+# 提示词中反复出现的标记片段，模块加载时驻留一次
+_HDR_SCHEMA = sys.intern("【Database Schema】\n")
+_FENCE_SQL_OPEN = sys.intern("```sql\n")
+_FENCE_CLOSE = sys.intern("\n```\n")
+
+# Refiner system prompt 模板，除方言外内容固定，模块加载时构建一次
+_REFINER_SYSTEM_TEMPLATE = """You are an expert %(dialect)s SQL debugger and error correction specialist. Your task is to analyze failed SQL queries, identify the root cause of errors, and generate corrected SQL that will execute successfully.
 
 【Your Capabilities】
 1. **Error Analysis**: Deeply understand database error messages and tracebacks
 2. **Schema Mapping**: Map hallucinated or incorrect column/table names to actual schema entities
-3. **Dialect Expertise**: Correct syntax issues specific to {dialect}
+3. **Dialect Expertise**: Correct syntax issues specific to %(dialect)s
 4. **Logic Correction**: Fix logical errors in JOINs, aggregations, and conditions
 5. **Type Handling**: Resolve data type mismatches and conversion issues
 
@@ -25,13 +26,13 @@ def _build_refiner_system_prompt(dialect: str) -> str:
 1. **Schema Adherence**: Only use tables and columns that exist in the provided schema
 2. **Error Focus**: Address the specific error mentioned in the error message
 3. **Minimal Changes**: Make only necessary changes to fix the error
-4. **Syntax Correctness**: Ensure the corrected SQL is syntactically valid for {dialect}
+4. **Syntax Correctness**: Ensure the corrected SQL is syntactically valid for %(dialect)s
 5. **Learning from History**: Avoid repeating errors from previous iterations
 
 【Common Error Patterns】
 - "Unknown column 'X' in 'field list'" → Check schema for correct column name or similar alternatives
 - "Table 'Y' doesn't exist" → Verify table name spelling and case sensitivity
-- "Syntax error near 'Z'" → Review {dialect} syntax rules for that construct
+- "Syntax error near 'Z'" → Review %(dialect)s syntax rules for that construct
 - "Data type mismatch" → Add appropriate type casting (CAST/CONVERT)
 - "Ambiguous column name" → Add proper table aliases
 - "Invalid use of GROUP BY" → Ensure all non-aggregated columns are in GROUP BY
@@ -49,9 +50,23 @@ GROUP BY t1.customer_id, t1.customer_name
 ORDER BY order_count DESC;
 ```
 
-Remember: Your goal is to generate executable SQL that will run without errors on the {dialect} database."""
+Remember: Your goal is to generate executable SQL that will run without errors on the %(dialect)s database."""
+
+
+@functools.lru_cache(maxsize=8)
+def _build_refiner_system_prompt(dialect: str) -> str:
+    """
+    构建 SQL Refiner 的 system prompt
 
-    return system_prompt
+    结果只取决于方言，按方言缓存，修复循环的每轮迭代直接复用
+    
+    Args:
+        dialect: 数据库方言 (mysql, postgresql, mssql, oracle, dameng)
+    
+    Returns:
+        System prompt 字符串
+    """
+    return _REFINER_SYSTEM_TEMPLATE % {"dialect": dialect}
 
 
 def _build_refiner_user_prompt(
@@ -79,51 +94,50 @@ def _build_refiner_user_prompt(
         User prompt 字符串
     """
     
+    # 提示词可能包含大段 Schema，使用单一缓冲区顺序写入，避免中间字符串拷贝
+    buf = io.StringIO()
+    write = buf.write
+    write(
+        "A SQL query has failed to execute. "
+        "Please analyze the error and generate a corrected version.\n\n"
+    )
+    write("【Original Question】\n")
+    write(question)
+    write("\n\n")
+    write(_HDR_SCHEMA)
+    write(schema_info)
+    write("\n\n【Failed SQL Query】\n")
+    write(_FENCE_SQL_OPEN)
+    write(failed_sql)
+    write(_FENCE_CLOSE)
+    write("\n【Error Message】\n```\n")
+    write(error_message)
+    write(_FENCE_CLOSE)
+    write("\n【Database Dialect】\n")
+    write(dialect)
+    write(f"\n\n【Current Iteration】\n{iteration} / 3\n")
+
     # 构建历史错误部分
-    history_section = ""
-    if error_history and len(error_history) > 0:
-        history_section = "\n【Previous Error History】\n"
+    if error_history:
+        write("\n【Previous Error History】\n")
         for idx, err in enumerate(error_history, 1):
-            history_section += f"\nAttempt {idx}:\n"
-            history_section += f"SQL: {err.get('sql', 'N/A')}\n"
-            history_section += f"Error: {err.get('error', 'N/A')}\n"
-        history_section += "\nIMPORTANT: Do not repeat the same mistakes from previous attempts!\n"
-    
-    user_prompt = f"""A SQL query has failed to execute. Please analyze the error and generate a corrected version.
-
-【Original Question】
-{question}
-
-【Database Schema】
-{schema_info}
-
-【Failed SQL Query】
-```sql
-{failed_sql}
-```
-
-【Error Message】
-```
-{error_message}
-```
-
-【Database Dialect】
-{dialect}
-
-【Current Iteration】
-{iteration} / 3
-{history_section}
-
-【Task】
-1. Analyze the error message carefully to identify the root cause
-2. Check the schema to find correct table and column names
-3. Generate a corrected SQL query that addresses the error
-4. Ensure the corrected SQL uses only entities from the provided schema
-5. Make sure the SQL is syntactically correct for {dialect}
-
-Generate ONLY the corrected SQL query without any additional explanation."""
-
-    return user_prompt
+            write(f"\nAttempt {idx}:\n")
+            write(f"SQL: {err.get('sql', 'N/A')}\n")
+            write(f"Error: {err.get('error', 'N/A')}\n")
+        write("\nIMPORTANT: Do not repeat the same mistakes from previous attempts!\n")
+
+    write(
+        "\n\n【Task】\n"
+        "1. Analyze the error message carefully to identify the root cause\n"
+        "2. Check the schema to find correct table and column names\n"
+        "3. Generate a corrected SQL query that addresses the error\n"
+        "4. Ensure the corrected SQL uses only entities from the provided schema\n"
+        "5. Make sure the SQL is syntactically correct for "
+    )
+    write(dialect)
+    write("\n\nGenerate ONLY the corrected SQL query without any additional explanation.")
+
+    return buf.getvalue()
 
 
 def _build_validation_error_message(
@@ -1,3 +1,13 @@
+import io
+import sys
+
+
+# 提示词中反复出现的标记片段，模块加载时驻留一次
+_HDR_SCHEMA = sys.intern("【Database Schema】\n")
+_HDR_EXAMPLES = sys.intern("\n【Examples】\n")
+_HDR_CONVERSATION_HISTORY = sys.intern("\n【Conversation History】\n")
+
+
 def _build_system_prompt(dialect: str, custom_prompt: str = None) -> str:
     """
     构建预定义的system prompt
@@ -12,8 +22,11 @@ def _build_system_prompt(dialect: str, custom_prompt: str = None) -> str:
     # 如果提供了自定义提示，则使用自定义规则替换默认的Critical Requirements
     if custom_prompt and custom_prompt.strip():
         critical_requirements_section = custom_prompt.strip()
-        
-        system_prompt = f"""You are an expert {dialect} database analyst with deep expertise in query optimization and data analysis. Your task is to convert natural language questions into accurate, executable SQL queries.
+
+        # 自定义规则长度不可控，使用单一缓冲区顺序写入，避免中间字符串拷贝
+        buf = io.StringIO()
+        buf.write(f"You are an expert {dialect} database analyst")
+        buf.write(""" with deep expertise in query optimization and data analysis. Your task is to convert natural language questions into accurate, executable SQL queries.
 
 
 【Task Instructions】
@@ -21,7 +34,9 @@ Analyze the user's question carefully and generate a precise SQL query that answ
 If the question references previous questions or results, use the conversation history to maintain context.
 
 【Critical Requirements】
-{critical_requirements_section}
+""")
+        buf.write(critical_requirements_section)
+        buf.write("""
 
 【Output Format】
 - If the question CAN be answered: Provide ONLY the SQL query wrapped in ```sql and ``` blocks
@@ -33,7 +48,8 @@ If the question references previous questions or results, use the conversation h
 - Verify that aggregation functions are used correctly
 - Confirm that data types in WHERE conditions are compatible
 
-Remember: Generate clean, executable SQL that directly answers the user's question using the exact schema provided."""
+Remember: Generate clean, executable SQL that directly answers the user's question using the exact schema provided.""")
+        system_prompt = buf.getvalue()
     
     else:
         # 使用默认的详细规则
@@ -103,19 +119,14 @@ def _build_user_prompt(db_schema: str, question: str, example_info: str = None,
 
     example_section = ""
     if example_info and example_info.strip():
-        example_section = f"""
-【Examples】
-{example_info.strip()}"""
+        example_section = _HDR_EXAMPLES + example_info.strip()
 
     conversation_history_section = ""
     if conversation_section:
-        conversation_history_section = f"""
-【Conversation History】
-{conversation_section}"""
+        conversation_history_section = _HDR_CONVERSATION_HISTORY + conversation_section
 
     user_prompt = f"""Based on the information below, generate an accurate SQL query to answer the user's question:{question}
-【Database Schema】
-{db_schema}{example_section}{conversation_history_section}
+{_HDR_SCHEMA}{db_schema}{example_section}{conversation_history_section}
 current date: {datetime.now().strftime("%Y-%m-%d")}
 Note: Generate only the SQL query that best fits the question without any additional explanations or text.
 """
@@ -1,41 +1,68 @@
-import os
+from types import MappingProxyType
 from typing import Any
-import sys
 import logging
-from venv import logger
-
-
-sys.path.append(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-)  # 添加上级目录到路径中
 
 from dify_plugin import ToolProvider
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
-from tools.text2sql import Text2SQLTool
-from tools.sql_executer import SQLExecuterTool
-from config import DatabaseConfig, LoggerConfig, DifyUploadConfig
-from service.schema_builder import SchemaRAGBuilder
 from dify_plugin.config.logger_format import plugin_logger_handler
 
 
+# 各数据库类型的默认端口
+_DEFAULT_PORTS = MappingProxyType(
+    {
+        "mysql": 3306,
+        "postgresql": 5432,
+        "mssql": 1433,
+        "oracle": 1521,
+        "dameng": 5236,
+        "doris": 9030,
+    }
+)
+
+# M-Schema 中每个表以该标题开头
+_TABLE_HEADER = "# Table: "
+
+
 class SchemaRAGBuilderProvider(ToolProvider):
     """
     Schema RAG Builder Provider
     """
 
-    def _get_default_port(self, db_type: str) -> int:
+    # 必填凭据：(凭据键, 错误提示名称)
+    REQUIRED_CREDENTIALS = (
+        ("api_uri", "API URI"),
+        ("dataset_api_key", "Dataset API key"),
+        ("db_type", "Database type"),
+    )
+    SQLITE_REQUIRED_CREDENTIALS = (
+        ("db_name", "Database name (file path)"),
+    )
+    DATABASE_REQUIRED_CREDENTIALS = (
+        ("db_host", "Database host"),
+        ("db_user", "Database user"),
+        ("db_password", "Database password"),
+        ("db_name", "Database name"),
+    )
+
+    @staticmethod
+    def _count_tables(schema_content: str) -> int:
+        """
+        统计 M-Schema 中的表数量
+
+        只匹配行首的表标题，不计入字段注释、外键标题等其他 "#"
+        """
+        if not schema_content:
+            return 0
+        return schema_content.count("\n" + _TABLE_HEADER) + (
+            1 if schema_content.startswith(_TABLE_HEADER) else 0
+        )
+
+    @staticmethod
+    def _get_default_port(db_type: str) -> int:
         """
         根据数据库类型获取默认端口
         """
-        port_mapping = {
-            "mysql": 3306,
-            "postgresql": 5432,
-            "mssql": 1433,
-            "oracle": 1521,
-            "dameng": 5236,
-            "doris": 9030,
-        }
-        return port_mapping.get(db_type, 3306)
+        return _DEFAULT_PORTS.get(db_type, 3306)
 
     def _parse_db_port(self, credentials: dict[str, Any]) -> int:
         """
@@ -55,77 +82,23 @@ class SchemaRAGBuilderProvider(ToolProvider):
         Validate the credentials and build schema RAG
         """
         try:
-            # 验证必要的凭据
-            api_uri = credentials.get("api_uri")
-            dataset_api_key = credentials.get("dataset_api_key")
-            db_type = credentials.get("db_type")
-            db_host = credentials.get("db_host")
-            db_user = credentials.get("db_user")
-            db_password = credentials.get("db_password")
-            db_name = credentials.get("db_name")
+            # 验证必要的凭据，一次性报告所有缺失项
             # build_rag = credentials.get("build_rag", True)
-
-            # 验证API相关参数
-            if not api_uri:
-                raise ToolProviderCredentialValidationError("API URI is required")
-
-            if not dataset_api_key:
-                raise ToolProviderCredentialValidationError(
-                    "Dataset API key is required"
-                )
-
-            # 验证数据库相关参数
-            if not db_type:
+            required = self.REQUIRED_CREDENTIALS
+            db_type = credentials.get("db_type")
+            if db_type == "sqlite":
+                # SQLite 只需要数据库名称（文件路径）
+                required += self.SQLITE_REQUIRED_CREDENTIALS
+            elif db_type:
+                # 其他数据库类型（包括 Doris）需要完整的连接信息
+                required += self.DATABASE_REQUIRED_CREDENTIALS
+
+            missing = [label for key, label in required if not credentials.get(key)]
+            if missing:
                 raise ToolProviderCredentialValidationError(
-                    "Database type is required"
+                    f"Missing required credentials: {', '.join(missing)}"
                 )
 
-            # SQLite 只需要数据库名称（文件路径）
-            if db_type == "sqlite":
-                if not db_name:
-                    raise ToolProviderCredentialValidationError(
-                        "Database name (file path) is required for SQLite"
-                    )
-            elif db_type == "doris":
-                # Doris需要host, port, user, password, database
-                if not db_host:
-                    raise ToolProviderCredentialValidationError(
-                        "Doris database host is required"
-                    )
-                if not db_user:
-                    raise ToolProviderCredentialValidationError(
-                        "Doris database user is required"
-                    )
-                if not db_password:
-                    raise ToolProviderCredentialValidationError(
-                        "Doris database password is required"
-                    )
-                if not db_name:
-                    raise ToolProviderCredentialValidationError(
-                        "Doris database name is required"
-                    )
-            else:
-                # 其他数据库类型需要完整的连接信息
-                if not db_host:
-                    raise ToolProviderCredentialValidationError(
-                        "Database host is required"
-                    )
-
-                if not db_user:
-                    raise ToolProviderCredentialValidationError(
-                        "Database user is required"
-                    )
-
-                if not db_password:
-                    raise ToolProviderCredentialValidationError(
-                        "Database password is required"
-                    )
-
-                if not db_name:
-                    raise ToolProviderCredentialValidationError(
-                        "Database name is required"
-                    )
-
             self._build_schema_rag(credentials)
             # 凭据验证成功后，根据build_rag参数决定是否构建schema知识库
             # if build_rag:
@@ -143,6 +116,11 @@ class SchemaRAGBuilderProvider(ToolProvider):
         """
         Build schema RAG using the provided credentials
         """
+        # 构建器依赖数据库驱动和 HTTP 客户端，只在真正构建时导入，
+        # 插件加载、枚举工具时不必付出这部分导入开销
+        from config import DatabaseConfig, LoggerConfig, DifyUploadConfig
+        from service.schema_builder import SchemaRAGBuilder
+
         try:
 
             # 创建数据库配置
@@ -203,12 +181,12 @@ class SchemaRAGBuilderProvider(ToolProvider):
                 schema_content = builder.generate_dictionary()
 
                 # 记录成功信息
-                table_count = schema_content.count("#") if schema_content else 0
+                table_count = self._count_tables(schema_content)
                 logging.info(f"📊 数据字典生成成功！包含 {table_count} 个表")
 
-                # 上传到 Dify 知识库
+                # 按表拆分后并发上传到 Dify 知识库
                 dataset_name = f"{db_config.database}_schema"
-                builder.upload_text_to_dify(dataset_name, schema_content)
+                builder.upload_schema_to_dify(dataset_name, schema_content)
                 logging.info("☁️ 已成功上传到 Dify 知识库")
 
             except Exception as e:
@@ -225,4 +203,7 @@ class SchemaRAGBuilderProvider(ToolProvider):
         """
         Return available tools
         """
+        from tools.text2sql import Text2SQLTool
+        from tools.sql_executer import SQLExecuterTool
+
         return [Text2SQLTool, SQLExecuterTool]
@@ -3,23 +3,30 @@
 
 该模块提供了一个通用的缓存架构，可以轻松集成到项目的各个工具中。
 主要特性：
-- 基于LRU策略的内存缓存
+- 基于LRU策略的内存缓存，支持按键分片加锁的线程安全版本
 - 支持TTL（过期时间）
+- 基于SQLite的磁盘缓存，可与内存LRU组合为两级缓存
+- 大文本缓存值透明压缩
 - 装饰器模式简化缓存应用
 - 统一的缓存管理和统计
 - 易于扩展到其他缓存后端（如Redis）
 """
 
 from .base import CacheManager, CacheBackend
-from .memory import LRUCache, TTLCache
+from .memory import LRUCache, ShardedLRUCache, TTLCache
+from .disk import SQLiteCache, TieredCache
+from .compressed import CompressedCache
 from .decorators import cacheable
 from .config import CacheConfig
 from .utils import normalize_query, generate_hash_key, create_cache_key_from_dict
+from .sql_normalize import normalize_sql
 
 __all__ = [
-    'CacheManager', 'CacheBackend', 'LRUCache', 'TTLCache',
+    'CacheManager', 'CacheBackend', 'LRUCache', 'ShardedLRUCache', 'TTLCache',
+    'SQLiteCache', 'TieredCache', 'CompressedCache',
     'cacheable', 'CacheConfig',
-    'normalize_query', 'generate_hash_key', 'create_cache_key_from_dict'
+    'normalize_query', 'generate_hash_key', 'create_cache_key_from_dict',
+    'normalize_sql'
 ]
 
 # 提供一个方便的初始化函数
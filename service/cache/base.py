@@ -7,12 +7,21 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Generic, TypeVar
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Generic, TypeVar
 import logging
+import threading
+import time
 
 K = TypeVar('K')  # 键类型
 V = TypeVar('V')  # 值类型
 
+# 缓存未命中哨兵：与合法缓存值 None 区分
+_MISS = object()
+
+# 模块级日志器，热点方法中按全局名读取，省去经由实例和类的属性查找
+_LOG = logging.getLogger(__name__)
+
 
 class CacheBackend(ABC, Generic[K, V]):
     """缓存后端抽象基类，定义了缓存操作的标准接口"""
@@ -29,9 +38,73 @@ class CacheBackend(ABC, Generic[K, V]):
             缓存的值，如果不存在或已过期则返回None
         """
         pass
+
+    def get_or_miss(self, key: K) -> Any:
+        """
+        从缓存获取值，未命中时返回 _MISS 哨兵
+
+        与 get 不同，缓存的 None 值会被原样返回。
+        默认实现基于 get，无法区分缓存的 None，后端应尽量覆盖。
+
+        参数:
+            key: 缓存键
+
+        返回:
+            缓存的值，如果不存在或已过期则返回 _MISS
+        """
+        value = self.get(key)
+        return _MISS if value is None else value
+
+    def get_or_compute(
+        self,
+        key: K,
+        producer: Callable[[], V],
+        ttl: Optional[int] = None,
+        condition: Optional[Callable[[V], bool]] = None
+    ) -> V:
+        """
+        获取缓存值，未命中时调用 producer 计算并写入缓存
+
+        默认实现基于 get_or_miss 和 set，后端可覆盖以合并查找与写入。
+        producer 的执行耗时作为重算成本传给 set。
+
+        参数:
+            key: 缓存键
+            producer: 未命中时计算值的无参函数
+            ttl: 可选的过期时间（秒）
+            condition: 可选的条件函数，返回True时才写入缓存
+
+        返回:
+            缓存的值或新计算的值
+        """
+        value = self.get_or_miss(key)
+        if value is not _MISS:
+            return value
+        return self._compute_and_set(key, producer, ttl, condition)
+
+    def _compute_and_set(
+        self,
+        key: K,
+        producer: Callable[[], V],
+        ttl: Optional[int],
+        condition: Optional[Callable[[V], bool]]
+    ) -> V:
+        """执行 producer，并按条件写入缓存"""
+        start_time = time.perf_counter()
+        value = producer()
+        cost = time.perf_counter() - start_time
+        if condition is None or condition(value):
+            self.set(key, value, ttl, cost)
+        return value
     
     @abstractmethod
-    def set(self, key: K, value: V, ttl: Optional[int] = None) -> None:
+    def set(
+        self,
+        key: K,
+        value: V,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None
+    ) -> None:
         """
         设置缓存值
         
@@ -39,6 +112,7 @@ class CacheBackend(ABC, Generic[K, V]):
             key: 缓存键
             value: 要缓存的值
             ttl: 可选的过期时间（秒），None表示永不过期
+            cost: 可选的重算成本（秒），后端可据此决定淘汰顺序，不支持时忽略
         """
         pass
     
@@ -82,7 +156,6 @@ class CacheManager:
     """
     
     _instances: Dict[str, 'CacheManager'] = {}
-    _logger = logging.getLogger(__name__)
     
     @classmethod
     def get_instance(cls, name: str = "default") -> 'CacheManager':
@@ -100,30 +173,47 @@ class CacheManager:
             cls._instances[name] = CacheManager(name)
             # 自动为新实例设置默认后端
             cls._instances[name].set_backend(LRUCache(max_size=100))
-            cls._logger.info(f"创建新的缓存管理器实例: {name}，使用默认LRU后端")
+            _LOG.info(f"创建新的缓存管理器实例: {name}，使用默认LRU后端")
         return cls._instances[name]
     
     @classmethod
-    def get_all_instances(cls) -> Dict[str, 'CacheManager']:
+    def get_all_instances(cls) -> Mapping[str, 'CacheManager']:
         """
         获取所有缓存管理器实例
         
+        返回的是只读的实时视图，不复制字典；需要稳定快照时调用方自行 dict(...)。
+        
         返回:
-            包含所有缓存管理器实例的字典
+            包含所有缓存管理器实例的只读映射
         """
-        return cls._instances.copy()
+        return MappingProxyType(cls._instances)
     
-    def __init__(self, name: str):
+    def __init__(self, name: str, stats_enabled: bool = True):
         """
         初始化缓存管理器
         
         参数:
             name: 缓存实例名称
+            stats_enabled: 是否记录命中统计，热点路径可关闭以省去计数开销
         """
         self.name = name
         self._backend: Optional[CacheBackend] = None
-        self.hit_count = 0
-        self.miss_count = 0
+        self.stats_enabled = stats_enabled
+        # 缓存可能被多个线程并发访问（并行生成数据字典、批量上传等），
+        # 计数用锁保护，不依赖 GIL 保证 += 的原子性
+        self._stats_lock = threading.Lock()
+        self._hit_count = 0
+        self._miss_count = 0
+
+    @property
+    def hit_count(self) -> int:
+        """缓存命中次数"""
+        return self._hit_count
+
+    @property
+    def miss_count(self) -> int:
+        """缓存未命中次数"""
+        return self._miss_count
     
     def set_backend(self, backend: CacheBackend) -> None:
         """
@@ -133,7 +223,7 @@ class CacheManager:
             backend: 缓存后端实例
         """
         self._backend = backend
-        self._logger.info(f"缓存管理器 {self.name} 设置后端: {backend.__class__.__name__}")
+        _LOG.info(f"缓存管理器 {self.name} 设置后端: {backend.__class__.__name__}")
     
     def get(self, key: Any) -> Optional[Any]:
         """
@@ -145,21 +235,87 @@ class CacheManager:
         返回:
             缓存的值，如果不存在或已过期则返回None
         """
+        result = self.get_or_miss(key)
+        return None if result is _MISS else result
+
+    def get_or_miss(self, key: Any) -> Any:
+        """
+        获取缓存值，并记录命中统计；未命中时返回 _MISS 哨兵
+
+        参数:
+            key: 缓存键
+
+        返回:
+            缓存的值（可以是 None），如果不存在或已过期则返回 _MISS
+        """
         if not self._backend:
-            self._logger.warning(f"缓存管理器 {self.name} 未设置后端")
-            return None
+            _LOG.warning(f"缓存管理器 {self.name} 未设置后端")
+            return _MISS
             
-        result = self._backend.get(key)
-        if result is not None:
-            self.hit_count += 1
-            self._logger.debug(f"缓存命中: {self.name}:{key}")
+        result = self._backend.get_or_miss(key)
+        if result is not _MISS:
+            if self.stats_enabled:
+                with self._stats_lock:
+                    self._hit_count += 1
+            _LOG.debug("缓存命中: %s:%s", self.name, key)
         else:
-            self.miss_count += 1
-            self._logger.debug(f"缓存未命中: {self.name}:{key}")
+            if self.stats_enabled:
+                with self._stats_lock:
+                    self._miss_count += 1
+            _LOG.debug("缓存未命中: %s:%s", self.name, key)
         
         return result
     
-    def set(self, key: Any, value: Any, ttl: Optional[int] = None) -> None:
+    def get_or_compute(
+        self,
+        key: Any,
+        producer: Callable[[], Any],
+        ttl: Optional[int] = None,
+        condition: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        获取缓存值，未命中时调用 producer 计算并写入缓存，并记录命中统计
+
+        参数:
+            key: 缓存键
+            producer: 未命中时计算值的无参函数
+            ttl: 可选的过期时间（秒）
+            condition: 可选的条件函数，返回True时才写入缓存
+
+        返回:
+            缓存的值或新计算的值
+        """
+        if not self._backend:
+            _LOG.warning(f"缓存管理器 {self.name} 未设置后端")
+            return producer()
+
+        computed = False
+
+        def tracked_producer():
+            nonlocal computed
+            computed = True
+            return producer()
+
+        result = self._backend.get_or_compute(key, tracked_producer, ttl, condition)
+        if self.stats_enabled:
+            with self._stats_lock:
+                if computed:
+                    self._miss_count += 1
+                else:
+                    self._hit_count += 1
+        if computed:
+            _LOG.debug("缓存未命中，已计算: %s:%s", self.name, key)
+        else:
+            _LOG.debug("缓存命中: %s:%s", self.name, key)
+        return result
+    
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None
+    ) -> None:
         """
         设置缓存值
         
@@ -167,12 +323,13 @@ class CacheManager:
             key: 缓存键
             value: 要缓存的值
             ttl: 可选的过期时间（秒）
+            cost: 可选的重算成本（秒）
         """
         if self._backend:
-            self._backend.set(key, value, ttl)
-            self._logger.debug(f"设置缓存: {self.name}:{key}, TTL={ttl}")
+            self._backend.set(key, value, ttl, cost)
+            _LOG.debug("设置缓存: %s:%s, TTL=%s", self.name, key, ttl)
         else:
-            self._logger.warning(f"缓存管理器 {self.name} 未设置后端，无法设置缓存")
+            _LOG.warning(f"缓存管理器 {self.name} 未设置后端，无法设置缓存")
     
     def delete(self, key: Any) -> bool:
         """
@@ -187,7 +344,7 @@ class CacheManager:
         if self._backend:
             result = self._backend.delete(key)
             if result:
-                self._logger.debug(f"删除缓存: {self.name}:{key}")
+                _LOG.debug("删除缓存: %s:%s", self.name, key)
             return result
         return False
     
@@ -195,7 +352,7 @@ class CacheManager:
         """清空缓存"""
         if self._backend:
             self._backend.clear()
-            self._logger.info(f"清空缓存: {self.name}")
+            _LOG.info(f"清空缓存: {self.name}")
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -204,13 +361,16 @@ class CacheManager:
         返回:
             包含缓存统计数据的字典，包括命中率、命中次数等
         """
-        total = self.hit_count + self.miss_count
-        hit_rate = self.hit_count / total if total > 0 else 0
+        with self._stats_lock:
+            hit_count = self._hit_count
+            miss_count = self._miss_count
+        total = hit_count + miss_count
+        hit_rate = hit_count / total if total > 0 else 0
         
         stats = {
             "name": self.name,
-            "hit_count": self.hit_count,
-            "miss_count": self.miss_count,
+            "hit_count": hit_count,
+            "miss_count": miss_count,
             "total_requests": total,
             "hit_rate": round(hit_rate * 100, 2)  # 百分比
         }
@@ -222,6 +382,7 @@ class CacheManager:
     
     def reset_stats(self) -> None:
         """重置统计信息"""
-        self.hit_count = 0
-        self.miss_count = 0
-        self._logger.info(f"重置缓存统计: {self.name}")
+        with self._stats_lock:
+            self._hit_count = 0
+            self._miss_count = 0
+        _LOG.info(f"重置缓存统计: {self.name}")
@@ -0,0 +1,141 @@
+"""
+压缩缓存实现 - 对大文本缓存值透明压缩
+
+该模块提供了包装其他缓存后端的压缩层，特点：
+- 超过阈值的字符串/字节值在写入时压缩，读取时解压
+- 小值原样存储，不产生额外开销
+- 安装 zstandard 时使用 zstd，否则回退到标准库 zlib
+"""
+
+import sys
+import zlib
+from typing import Any, Dict, Optional
+import logging
+
+from .base import _MISS, CacheBackend
+
+# zstandard 为可选依赖：schema 文本压缩率相近，zstd 压缩和解压都更快
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_LOG = logging.getLogger(__name__)
+
+# 压缩级别：zstd 与 zlib 均取 3，兼顾速度与压缩率
+COMPRESSION_LEVEL = 3
+
+
+class _Compressed:
+    """压缩后的缓存值，记录原值是否为字符串以便还原类型"""
+
+    __slots__ = ("payload", "is_text")
+
+    def __init__(self, payload: bytes, is_text: bool):
+        self.payload = payload
+        self.is_text = is_text
+
+    def __sizeof__(self) -> int:
+        # 计入压缩数据本身，使内存估算反映实际占用
+        return object.__sizeof__(self) + sys.getsizeof(self.payload)
+
+
+def _compress(data: bytes) -> bytes:
+    """压缩字节数据"""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+    return zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def _decompress(payload: bytes) -> bytes:
+    """解压字节数据"""
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+class CompressedCache(CacheBackend):
+    """
+    压缩缓存包装层
+
+    超过 threshold 字节的 str/bytes 值压缩后交给内部后端存储，
+    其余值原样存储。内部后端的淘汰、过期和线程安全保持不变。
+    """
+
+    # 默认压缩阈值（字节）
+    DEFAULT_THRESHOLD = 16 * 1024
+
+    def __init__(self, backend: CacheBackend, threshold: int = DEFAULT_THRESHOLD):
+        """
+        初始化压缩缓存
+
+        参数:
+            backend: 实际存储缓存项的后端
+            threshold: 压缩阈值（字节），不超过该大小的值不压缩
+        """
+        self.backend = backend
+        self.threshold = threshold
+        _LOG.info(
+            f"初始化压缩缓存，阈值: {threshold} 字节，"
+            f"算法: {'zstd' if zstandard is not None else 'zlib'}"
+        )
+
+    def _encode(self, value: Any) -> Any:
+        """按大小决定是否压缩缓存值"""
+        if isinstance(value, str):
+            # 按字符数预判，避免对短字符串编码
+            if len(value) * 4 <= self.threshold:
+                return value
+            data = value.encode("utf-8")
+            if len(data) <= self.threshold:
+                return value
+            return _Compressed(_compress(data), True)
+        if isinstance(value, (bytes, bytearray)) and len(value) > self.threshold:
+            return _Compressed(_compress(bytes(value)), False)
+        return value
+
+    @staticmethod
+    def _decode(stored: Any) -> Any:
+        """还原压缩过的缓存值"""
+        if type(stored) is not _Compressed:
+            return stored
+        data = _decompress(stored.payload)
+        return data.decode("utf-8") if stored.is_text else data
+
+    def get(self, key: Any) -> Optional[Any]:
+        """获取缓存项并解压"""
+        value = self.get_or_miss(key)
+        return None if value is _MISS else value
+
+    def get_or_miss(self, key: Any) -> Any:
+        """获取缓存项并解压，不存在或已过期时返回 _MISS"""
+        stored = self.backend.get_or_miss(key)
+        if stored is _MISS:
+            return _MISS
+        return self._decode(stored)
+
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None
+    ) -> None:
+        """按需压缩后写入内部后端"""
+        self.backend.set(key, self._encode(value), ttl, cost)
+
+    def delete(self, key: Any) -> bool:
+        """删除缓存项"""
+        return self.backend.delete(key)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self.backend.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息，内存估算以内部后端存储的压缩后数据为准"""
+        stats = self.backend.get_stats()
+        stats["inner_backend_type"] = stats.get("backend_type")
+        stats["backend_type"] = "compressed"
+        stats["compression_threshold"] = self.threshold
+        return stats
@@ -7,11 +7,16 @@
 - 提供全局缓存统计
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 import logging
+import os
 
 from .base import CacheManager
-from .memory import LRUCache, TTLCache
+from .compressed import CompressedCache
+from .disk import DEFAULT_CACHE_DIR, SQLiteCache, TieredCache
+from .memory import LRUCache, ShardedLRUCache, TTLCache
+
+_LOG = logging.getLogger(__name__)
 
 
 class CacheConfig:
@@ -25,13 +30,13 @@ class CacheConfig:
     DEFAULT_CONFIG = {
         # Schema检索缓存配置
         "schema_cache": {
-            "type": "lru",
+            "type": "compressed_lru",
             "max_size": 100,
             "ttl": 3600  # 1小时
         },
         # SQL生成结果缓存配置
         "sql_cache": {
-            "type": "lru",
+            "type": "sharded_lru",
             "max_size": 50,
             "ttl": 7200  # 2小时
         },
@@ -46,48 +51,74 @@ class CacheConfig:
             "type": "ttl",
             "max_size": 50,
             "default_ttl": 3600  # 1小时
+        },
+        # Schema上传记录缓存配置
+        "schema_upload_cache": {
+            "type": "ttl",
+            "max_size": 50,
+            "default_ttl": 3600  # 1小时
+        },
+        # Dify 数据集名称到ID的映射缓存配置
+        "dify_dataset_cache": {
+            "type": "ttl",
+            "max_size": 1000,
+            "default_ttl": 300  # 5分钟
         }
     }
     
-    _logger = logging.getLogger(__name__)
     _initialized = False
+    # 各缓存当前生效的配置快照，用于判断配置是否变化
+    _config_snapshots: Dict[str, Tuple[Tuple[str, Any], ...]] = {}
     
     @classmethod
     def initialize_caches(cls, config: Optional[Dict[str, Any]] = None) -> None:
         """
         初始化所有缓存实例
         
+        可重复调用：只重建配置发生变化的缓存，配置未变的缓存保留已有内容。
+        
         参数:
             config: 缓存配置，如果为None则使用默认配置
         """
-        if cls._initialized:
-            cls._logger.info("缓存系统已初始化，跳过重复初始化")
-            return
-        
         if config is None:
             config = cls.DEFAULT_CONFIG
-            cls._logger.info("使用默认缓存配置")
+            _LOG.info("使用默认缓存配置")
         
-        cls._logger.info(f"开始初始化 {len(config)} 个缓存实例")
+        _LOG.info(f"开始初始化 {len(config)} 个缓存实例")
         
         for cache_name, cache_config in config.items():
             try:
                 cls._initialize_single_cache(cache_name, cache_config)
             except Exception as e:
-                cls._logger.error(f"初始化缓存 {cache_name} 失败: {e}")
+                _LOG.error(f"初始化缓存 {cache_name} 失败: {e}")
         
         cls._initialized = True
-        cls._logger.info("缓存系统初始化完成")
+        _LOG.info("缓存系统初始化完成")
+
+    @classmethod
+    def reconfigure(cls, new_config: Dict[str, Any]) -> None:
+        """
+        按新配置调整缓存，只重建配置发生变化的缓存
+        
+        参数:
+            new_config: 缓存配置，只包含需要调整的缓存即可
+        """
+        cls.initialize_caches(new_config)
     
     @classmethod
     def _initialize_single_cache(cls, cache_name: str, cache_config: Dict[str, Any]) -> None:
         """
-        初始化单个缓存实例
+        初始化单个缓存实例，配置与当前生效配置相同时跳过，保留已缓存的内容
         
         参数:
             cache_name: 缓存名称
             cache_config: 缓存配置
         """
+        snapshot = tuple(sorted(cache_config.items()))
+        if cls._config_snapshots.get(cache_name) == snapshot:
+            _LOG.debug("缓存 %s 配置未变化，跳过重建", cache_name)
+            return
+
         cache_type = cache_config.get("type", "lru")
         max_size = cache_config.get("max_size", 100)
         
@@ -97,16 +128,35 @@ class CacheConfig:
         # 根据类型创建缓存后端
         if cache_type == "lru":
             backend = LRUCache(max_size=max_size)
+        elif cache_type == "sharded_lru":
+            # 按键分片加锁的LRU缓存，用于多线程并发访问的高频缓存
+            backend = ShardedLRUCache(max_size=max_size)
+        elif cache_type == "compressed_lru":
+            # 分片LRU外包一层压缩，用于缓存大段schema文本
+            threshold = cache_config.get(
+                "compress_threshold", CompressedCache.DEFAULT_THRESHOLD
+            )
+            backend = CompressedCache(ShardedLRUCache(max_size=max_size), threshold)
         elif cache_type == "ttl":
             default_ttl = cache_config.get("default_ttl", 3600)
             backend = TTLCache(max_size=max_size, default_ttl=default_ttl)
+        elif cache_type == "tiered":
+            # 内存LRU + SQLite磁盘两级缓存，进程重启后可从磁盘恢复
+            path = cache_config.get(
+                "path", os.path.join(DEFAULT_CACHE_DIR, f"{cache_name}.sqlite3")
+            )
+            disk_max_size = cache_config.get("disk_max_size", max_size * 10)
+            backend = TieredCache(
+                LRUCache(max_size=max_size), SQLiteCache(path, max_size=disk_max_size)
+            )
         else:
-            cls._logger.warning(f"未知的缓存类型 {cache_type}，使用默认LRU缓存")
+            _LOG.warning(f"未知的缓存类型 {cache_type}，使用默认LRU缓存")
             backend = LRUCache(max_size=max_size)
         
         # 设置后端
         cache_manager.set_backend(backend)
-        cls._logger.info(
+        cls._config_snapshots[cache_name] = snapshot
+        _LOG.info(
             f"缓存 {cache_name} 初始化完成: type={cache_type}, max_size={max_size}"
         )
     
@@ -125,7 +175,7 @@ class CacheConfig:
             try:
                 stats[cache_name] = cache_manager.get_stats()
             except Exception as e:
-                cls._logger.error(f"获取缓存 {cache_name} 统计失败: {e}")
+                _LOG.error(f"获取缓存 {cache_name} 统计失败: {e}")
                 stats[cache_name] = {"error": str(e)}
         
         return stats
@@ -133,27 +183,27 @@ class CacheConfig:
     @classmethod
     def clear_all_caches(cls) -> None:
         """清空所有缓存"""
-        cls._logger.info("开始清空所有缓存")
+        _LOG.info("开始清空所有缓存")
         all_instances = CacheManager.get_all_instances()
         
         for cache_name, cache_manager in all_instances.items():
             try:
                 cache_manager.clear()
-                cls._logger.info(f"清空缓存: {cache_name}")
+                _LOG.info(f"清空缓存: {cache_name}")
             except Exception as e:
-                cls._logger.error(f"清空缓存 {cache_name} 失败: {e}")
+                _LOG.error(f"清空缓存 {cache_name} 失败: {e}")
     
     @classmethod
     def reset_all_stats(cls) -> None:
         """重置所有缓存的统计信息"""
-        cls._logger.info("开始重置所有缓存统计")
+        _LOG.info("开始重置所有缓存统计")
         all_instances = CacheManager.get_all_instances()
         
         for cache_name, cache_manager in all_instances.items():
             try:
                 cache_manager.reset_stats()
             except Exception as e:
-                cls._logger.error(f"重置缓存 {cache_name} 统计失败: {e}")
+                _LOG.error(f"重置缓存 {cache_name} 统计失败: {e}")
     
     @classmethod
     def get_cache(cls, name: str) -> CacheManager:
@@ -177,7 +227,7 @@ class CacheConfig:
             cache_name: 缓存名称
             config: 新的配置
         """
-        cls._logger.info(f"更新缓存配置: {cache_name}")
+        _LOG.info(f"更新缓存配置: {cache_name}")
         cls._initialize_single_cache(cache_name, config)
     
     @classmethod
@@ -10,19 +10,79 @@
 """
 
 import functools
-from typing import Any, Callable, Optional
+import hashlib
+import pickle
+import threading
+from typing import Any, Callable, Dict, Optional
 import logging
 
 from .base import CacheManager
 from .utils import generate_cache_key
 
+# xxhash 为可选依赖：键只需要分布均匀，不需要密码学强度，
+# 安装后使用更快的 XXH3-128，否则回退到标准库的 BLAKE2b-128
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+_LOG = logging.getLogger(__name__)
+
+# 等待同键计算完成的最长时间（秒），超时后自行计算
+SINGLE_FLIGHT_TIMEOUT = 30.0
+
+
+# 键摘要中各参数的类型标记，加上长度前缀，保证不同参数切分方式不会得到相同的字节流
+_STR_TAG = b"s"
+_BYTES_TAG = b"b"
+_PICKLE_TAG = b"p"
+_KWARGS_MARKER = b"\x00kwargs"
+
+
+def _update_key_hasher(hasher: Any, value: Any) -> None:
+    """
+    将单个参数写入键摘要
+
+    字符串和字节类参数直接写入，省去 pickle 对大字符串（如 schema 文本）的整块复制；
+    其他参数使用 pickle 协议 5 序列化，支持带外缓冲区的对象（如 numpy 数组）不复制数据。
+    """
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        hasher.update(_STR_TAG + len(data).to_bytes(8, "little"))
+        hasher.update(data)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        view = memoryview(value)
+        hasher.update(_BYTES_TAG + view.nbytes.to_bytes(8, "little"))
+        hasher.update(view)
+    else:
+        buffers = []
+        data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+        hasher.update(_PICKLE_TAG + len(data).to_bytes(8, "little"))
+        hasher.update(data)
+        for buffer in buffers:
+            raw = buffer.raw()
+            hasher.update(raw.nbytes.to_bytes(8, "little"))
+            hasher.update(raw)
+
+
+class _Flight:
+    """同一缓存键正在进行的一次计算，供并发未命中的线程等待其结果"""
+
+    __slots__ = ("event", "value", "ok")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.ok = False
+
 
 def cacheable(
     name: str = "default",
     key_prefix: str = "",
     ttl: Optional[int] = None,
     key_generator: Optional[Callable] = None,
-    condition: Optional[Callable] = None
+    condition: Optional[Callable] = None,
+    normalizer: Optional[Callable[[str], str]] = None
 ):
     """
     函数/方法结果缓存装饰器
@@ -33,6 +93,8 @@ def cacheable(
         ttl: 缓存生存时间（秒），None表示使用缓存管理器的默认TTL
         key_generator: 自定义缓存键生成函数，接收函数的args和kwargs
         condition: 条件函数，返回True时才缓存结果
+        normalizer: 可选的规范化函数，默认键生成前作用于字符串参数，
+            使语义等价的输入（如仅空白不同的SQL）映射为同一缓存键
     
     示例:
         ```python
@@ -49,6 +111,11 @@ def cacheable(
         def process_data(id: str):
             return result
         
+        # 规范化SQL参数后再生成键
+        @cacheable(name="sql_cache", normalizer=normalize_sql)
+        def validate(sql: str):
+            return result
+        
         # 条件缓存（只缓存成功结果）
         @cacheable(
             name="result_cache",
@@ -58,61 +125,104 @@ def cacheable(
             return x * 2
         ```
     """
-    logger = logging.getLogger(__name__)
-    
     def decorator(func: Callable) -> Callable:
+        # 键前缀在装饰时解析一次，避免每次调用重复计算
+        prefix = key_prefix or func.__name__
+        prefix_bytes = prefix.encode("utf-8")
+
+        # 缓存管理器实例在其生命周期内不变（重新配置只替换后端），
+        # 装饰时解析一次并绑定方法，省去每次调用的实例查找
+        cache_manager = CacheManager.get_instance(name)
+        get_or_compute = cache_manager.get_or_compute
+
+        def should_cache(result: Any) -> bool:
+            """检查是否应该缓存结果，条件函数异常时默认缓存"""
+            try:
+                return condition(result)
+            except Exception as e:
+                _LOG.warning(f"条件函数执行失败: {e}，默认缓存结果")
+                return True
+
+        cache_condition = should_cache if condition is not None else None
+
+        # 正在计算中的缓存键：多个线程同时未命中同一键时只有首个线程执行原始函数，
+        # 其余线程等待并复用其结果
+        inflight: Dict[Any, _Flight] = {}
+        inflight_lock = threading.Lock()
+
+        def build_default_key(args: tuple, kwargs: dict) -> Any:
+            """默认键生成：对参数序列化结果计算 128 位摘要（XXH3 或 BLAKE2b）"""
+            if normalizer is not None:
+                # 键摘要区分参数类型，规范化后的 "1" 与 1 不会产生相同的键
+                args = tuple(
+                    normalizer(arg) if isinstance(arg, str) else arg for arg in args
+                )
+                kwargs = {
+                    k: normalizer(v) if isinstance(v, str) else v
+                    for k, v in kwargs.items()
+                }
+            try:
+                if xxhash is not None:
+                    hasher = xxhash.xxh3_128(prefix_bytes)
+                else:
+                    hasher = hashlib.blake2b(prefix_bytes, digest_size=16)
+                for arg in args:
+                    _update_key_hasher(hasher, arg)
+                if kwargs:
+                    hasher.update(_KWARGS_MARKER)
+                    for k in sorted(kwargs):
+                        _update_key_hasher(hasher, k)
+                        _update_key_hasher(hasher, kwargs[k])
+                # XXH3 的整数摘要作为字典键时比 bytes 哈希更快
+                return hasher.intdigest() if xxhash is not None else hasher.digest()
+            except Exception:
+                # 参数不可序列化时回退到基于字符串的键生成
+                return generate_cache_key(prefix, *args, **kwargs)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            # 获取缓存管理器
-            cache_manager = CacheManager.get_instance(name)
-            
             # 生成缓存键
             if key_generator:
                 try:
                     cache_key = key_generator(*args, **kwargs)
                 except Exception as e:
-                    logger.warning(f"自定义键生成器失败: {e}，使用默认生成器")
-                    cache_key = generate_cache_key(
-                        key_prefix or func.__name__, 
-                        *args, 
-                        **kwargs
-                    )
+                    _LOG.warning(f"自定义键生成器失败: {e}，使用默认生成器")
+                    cache_key = build_default_key(args, kwargs)
             else:
-                # 默认键生成逻辑：前缀 + 函数名 + 参数哈希
-                cache_key = generate_cache_key(
-                    key_prefix or func.__name__, 
-                    *args, 
-                    **kwargs
-                )
-            
-            # 尝试从缓存获取
-            cached_result = cache_manager.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"缓存命中，函数: {func.__name__}, 键: {cache_key}")
-                return cached_result
-            
-            # 缓存未命中，执行原始函数
-            logger.debug(f"缓存未命中，执行函数: {func.__name__}")
-            result = func(*args, **kwargs)
-            
-            # 检查是否应该缓存结果
-            should_cache = True
-            if condition is not None:
-                try:
-                    should_cache = condition(result)
-                except Exception as e:
-                    logger.warning(f"条件函数执行失败: {e}，默认缓存结果")
-            
-            # 缓存结果
-            if should_cache:
-                cache_manager.set(cache_key, result, ttl)
-                logger.debug(f"缓存结果，函数: {func.__name__}, 键: {cache_key}")
+                # 默认键生成逻辑：前缀 + 参数摘要
+                cache_key = build_default_key(args, kwargs)
             
-            return result
+            led_flight = None
+
+            def producer():
+                nonlocal led_flight
+                with inflight_lock:
+                    flight = inflight.get(cache_key)
+                    if flight is None:
+                        flight = led_flight = inflight[cache_key] = _Flight()
+                if led_flight is None:
+                    # 其他线程正在计算同一键，等待其结果；超时或计算失败时自行计算
+                    if flight.event.wait(SINGLE_FLIGHT_TIMEOUT) and flight.ok:
+                        return flight.value
+                    return func(*args, **kwargs)
+                flight.value = func(*args, **kwargs)
+                flight.ok = True
+                return flight.value
+
+            # 一次调用完成查找，未命中时执行原始函数并写入缓存；
+            # 后端以哨兵判断未命中，缓存的 None 结果同样有效
+            try:
+                return get_or_compute(cache_key, producer, ttl, cache_condition)
+            finally:
+                if led_flight is not None:
+                    # 结果写入缓存后再撤销计算标记，之后到达的线程直接命中缓存
+                    with inflight_lock:
+                        del inflight[cache_key]
+                    led_flight.event.set()
         
         # 添加缓存控制方法
-        wrapper.cache_clear = lambda: CacheManager.get_instance(name).clear()
-        wrapper.cache_info = lambda: CacheManager.get_instance(name).get_stats()
+        wrapper.cache_clear = cache_manager.clear
+        wrapper.cache_info = cache_manager.get_stats
         
         return wrapper
     
@@ -179,46 +289,19 @@ def invalidate_cache(cache_manager_name: str, key: Optional[Any] = None):
     return decorator
 
 
-class CachedProperty:
-    """
-    缓存属性装饰器，用于类属性的惰性求值和缓存
-    
-    示例:
-        ```python
-        class MyClass:
-            @CachedProperty
-            def expensive_property(self):
-                # 耗时计算
-                return compute_result()
-        
-        obj = MyClass()
-        result = obj.expensive_property  # 首次计算并缓存
-        result = obj.expensive_property  # 直接返回缓存值
-        ```
-    """
-    
-    def __init__(self, func: Callable):
-        self.func = func
-        self.attr_name = f"_cached_{func.__name__}"
-        functools.update_wrapper(self, func)
-    
-    def __get__(self, instance, owner):
-        if instance is None:
-            return self
-        
-        # 检查是否已缓存
-        if not hasattr(instance, self.attr_name):
-            # 计算并缓存结果
-            result = self.func(instance)
-            setattr(instance, self.attr_name, result)
-        
-        return getattr(instance, self.attr_name)
-    
-    def __set__(self, instance, value):
-        # 允许手动设置缓存值
-        setattr(instance, self.attr_name, value)
-    
-    def __delete__(self, instance):
-        # 允许删除缓存
-        if hasattr(instance, self.attr_name):
-            delattr(instance, self.attr_name)
+# 缓存属性装饰器，用于类属性的惰性求值和缓存。
+# functools.cached_property 将结果直接写入实例 __dict__，首次计算后的访问
+# 不再经过描述符，等同普通属性读取；保留 CachedProperty 名称以兼容现有用法。
+# 手动设置用 obj.attr = value，清除缓存用 del obj.attr（未计算时删除会抛出 AttributeError）。
+#
+# 示例:
+#     class MyClass:
+#         @CachedProperty
+#         def expensive_property(self):
+#             # 耗时计算
+#             return compute_result()
+#
+#     obj = MyClass()
+#     result = obj.expensive_property  # 首次计算并缓存
+#     result = obj.expensive_property  # 直接返回缓存值
+CachedProperty = functools.cached_property
@@ -0,0 +1,299 @@
+"""
+磁盘缓存实现 - 基于SQLite的持久化缓存
+
+该模块提供了可跨进程重启保留的缓存实现，特点：
+- SQLiteCache: 使用SQLite文件存储pickle序列化的缓存项，开启WAL日志
+- TieredCache: 组合内存LRU与SQLite，内存未命中时从磁盘读取并回填内存
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+from .base import _MISS, CacheBackend
+from .memory import LRUCache
+
+
+# 默认的磁盘缓存目录：项目根目录下的 output/.cache/
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "output",
+    ".cache",
+)
+
+# 已确认存在的目录，重复创建缓存实例（如重新配置）时跳过 stat/mkdir 系统调用
+_DIRS_ENSURED = set()
+
+
+def _ensure_dir(directory: str) -> None:
+    """确保目录存在，同一进程内每个目录只检查一次"""
+    if directory not in _DIRS_ENSURED:
+        os.makedirs(directory, exist_ok=True)
+        _DIRS_ENSURED.add(directory)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    基于SQLite的磁盘缓存实现
+
+    每个缓存项存储为一行: (key BLOB, value BLOB, expire REAL)，
+    键和值均使用pickle序列化。连接在多线程间共享，操作由锁串行化。
+    """
+
+    def __init__(self, path: str, max_size: int = 1000):
+        """
+        初始化SQLite缓存
+
+        参数:
+            path: SQLite数据库文件路径
+            max_size: 最大缓存项数量，超出时淘汰最早过期的项
+        """
+        if max_size <= 0:
+            raise ValueError("max_size必须大于0")
+
+        directory = os.path.dirname(path)
+        if directory:
+            _ensure_dir(directory)
+
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key BLOB PRIMARY KEY, value BLOB NOT NULL, expire REAL)"
+        )
+        self._conn.commit()
+
+        self._logger.info(f"初始化SQLite缓存: {path}，最大容量: {max_size}")
+
+    @staticmethod
+    def _dump_key(key: Any) -> bytes:
+        """序列化缓存键"""
+        return pickle.dumps(key, protocol=5)
+
+    def get(self, key: Any) -> Optional[Any]:
+        """
+        获取缓存项，如存在且未过期则返回
+
+        参数:
+            key: 缓存键
+
+        返回:
+            缓存的值，如果不存在、已过期或无法反序列化则返回None
+        """
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    def get_or_miss(self, key: Any) -> Any:
+        """获取缓存项，不存在或已过期时返回 _MISS"""
+        entry = self.get_entry(key)
+        return _MISS if entry is None else entry[0]
+
+    def get_entry(self, key: Any) -> Optional[Tuple[Any, Optional[float]]]:
+        """
+        获取缓存项及其过期时间
+
+        参数:
+            key: 缓存键
+
+        返回:
+            (值, 过期时间戳) 元组，如果不存在、已过期或无法反序列化则返回None
+        """
+        key_blob = self._dump_key(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expire FROM cache WHERE key = ?", (key_blob,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value_blob, expire_time = row
+            if expire_time is not None and time.time() >= expire_time:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key_blob,))
+                self._conn.commit()
+                self._logger.debug("磁盘缓存项已过期: %s", key)
+                return None
+
+        try:
+            return pickle.loads(value_blob), expire_time
+        except Exception as e:
+            self._logger.warning(f"磁盘缓存项反序列化失败，已忽略: {e}")
+            self.delete(key)
+            return None
+
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None
+    ) -> None:
+        """
+        设置缓存项，可选TTL（秒）
+
+        参数:
+            key: 缓存键
+            value: 要缓存的值，必须可被pickle序列化
+            ttl: 可选的过期时间（秒），None表示永不过期
+            cost: 重算成本，磁盘层按过期时间淘汰，忽略该参数
+        """
+        try:
+            value_blob = pickle.dumps(value, protocol=5)
+        except Exception as e:
+            self._logger.warning(f"缓存值无法序列化，跳过磁盘缓存: {e}")
+            return
+
+        expire_time = None if ttl is None else time.time() + ttl
+        key_blob = self._dump_key(key)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expire) VALUES (?, ?, ?)",
+                (key_blob, value_blob, expire_time),
+            )
+            self._evict_overflow()
+            self._conn.commit()
+
+    def _evict_overflow(self) -> None:
+        """清理过期项，仍超出容量时按过期时间淘汰（永不过期的项最后淘汰）"""
+        self._conn.execute(
+            "DELETE FROM cache WHERE expire IS NOT NULL AND expire <= ?",
+            (time.time(),),
+        )
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        overflow = count - self.max_size
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY expire IS NULL, expire LIMIT ?)",
+                (overflow,),
+            )
+            self._logger.debug("磁盘缓存已满，淘汰 %s 个项", overflow)
+
+    def delete(self, key: Any) -> bool:
+        """
+        删除缓存项
+
+        参数:
+            key: 缓存键
+
+        返回:
+            是否成功删除
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE key = ?", (self._dump_key(key),)
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def clear(self) -> None:
+        """清空所有缓存"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+        self._logger.info(f"清空磁盘缓存，删除 {cursor.rowcount} 个项")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        返回:
+            包含缓存统计数据的字典
+        """
+        with self._lock:
+            count, valid_items = self._conn.execute(
+                "SELECT COUNT(*), "
+                "COALESCE(SUM(expire IS NULL OR expire > ?), 0) FROM cache",
+                (time.time(),),
+            ).fetchone()
+
+        return {
+            "backend_type": "sqlite_disk",
+            "path": self.path,
+            "max_size": self.max_size,
+            "current_size": count,
+            "valid_items": valid_items,
+            "expired_items": count - valid_items,
+        }
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache(CacheBackend):
+    """
+    内存LRU + SQLite磁盘的两级缓存
+
+    get 先查内存，未命中再查磁盘并回填内存；set 同时写入两级。
+    进程重启后内存为空，可从磁盘恢复已缓存的结果。
+    """
+
+    def __init__(self, memory: LRUCache, disk: SQLiteCache):
+        """
+        初始化两级缓存
+
+        参数:
+            memory: 内存LRU缓存
+            disk: SQLite磁盘缓存
+        """
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: Any) -> Optional[Any]:
+        """获取缓存项，内存未命中时从磁盘读取并回填"""
+        value = self.get_or_miss(key)
+        return None if value is _MISS else value
+
+    def get_or_miss(self, key: Any) -> Any:
+        """获取缓存项，两级均未命中时返回 _MISS"""
+        value = self.memory.get_or_miss(key)
+        if value is not _MISS:
+            return value
+
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return _MISS
+
+        # 回填内存时沿用磁盘项的剩余有效期
+        value, expire_time = entry
+        ttl = None if expire_time is None else expire_time - time.time()
+        self.memory.set(key, value, ttl)
+        return value
+
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None
+    ) -> None:
+        """同时写入内存和磁盘，重算成本只作用于内存层的淘汰"""
+        self.memory.set(key, value, ttl, cost)
+        self.disk.set(key, value, ttl)
+
+    def delete(self, key: Any) -> bool:
+        """从两级缓存中删除"""
+        deleted_memory = self.memory.delete(key)
+        deleted_disk = self.disk.delete(key)
+        return deleted_memory or deleted_disk
+
+    def clear(self) -> None:
+        """清空两级缓存"""
+        self.memory.clear()
+        self.disk.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息，current_size 以内存层为准"""
+        stats = self.memory.get_stats()
+        stats["backend_type"] = "tiered"
+        stats["disk"] = self.disk.get_stats()
+        return stats
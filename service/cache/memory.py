@@ -2,27 +2,137 @@
 内存缓存实现 - 基于LRU策略的内存缓存
 
 该模块提供了高效的内存缓存实现，特点：
-- LRU（最近最少使用）淘汰策略
+- LRU（最近最少使用）淘汰策略，结合命中次数与重算成本选择淘汰项，已过期项优先淘汰
 - 支持TTL过期时间
 - 自动清理过期项
 - 内存占用可控
+- 过期时间最小堆，清理过期项只需弹出已到期的堆顶
+- ShardedLRUCache: 按键哈希分片的线程安全LRU缓存，降低并发访问的锁竞争
 """
 
+import heapq
+import itertools
+import math
+import sys
+import threading
 import time
-from typing import Any, Dict, Optional, Tuple
-from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter
 import logging
 
-from .base import CacheBackend
+from .base import _MISS, CacheBackend
+
+# 常见值类型的大小公式：基础开销在导入时测得一次，与 sys.getsizeof 结果一致，
+# 省去逐项调用 getsizeof 的分派开销；ASCII 字符串每字符 1 字节，其余走 getsizeof
+_STR_BASE = sys.getsizeof("")
+_BYTES_BASE = sys.getsizeof(b"")
+_FLOAT_SIZE = sys.getsizeof(0.0)
+_SIZE_FUNCS = {
+    str: lambda o: _STR_BASE + len(o) if o.isascii() else sys.getsizeof(o),
+    bytes: lambda o: _BYTES_BASE + len(o),
+    float: lambda o: _FLOAT_SIZE,
+}
+
+
+class _ExpiryHeap:
+    """
+    缓存项过期时间的最小堆
+
+    堆项为 (expire_time, seq, key)，seq 保证过期时间相同时不比较键。
+    删除和更新缓存项时不同步修改堆，弹出时与缓存中当前的过期时间
+    比对，不一致的堆项视为已失效直接丢弃（惰性删除）。
+    """
+
+    __slots__ = ("_heap", "_counter")
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._counter = itertools.count()
+
+    def push(
+        self, expire_time: float, key: Any, cache: Dict[Any, Tuple[Any, float]]
+    ) -> None:
+        """记录缓存项的过期时间，失效堆项过多时按缓存当前内容重建"""
+        heap = self._heap
+        heapq.heappush(heap, (expire_time, next(self._counter), key))
+        if len(heap) > 2 * len(cache) + 16:
+            self._heap = [
+                (entry[1], next(self._counter), k)
+                for k, entry in cache.items()
+                if entry[1] is not None
+            ]
+            heapq.heapify(self._heap)
+
+    def peek_valid(self, cache: Dict[Any, Tuple[Any, float]]) -> Optional[Any]:
+        """返回过期时间最早的有效缓存键，丢弃沿途的失效堆项"""
+        heap = self._heap
+        while heap:
+            expire_time, _, key = heap[0]
+            entry = cache.get(key)
+            if entry is not None and entry[1] == expire_time:
+                return key
+            heapq.heappop(heap)
+        return None
+
+    def pop_expired(
+        self, now: float, cache: Dict[Any, Tuple[Any, float]]
+    ) -> List[Any]:
+        """弹出所有已到期的堆项，返回其中仍然有效的缓存键"""
+        heap = self._heap
+        expired = []
+        while heap and heap[0][0] <= now:
+            expire_time, _, key = heapq.heappop(heap)
+            entry = cache.get(key)
+            if entry is not None and entry[1] == expire_time:
+                expired.append(key)
+        return expired
+
+    def count_expired(
+        self, now: float, cache: Dict[Any, Tuple[Any, float]]
+    ) -> int:
+        """
+        统计已到期的有效缓存项数量，不修改堆
+
+        从堆顶向下遍历，子节点的过期时间不早于父节点，
+        未到期的节点整棵子树都可跳过，只访问已到期的堆项。
+        """
+        heap = self._heap
+        count = 0
+        stack = [0] if heap else []
+        while stack:
+            index = stack.pop()
+            expire_time, _, key = heap[index]
+            if expire_time > now:
+                continue
+            entry = cache.get(key)
+            if entry is not None and entry[1] == expire_time:
+                count += 1
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    stack.append(child)
+        return count
+
+    def clear(self) -> None:
+        """清空堆"""
+        self._heap.clear()
 
 
 class LRUCache(CacheBackend):
     """
     基于LRU策略的内存缓存实现
     
-    使用OrderedDict保持访问顺序，实现高效的LRU淘汰。
-    每个缓存项存储格式: (value, expire_time)
+    使用普通 dict 的插入顺序表示访问顺序（最久未使用的项在最前），
+    访问时弹出并重新插入到末尾。每个缓存项存储格式: (value, expire_time)
+    所有操作由实例锁保护，可在多线程间共享。
+
+    缓存满时先清理已过期项；仍然满时，从最久未使用的 10% 项中淘汰价值最低的一项。
+    价值为重算成本 ×（命中次数 + 1），即该项预计能节省的重算时间；
+    命中次数每写入 max_size 个新项减半，过去的热点不会永久占位。
+    新项总是被接纳。
     """
+
+    # 淘汰候选区占缓存容量的比例（按最近使用顺序最冷的部分）
+    EVICTION_WINDOW_RATIO = 0.1
     
     def __init__(self, max_size: int = 100):
         """
@@ -35,7 +145,18 @@ class LRUCache(CacheBackend):
             raise ValueError("max_size必须大于0")
             
         self.max_size = max_size
-        self.cache: OrderedDict[Any, Tuple[Any, Optional[float]]] = OrderedDict()
+        self.cache: Dict[Any, Tuple[Any, Optional[float]]] = {}
+        self._hits: Counter = Counter()
+        # 上次命中次数衰减以来写入的新项数
+        self._inserts_since_decay = 0
+        self._cost: Dict[Any, float] = {}
+        self._expiry = _ExpiryHeap()
+        # 各项的估算大小及其总和，写入和删除时增量维护，统计时无需遍历
+        self._sizes: Dict[Any, int] = {}
+        self._memory_estimate = 0
+        # 读取也会调整访问顺序和命中计数，读写操作统一加锁；
+        # 使用可重入锁，set/cleanup_expired 内部可直接调用 delete
+        self._lock = threading.RLock()
         self._logger = logging.getLogger(__name__)
         
         self._logger.info(f"初始化LRU缓存，最大容量: {max_size}")
@@ -50,23 +171,41 @@ class LRUCache(CacheBackend):
         返回:
             缓存的值，如果不存在或已过期则返回None
         """
-        if key not in self.cache:
-            return None
+        value = self.get_or_miss(key)
+        return None if value is _MISS else value
+
+    def get_or_miss(self, key: Any) -> Any:
+        """获取缓存项，不存在或已过期时返回 _MISS"""
+        with self._lock:
+            # 缓存项总是 (value, expire_time) 元组，弹出即可区分未命中
+            cache = self.cache
+            entry = cache.pop(key, None)
+            if entry is None:
+                return _MISS
             
-        value, expire_time = self.cache[key]
+            value, expire_time = entry
         
-        # 检查是否过期
-        if expire_time is not None and time.time() >= expire_time:
-            # 已过期，删除并返回None
-            self.delete(key)
-            self._logger.debug(f"缓存项已过期: {key}")
-            return None
+            # 检查是否过期
+            if expire_time is not None and time.time() >= expire_time:
+                # 已过期，项已弹出，清理附属记录并返回未命中
+                self._hits.pop(key, None)
+                self._cost.pop(key, None)
+                self._memory_estimate -= self._sizes.pop(key, 0)
+                self._logger.debug("缓存项已过期: %s", key)
+                return _MISS
         
-        # 更新LRU顺序（移到末尾表示最近使用）
-        self.cache.move_to_end(key)
-        return value
+            # 重新插入到末尾表示最近使用
+            cache[key] = entry
+            self._hits[key] += 1
+            return value
     
-    def set(self, key: Any, value: Any, ttl: Optional[int] = None) -> None:
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None
+    ) -> None:
         """
         设置缓存项，可选TTL（秒）
         
@@ -74,27 +213,41 @@ class LRUCache(CacheBackend):
             key: 缓存键
             value: 要缓存的值
             ttl: 可选的过期时间（秒），None表示永不过期
+            cost: 可选的重算成本（秒），用于淘汰和接纳决策
         """
-        # 计算过期时间
-        expire_time = None if ttl is None else time.time() + ttl
+        with self._lock:
+            # 计算过期时间
+            expire_time = None if ttl is None else time.time() + ttl
         
-        # 如果键已存在，直接更新
-        if key in self.cache:
-            self.cache[key] = (value, expire_time)
-            self.cache.move_to_end(key)
-            self._logger.debug(f"更新缓存项: {key}")
-            return
+            # 如果键已存在，弹出后重新插入到末尾
+            if self.cache.pop(key, None) is not None:
+                self.cache[key] = (value, expire_time)
+                self._track_size(key, value)
+                if cost is not None:
+                    self._cost[key] = cost
+                if expire_time is not None:
+                    self._expiry.push(expire_time, key, self.cache)
+                self._logger.debug("更新缓存项: %s", key)
+                return
         
-        # 如果缓存已满，移除最久未使用的项（第一项）
-        if len(self.cache) >= self.max_size:
-            oldest_key = next(iter(self.cache))
-            self.delete(oldest_key)
-            self._logger.debug(f"缓存已满，淘汰最久未使用项: {oldest_key}")
+            # 如果缓存已满，先清理已过期项，仍然满时从最冷的候选区中淘汰价值最低的项
+            if len(self.cache) >= self.max_size:
+                for expired_key in self._expiry.pop_expired(time.time(), self.cache):
+                    self.delete(expired_key)
+            if len(self.cache) >= self.max_size:
+                victim_key = self._select_victim()
+                self.delete(victim_key)
+                self._logger.debug("缓存已满，淘汰低价值项: %s", victim_key)
+            self._decay_hits()
         
-        # 添加新项
-        self.cache[key] = (value, expire_time)
-        self.cache.move_to_end(key)
-        self._logger.debug(f"添加新缓存项: {key}, TTL={ttl}")
+            # 添加新项（新键插入即位于末尾，无需再调整顺序）
+            if cost is not None:
+                self._cost[key] = cost
+            self.cache[key] = (value, expire_time)
+            self._track_size(key, value)
+            if expire_time is not None:
+                self._expiry.push(expire_time, key, self.cache)
+            self._logger.debug("添加新缓存项: %s, TTL=%s", key, ttl)
     
     def delete(self, key: Any) -> bool:
         """
@@ -106,17 +259,28 @@ class LRUCache(CacheBackend):
         返回:
             是否成功删除
         """
-        if key in self.cache:
-            del self.cache[key]
-            self._logger.debug(f"删除缓存项: {key}")
-            return True
-        return False
+        with self._lock:
+            if key in self.cache:
+                del self.cache[key]
+                self._hits.pop(key, None)
+                self._cost.pop(key, None)
+                self._memory_estimate -= self._sizes.pop(key, 0)
+                self._logger.debug("删除缓存项: %s", key)
+                return True
+            return False
     
     def clear(self) -> None:
         """清空所有缓存"""
-        count = len(self.cache)
-        self.cache.clear()
-        self._logger.info(f"清空缓存，删除 {count} 个项")
+        with self._lock:
+            count = len(self.cache)
+            self.cache.clear()
+            self._hits.clear()
+            self._inserts_since_decay = 0
+            self._cost.clear()
+            self._expiry.clear()
+            self._sizes.clear()
+            self._memory_estimate = 0
+            self._logger.info(f"清空缓存，删除 {count} 个项")
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -125,33 +289,49 @@ class LRUCache(CacheBackend):
         返回:
             包含缓存统计数据的字典
         """
-        # 计算有效缓存项数量（排除已过期项）
-        current_time = time.time()
-        valid_items = 0
-        expired_items = 0
+        with self._lock:
+            # 已过期项只需遍历过期堆中已到期的部分，内存估算为增量维护的总和
+            current_size = len(self.cache)
+            expired_items = self._expiry.count_expired(time.time(), self.cache)
         
-        for value, expire_time in self.cache.values():
-            if expire_time is None or expire_time > current_time:
-                valid_items += 1
-            else:
-                expired_items += 1
-        
-        # 计算内存使用估算（粗略估计）
-        memory_estimate = sum(
-            self._estimate_size(key) + self._estimate_size(value)
-            for key, (value, _) in self.cache.items()
-        )
-        
-        return {
-            "backend_type": "lru_memory",
-            "max_size": self.max_size,
-            "current_size": len(self.cache),
-            "valid_items": valid_items,
-            "expired_items": expired_items,
-            "usage_ratio": round(len(self.cache) / self.max_size * 100, 2),
-            "memory_estimate_bytes": memory_estimate
-        }
+            return {
+                "backend_type": "lru_memory",
+                "max_size": self.max_size,
+                "current_size": current_size,
+                "valid_items": current_size - expired_items,
+                "expired_items": expired_items,
+                "usage_ratio": round(current_size / self.max_size * 100, 2),
+                "memory_estimate_bytes": self._memory_estimate
+            }
     
+    def _score_of(self, key: Any) -> float:
+        """缓存项价值：重算成本 ×（命中次数 + 1），未提供成本的项价值为 0"""
+        return self._cost.get(key, 0.0) * (self._hits.get(key, 0) + 1)
+
+    def _decay_hits(self) -> None:
+        """每写入 max_size 个新项将命中次数减半（调用方持有锁）"""
+        self._inserts_since_decay += 1
+        if self._inserts_since_decay < self.max_size:
+            return
+        self._inserts_since_decay = 0
+        self._hits = Counter({k: n >> 1 for k, n in self._hits.items() if n > 1})
+
+    def _select_victim(self) -> Any:
+        """在最久未使用的候选区中选择价值最低的项，价值相同时淘汰更冷的项"""
+        window = max(1, int(len(self.cache) * self.EVICTION_WINDOW_RATIO))
+        candidates = []
+        for key in self.cache:
+            candidates.append(key)
+            if len(candidates) >= window:
+                break
+        return min(candidates, key=self._score_of)
+
+    def _track_size(self, key: Any, value: Any) -> None:
+        """记录缓存项的估算大小并更新总和（调用方持有锁）"""
+        size = self._estimate_size(key) + self._estimate_size(value)
+        self._memory_estimate += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
     def _estimate_size(self, obj: Any) -> int:
         """
         粗略估算对象大小（字节）
@@ -162,8 +342,10 @@ class LRUCache(CacheBackend):
         返回:
             估算的字节数
         """
+        size_func = _SIZE_FUNCS.get(type(obj))
+        if size_func is not None:
+            return size_func(obj)
         try:
-            import sys
             return sys.getsizeof(obj)
         except Exception:
             # 如果无法获取大小，返回默认值
@@ -173,17 +355,15 @@ class LRUCache(CacheBackend):
         """
         清理所有已过期的缓存项
         
+        只弹出已到期的堆顶，不遍历全部缓存项。
+        
         返回:
             清理的项数
         """
-        current_time = time.time()
-        expired_keys = [
-            key for key, (_, expire_time) in self.cache.items()
-            if expire_time is not None and expire_time <= current_time
-        ]
-        
-        for key in expired_keys:
-            self.delete(key)
+        with self._lock:
+            expired_keys = self._expiry.pop_expired(time.time(), self.cache)
+            for key in expired_keys:
+                self.delete(key)
         
         if expired_keys:
             self._logger.info(f"清理了 {len(expired_keys)} 个过期缓存项")
@@ -191,6 +371,116 @@ class LRUCache(CacheBackend):
         return len(expired_keys)
 
 
+class ShardedLRUCache(CacheBackend):
+    """
+    分片的线程安全LRU缓存
+
+    由多个 LRUCache 组成，键按 hash(key) 路由到固定分片，
+    每个分片使用自己的实例锁。并发访问不同分片的键互不阻塞，
+    适用于并行生成数据字典等多线程访问的高频缓存。
+    LRU顺序和淘汰在分片内独立进行。
+
+    分片数随容量缩放，保证每个分片至少 MIN_SHARD_SIZE 项：
+    容量很小时分片过多会让同一分片的热点键在缓存远未满时互相淘汰。
+    """
+
+    # 最大分片数量，必须是2的幂以便用位运算路由
+    SHARD_COUNT = 16
+    # 每个分片的最小容量
+    MIN_SHARD_SIZE = 16
+
+    def __init__(self, max_size: int = 100):
+        """
+        初始化分片LRU缓存
+
+        参数:
+            max_size: 最大缓存项数量，平均分配到各分片
+        """
+        if max_size <= 0:
+            raise ValueError("max_size必须大于0")
+
+        # 分片数取不超过 max_size // MIN_SHARD_SIZE 的最大2的幂，上限 SHARD_COUNT
+        shard_count = min(self.SHARD_COUNT, max(1, max_size // self.MIN_SHARD_SIZE))
+        shard_count = 1 << (shard_count.bit_length() - 1)
+        shard_size = math.ceil(max_size / shard_count)
+        self.max_size = max_size
+        self.shard_count = shard_count
+        self._mask = shard_count - 1
+        self._shards = [LRUCache(max_size=shard_size) for _ in range(shard_count)]
+        self._logger = logging.getLogger(__name__)
+
+        self._logger.info(
+            f"初始化分片LRU缓存，最大容量: {max_size}，分片数: {shard_count}"
+        )
+
+    def _route(self, key: Any) -> LRUCache:
+        """返回键所在的分片"""
+        return self._shards[hash(key) & self._mask]
+
+    def get(self, key: Any) -> Optional[Any]:
+        """获取缓存项，如存在且未过期则返回"""
+        value = self.get_or_miss(key)
+        return None if value is _MISS else value
+
+    def get_or_miss(self, key: Any) -> Any:
+        """获取缓存项，不存在或已过期时返回 _MISS"""
+        return self._route(key).get_or_miss(key)
+
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None
+    ) -> None:
+        """设置缓存项，淘汰和接纳在键所在分片内进行"""
+        self._route(key).set(key, value, ttl, cost)
+
+    def delete(self, key: Any) -> bool:
+        """删除缓存项"""
+        return self._route(key).delete(key)
+
+    def clear(self) -> None:
+        """清空所有分片"""
+        for shard in self._shards:
+            shard.clear()
+
+    def cleanup_expired(self) -> int:
+        """
+        清理所有分片中已过期的缓存项
+
+        返回:
+            清理的项数
+        """
+        return sum(shard.cleanup_expired() for shard in self._shards)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息，汇总各分片的数据
+
+        返回:
+            包含缓存统计数据的字典
+        """
+        current_size = valid_items = expired_items = memory_estimate = 0
+        for shard in self._shards:
+            shard_stats = shard.get_stats()
+            current_size += shard_stats["current_size"]
+            valid_items += shard_stats["valid_items"]
+            expired_items += shard_stats["expired_items"]
+            memory_estimate += shard_stats["memory_estimate_bytes"]
+
+        return {
+            "backend_type": "sharded_lru",
+            "max_size": self.max_size,
+            "shard_count": self.shard_count,
+            "current_size": current_size,
+            "valid_items": valid_items,
+            "expired_items": expired_items,
+            "usage_ratio": round(current_size / self.max_size * 100, 2),
+            "memory_estimate_bytes": memory_estimate
+        }
+
+
 class TTLCache(CacheBackend):
     """
     基于TTL的简单缓存实现
@@ -209,44 +499,52 @@ class TTLCache(CacheBackend):
         self.max_size = max_size
         self.default_ttl = default_ttl
         self.cache: Dict[Any, Tuple[Any, float]] = {}
+        self._expiry = _ExpiryHeap()
         self._logger = logging.getLogger(__name__)
         
         self._logger.info(f"初始化TTL缓存，最大容量: {max_size}, 默认TTL: {default_ttl}秒")
     
     def get(self, key: Any) -> Optional[Any]:
         """获取缓存项，如存在且未过期则返回"""
+        value = self.get_or_miss(key)
+        return None if value is _MISS else value
+
+    def get_or_miss(self, key: Any) -> Any:
+        """获取缓存项，不存在或已过期时返回 _MISS"""
         if key not in self.cache:
-            return None
+            return _MISS
             
         value, expire_time = self.cache[key]
         
         # 检查是否过期
         if time.time() >= expire_time:
             self.delete(key)
-            return None
+            return _MISS
         
         return value
     
-    def set(self, key: Any, value: Any, ttl: Optional[int] = None) -> None:
-        """设置缓存项"""
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None
+    ) -> None:
+        """设置缓存项，所有项按过期时间管理，忽略cost"""
         if ttl is None:
             ttl = self.default_ttl
         
         expire_time = time.time() + ttl
         
-        # 如果缓存已满，随机删除一项（简单实现）
+        # 如果缓存已满，删除过期时间最早的项（已过期的项总是最先被删除）
         if len(self.cache) >= self.max_size and key not in self.cache:
-            # 删除第一个过期项，如果没有过期项则删除第一项
-            for k, (_, exp_time) in list(self.cache.items()):
-                if time.time() >= exp_time:
-                    self.delete(k)
-                    break
-            else:
-                # 没有过期项，删除第一项
-                first_key = next(iter(self.cache))
-                self.delete(first_key)
+            earliest_key = self._expiry.peek_valid(self.cache)
+            if earliest_key is None:
+                earliest_key = next(iter(self.cache))
+            self.delete(earliest_key)
         
         self.cache[key] = (value, expire_time)
+        self._expiry.push(expire_time, key, self.cache)
     
     def delete(self, key: Any) -> bool:
         """删除缓存项"""
@@ -258,6 +556,7 @@ class TTLCache(CacheBackend):
     def clear(self) -> None:
         """清空缓存"""
         self.cache.clear()
+        self._expiry.clear()
     
     def get_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
@@ -0,0 +1,67 @@
+"""
+SQL 规范化工具 - 将语义等价的 SQL 映射为同一缓存键
+
+该模块提供：
+- 空白规范化：折叠字面量之外的多余空白、去除末尾分号
+- 查询指纹：在空白规范化基础上转小写，并将字面量、数字、IN 列表替换为 ?
+"""
+
+import re
+
+
+# 字符串字面量与带引号的标识符，规范化时原样保留
+_QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_NUMBER_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_PATTERN = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+def normalize_sql(sql: str, mask_literals: bool = False) -> str:
+    """
+    规范化 SQL 文本，用于生成缓存键
+
+    默认只折叠字面量之外的空白并去除末尾分号，不改变 SQL 语义。
+    mask_literals=True 时生成查询指纹：转小写，字符串字面量和数字替换为 ?，
+    IN 列表折叠为 in (?)。指纹会把不同取值的查询映射为同一个键，
+    只适用于缓存结果与字面量取值无关的场景。
+
+    参数:
+        sql: 原始 SQL 文本
+        mask_literals: 是否生成忽略字面量取值的查询指纹
+
+    返回:
+        规范化后的 SQL 文本
+
+    示例:
+        >>> normalize_sql("SELECT *  FROM users\\n WHERE name = 'Tom' ;")
+        "SELECT * FROM users WHERE name = 'Tom'"
+        >>> normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3)", mask_literals=True)
+        "select * from t where id in (?)"
+    """
+    if not sql or not isinstance(sql, str):
+        return ""
+
+    parts = []
+    last_end = 0
+    for match in _QUOTED_PATTERN.finditer(sql):
+        parts.append(_normalize_unquoted(sql[last_end:match.start()], mask_literals))
+        quoted = match.group(0)
+        if mask_literals and quoted.startswith("'"):
+            parts.append("?")
+        else:
+            parts.append(quoted)
+        last_end = match.end()
+    parts.append(_normalize_unquoted(sql[last_end:], mask_literals))
+
+    normalized = "".join(parts).strip()
+    if mask_literals:
+        normalized = _IN_LIST_PATTERN.sub("in (?)", normalized)
+    return normalized.rstrip("; ").strip()
+
+
+def _normalize_unquoted(segment: str, mask_literals: bool) -> str:
+    """规范化字面量之外的 SQL 片段"""
+    segment = _WHITESPACE_PATTERN.sub(" ", segment)
+    if mask_literals:
+        segment = _NUMBER_PATTERN.sub("?", segment.lower())
+    return segment
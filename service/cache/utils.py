@@ -9,7 +9,62 @@
 
 import re
 import hashlib
-from typing import Any, List
+import pickle
+from typing import Any, List, Sequence, Tuple
+
+# xxhash 为可选依赖：缓存键只需要指纹分布均匀，不需要密码学强度，
+# 安装后使用更快的 XXH3-128，否则使用标准库的 BLAKE2b-128。
+# 两者的十六进制摘要都是 32 位，与原先的 MD5 键长度一致
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+# 查询规范化时移除的常见无意义词
+_STOPWORDS = (
+    "请", "帮我", "查询", "获取", "告诉我", "我想",
+    "能否", "可以", "如何", "怎么", "帮忙"
+)
+
+# 规范化用的正则在模块加载时编译一次；停用词合并为一个交替模式，
+# 一次扫描即可移除全部停用词（长词优先匹配）
+_WS_RE = re.compile(r'\s+')
+# 需要折叠的空白：连续空白或非空格的空白字符（制表符、换行等）
+_UNNORMALIZED_WS_RE = re.compile(r'\s{2,}|[^\S ]')
+_STOPWORDS_RE = re.compile(
+    '|'.join(re.escape(word) for word in sorted(_STOPWORDS, key=len, reverse=True))
+)
+
+
+# 可直接用 repr 拼接键的标量类型（repr 区分类型且会转义分隔符）
+_SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+def _hex_digest(data: bytes) -> str:
+    """计算字节数据的 128 位十六进制指纹"""
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _key_payload(args: Sequence[Any], items: Sequence[Tuple[Any, Any]]) -> bytes:
+    """
+    将位置参数和已排序的键值对序列化为计算指纹用的字节串
+
+    全部为标量时用 repr 以 \\x00 分隔拼接；否则使用 pickle 协议 5 直接得到字节，
+    不对大对象调用 __str__；无法序列化时回退到字符串表示。
+    """
+    if all(type(arg) in _SCALAR_TYPES for arg in args) and all(
+        type(value) in _SCALAR_TYPES for _, value in items
+    ):
+        return "\x00".join(
+            [repr(arg) for arg in args] + [f"{k!r}={v!r}" for k, v in items]
+        ).encode('utf-8')
+    try:
+        return pickle.dumps((tuple(args), tuple(items)), protocol=5)
+    except Exception:
+        return (str(tuple(args)) + str(list(items))).encode('utf-8')
 
 
 def normalize_query(query: str, remove_stopwords: bool = True) -> str:
@@ -32,20 +87,17 @@ def normalize_query(query: str, remove_stopwords: bool = True) -> str:
     if not query or not isinstance(query, str):
         return ""
     
-    # 移除多余空格、转为小写
-    normalized = re.sub(r'\s+', ' ', query).lower().strip()
+    # 移除多余空格、转为小写；已是小写（或不含大小写字符）且空白规整的查询
+    # 直接复用原字符串，重复的相同查询不产生新的字符串
+    normalized = query.strip()
+    if not normalized.islower():
+        normalized = normalized.lower()
+    if _UNNORMALIZED_WS_RE.search(normalized):
+        normalized = _WS_RE.sub(' ', normalized)
     
-    # 移除常见的无意义词
-    if remove_stopwords:
-        stopwords = [
-            "请", "帮我", "查询", "获取", "告诉我", "我想", 
-            "能否", "可以", "如何", "怎么", "帮忙"
-        ]
-        for word in stopwords:
-            normalized = normalized.replace(word, "")
-        
-        # 再次清理空格
-        normalized = re.sub(r'\s+', ' ', normalized).strip()
+    # 一次扫描移除常见的无意义词，再次清理空格；不含停用词时跳过替换
+    if remove_stopwords and _STOPWORDS_RE.search(normalized):
+        normalized = _WS_RE.sub(' ', _STOPWORDS_RE.sub('', normalized)).strip()
     
     return normalized
 
@@ -54,7 +106,7 @@ def generate_hash_key(*args: Any, **kwargs: Any) -> str:
     """
     生成参数的哈希键
     
-    将所有位置参数和关键字参数转换为字符串并计算MD5哈希，
+    将所有位置参数和关键字参数序列化后计算128位指纹，
     用于生成稳定的缓存键。
     
     参数:
@@ -62,20 +114,14 @@ def generate_hash_key(*args: Any, **kwargs: Any) -> str:
         **kwargs: 关键字参数
         
     返回:
-        MD5哈希值（32位十六进制字符串）
+        XXH3-128 或 BLAKE2b-128 指纹（32位十六进制字符串）
         
     示例:
         >>> generate_hash_key("user", 123, action="query")
         "a1b2c3d4e5f6..."
     """
-    # 将所有参数转换为字符串并合并
     # 对kwargs排序以确保相同参数产生相同哈希
-    args_str = str(args)
-    kwargs_str = str(sorted(kwargs.items()))
-    combined = args_str + kwargs_str
-    
-    # 计算MD5哈希
-    return hashlib.md5(combined.encode('utf-8')).hexdigest()
+    return _hex_digest(_key_payload(args, sorted(kwargs.items())))
 
 
 def generate_cache_key(prefix: str, *args: Any, **kwargs: Any) -> str:
@@ -115,9 +161,7 @@ def create_cache_key_from_dict(prefix: str, params: dict) -> str:
     """
     # 对字典键排序以确保稳定性
     sorted_items = sorted(params.items())
-    combined = str(sorted_items)
-    hash_key = hashlib.md5(combined.encode('utf-8')).hexdigest()
-    return f"{prefix}:{hash_key}"
+    return f"{prefix}:{_hex_digest(_key_payload((), sorted_items))}"
 
 
 def sanitize_cache_key(key: str, max_length: int = 250) -> str:
@@ -142,7 +186,7 @@ def sanitize_cache_key(key: str, max_length: int = 250) -> str:
         
         prefix = sanitized[:prefix_len]
         suffix = sanitized[-suffix_len:]
-        middle_hash = hashlib.md5(sanitized.encode('utf-8')).hexdigest()[:16]
+        middle_hash = _hex_digest(sanitized.encode('utf-8'))[:16]
         
         sanitized = f"{prefix}_{middle_hash}_{suffix}"
     
@@ -177,7 +221,7 @@ def batch_normalize_queries(queries: List[str]) -> List[str]:
     返回:
         规范化后的查询字符串列表
     """
-    return [normalize_query(q) for q in queries]
+    return list(map(normalize_query, queries))
 
 
 def is_cache_key_valid(key: Any) -> bool:
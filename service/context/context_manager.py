@@ -7,6 +7,7 @@
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import logging
+import threading
 import uuid
 
 from .models import UserContext, Conversation
@@ -23,6 +24,8 @@ class ContextManager:
     
     # 类级别的单例存储实例，所有ContextManager实例共享同一个存储
     _shared_storage: Optional[ContextStorage] = None
+    # 保护共享存储的首次创建，避免并发初始化时创建多个实例
+    _shared_storage_lock = threading.Lock()
     
     def __init__(self, storage: Optional[ContextStorage] = None):
         """
@@ -31,10 +34,12 @@ class ContextManager:
         Args:
             storage: 上下文存储实现，默认使用共享的内存存储
         """
-        # 如果没有提供storage且没有共享存储，创建一个
+        # 如果没有提供storage且没有共享存储，创建一个（双重检查，创建后不再加锁）
         if storage is None:
             if ContextManager._shared_storage is None:
-                ContextManager._shared_storage = MemoryContextStorage()
+                with ContextManager._shared_storage_lock:
+                    if ContextManager._shared_storage is None:
+                        ContextManager._shared_storage = MemoryContextStorage()
             self.storage = ContextManager._shared_storage
         else:
             self.storage = storage
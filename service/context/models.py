@@ -4,26 +4,33 @@
 定义对话和用户上下文的数据结构
 """
 
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Deque, Dict, List, Optional, Any
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class Conversation:
     """单轮对话数据模型"""
     
     query: str  # 用户问题
     sql: str    # 生成的SQL
-    timestamp: datetime = field(default_factory=datetime.now)
+    timestamp: float = field(default_factory=time.time)  # Unix 时间戳（秒）
     metadata: Dict[str, Any] = field(default_factory=dict)  # 存储额外信息，如数据库方言、架构等
+
+    @property
+    def timestamp_dt(self) -> datetime:
+        """对话时间的 datetime 表示"""
+        return datetime.fromtimestamp(self.timestamp)
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式，便于存储和序列化"""
         return {
             "query": self.query,
             "sql": self.sql,
-            "timestamp": self.timestamp.timestamp(),
+            "timestamp": self.timestamp,
             "metadata": self.metadata
         }
     
@@ -32,9 +39,9 @@ class Conversation:
         """从字典创建对话实例"""
         ts = data.get("timestamp")
         if isinstance(ts, (int, float)):
-            timestamp = datetime.fromtimestamp(ts)
+            timestamp = float(ts)
         else:
-            timestamp = datetime.now()
+            timestamp = time.time()
             
         return cls(
             query=data.get("query", ""),
@@ -44,15 +51,35 @@ class Conversation:
         )
 
 
-@dataclass
+# 每个用户上下文最多保留的对话轮数，需大于工具允许的最大记忆窗口（10）；
+# 超出后最早的对话自动丢弃，长会话的内存占用保持恒定
+MAX_HISTORY = 32
+
+
+def _new_history() -> Deque[Conversation]:
+    """创建有界的对话历史队列"""
+    return deque(maxlen=MAX_HISTORY)
+
+
+@dataclass(slots=True)
 class UserContext:
     """用户上下文数据模型"""
     
     user_id: str
     tool_name: str = "text2sql"
-    conversations: List[Conversation] = field(default_factory=list)
-    created_at: datetime = field(default_factory=datetime.now)
-    last_access: datetime = field(default_factory=datetime.now)
+    conversations: Deque[Conversation] = field(default_factory=_new_history)
+    created_at: float = field(default_factory=time.time)   # Unix 时间戳（秒）
+    last_access: float = field(default_factory=time.time)  # Unix 时间戳（秒）
+    
+    @property
+    def created_at_dt(self) -> datetime:
+        """创建时间的 datetime 表示"""
+        return datetime.fromtimestamp(self.created_at)
+
+    @property
+    def last_access_dt(self) -> datetime:
+        """最后访问时间的 datetime 表示"""
+        return datetime.fromtimestamp(self.last_access)
     
     @property
     def context_key(self) -> str:
@@ -60,27 +87,34 @@ class UserContext:
         return f"{self.user_id}:{self.tool_name}"
     
     def add_conversation(self, conversation: Conversation) -> None:
-        """添加对话记录"""
+        """添加对话记录，超过 MAX_HISTORY 时自动丢弃最早的对话"""
         self.conversations.append(conversation)
-        self.last_access = datetime.now()
+        self.last_access = time.time()
     
     def get_recent_conversations(self, window_size: int) -> List[Conversation]:
-        """获取最近的对话记录"""
-        return self.conversations[-min(window_size, len(self.conversations)):]
+        """
+        获取最近的对话记录
+
+        先用 list() 一次性复制队列（在 C 层完成，期间不会被其他线程的 append 打断），
+        再切片取窗口；逐项迭代 deque 时并发追加会抛出 RuntimeError。
+        """
+        if window_size <= 0:
+            return []
+        return list(self.conversations)[-window_size:]
     
     def clear_conversations(self) -> None:
         """清空对话历史"""
-        self.conversations = []
-        self.last_access = datetime.now()
+        self.conversations.clear()
+        self.last_access = time.time()
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
         return {
             "user_id": self.user_id,
             "tool_name": self.tool_name,
-            "conversations": [conv.to_dict() for conv in self.conversations],
-            "created_at": self.created_at.timestamp(),
-            "last_access": self.last_access.timestamp()
+            "conversations": [conv.to_dict() for conv in list(self.conversations)],
+            "created_at": self.created_at,
+            "last_access": self.last_access
         }
     
     @classmethod
@@ -94,11 +128,11 @@ class UserContext:
         # 转换时间戳
         created_ts = data.get("created_at")
         if isinstance(created_ts, (int, float)):
-            user_context.created_at = datetime.fromtimestamp(created_ts)
+            user_context.created_at = float(created_ts)
             
         access_ts = data.get("last_access")
         if isinstance(access_ts, (int, float)):
-            user_context.last_access = datetime.fromtimestamp(access_ts)
+            user_context.last_access = float(access_ts)
             
         # 加载对话历史
         for conv_data in data.get("conversations", []):
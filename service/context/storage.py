@@ -6,8 +6,8 @@
 
 import abc
 import threading
-from typing import Dict, Optional
-from datetime import datetime, timedelta
+import time
+from typing import Dict, List, Optional, Tuple
 from .models import UserContext
 
 
@@ -36,63 +36,94 @@ class ContextStorage(abc.ABC):
 
 
 class MemoryContextStorage(ContextStorage):
-    """内存中的上下文存储实现"""
+    """
+    内存中的上下文存储实现
+
+    上下文按 hash(context_key) 分布到 SHARD_COUNT 个分片，每个分片有独立的锁，
+    不同用户的写操作互不阻塞；清理和统计逐个分片加锁，不会全局停顿。
+    """
+
+    # 访问时间的刷新间隔（秒）：过期判断以小时计，距上次刷新不足该间隔时不再写入
+    ACCESS_TOUCH_INTERVAL = 60
+    # 分片数量，必须是2的幂以便用位运算路由
+    SHARD_COUNT = 16
     
     def __init__(self):
-        # 上下文存储字典
-        self._contexts: Dict[str, UserContext] = {}
-        # 线程锁，保证线程安全
-        self._lock = threading.RLock()
+        # 上下文存储分片及各自的线程锁
+        self._shards: List[Dict[str, UserContext]] = [
+            {} for _ in range(self.SHARD_COUNT)
+        ]
+        self._locks = [threading.RLock() for _ in range(self.SHARD_COUNT)]
+        self._mask = self.SHARD_COUNT - 1
         # 上次清理时间
-        self._last_cleanup = datetime.now()
+        self._last_cleanup = time.time()
+
+    def _shard(self, context_key: str) -> Tuple[Dict[str, UserContext], threading.RLock]:
+        """返回上下文键所在的分片及其锁"""
+        index = hash(context_key) & self._mask
+        return self._shards[index], self._locks[index]
     
     def get_context(self, context_key: str) -> Optional[UserContext]:
-        """获取用户上下文"""
-        with self._lock:
-            context = self._contexts.get(context_key)
-            if context:
-                # 更新访问时间
-                context.last_access = datetime.now()
-            return context
+        """
+        获取用户上下文
+
+        读取不加锁：写操作只整体替换或删除字典项，单次 dict.get 是原子的，
+        并发读取互不阻塞。访问时间仅在距上次刷新超过刷新间隔时更新，
+        避免每次读取都写对象。
+        """
+        context = self._shards[hash(context_key) & self._mask].get(context_key)
+        if context:
+            now = time.time()
+            if now - context.last_access > self.ACCESS_TOUCH_INTERVAL:
+                context.last_access = now
+        return context
     
     def save_context(self, user_context: UserContext) -> bool:
         """保存用户上下文"""
-        with self._lock:
-            self._contexts[user_context.context_key] = user_context
+        context_key = user_context.context_key
+        contexts, lock = self._shard(context_key)
+        with lock:
+            contexts[context_key] = user_context
             return True
     
     def delete_context(self, context_key: str) -> bool:
         """删除上下文"""
-        with self._lock:
-            if context_key in self._contexts:
-                del self._contexts[context_key]
+        contexts, lock = self._shard(context_key)
+        with lock:
+            if context_key in contexts:
+                del contexts[context_key]
                 return True
             return False
     
     def cleanup_expired(self, max_age_seconds: int) -> int:
-        """清理过期的上下文"""
-        cutoff_time = datetime.now() - timedelta(seconds=max_age_seconds)
+        """清理过期的上下文，逐个分片加锁"""
+        cutoff_time = time.time() - max_age_seconds
         expired_count = 0
         
-        with self._lock:
-            expired_keys = [
-                key for key, context in self._contexts.items()
-                if context.last_access < cutoff_time
-            ]
-            
-            for key in expired_keys:
-                del self._contexts[key]
-                expired_count += 1
+        for contexts, lock in zip(self._shards, self._locks):
+            with lock:
+                expired_keys = [
+                    key for key, context in contexts.items()
+                    if context.last_access < cutoff_time
+                ]
+                
+                for key in expired_keys:
+                    del contexts[key]
+                expired_count += len(expired_keys)
                 
         return expired_count
     
     def get_stats(self) -> Dict[str, int]:
-        """获取存储统计信息"""
-        with self._lock:
-            total_conversations = sum(
-                len(ctx.conversations) for ctx in self._contexts.values()
-            )
-            return {
-                "total_contexts": len(self._contexts),
-                "total_conversations": total_conversations
-            }
+        """获取存储统计信息，逐个分片加锁汇总"""
+        total_contexts = 0
+        total_conversations = 0
+        for contexts, lock in zip(self._shards, self._locks):
+            with lock:
+                total_contexts += len(contexts)
+                total_conversations += sum(
+                    len(ctx.conversations) for ctx in contexts.values()
+                )
+        return {
+            "total_contexts": total_contexts,
+            "total_conversations": total_conversations
+        }
@@ -1,22 +1,114 @@
+import asyncio
+import datetime
+import functools
+import decimal
+import json
 import re
-from typing import Dict, List, Tuple, Optional
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
 from sqlalchemy import create_engine, text, event
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError, OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from urllib.parse import quote_plus
+from config import get_env_int
+from service.engine_cache import EngineCache, engine_cache_key
 from utils import normalize_dameng_schema_name, quote_dameng_identifier
 
-# 尝试导入达梦数据库驱动和 SQLAlchemy 方言，如果不存在则忽略
-try:
-    import dmPython
-    # 导入 dmSQLAlchemy 以注册 SQLAlchemy 方言
-    # dmSQLAlchemy 会自动注册 'dm' 方言到 SQLAlchemy
-    import dmSQLAlchemy
+# pandas 导入耗时较长（约 0.3 秒），只在 execute_query_df 中按需导入，
+# 仅做知识库检索或 JSON/markdown 输出的工具调用不再承担该开销
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@functools.lru_cache(maxsize=None)
+def _load_dameng_driver() -> bool:
+    """
+    首次连接达梦数据库时导入驱动和 SQLAlchemy 方言，返回是否可用
 
-    DAMENG_AVAILABLE = True
+    dmSQLAlchemy 导入时会自动注册 'dm' 方言到 SQLAlchemy；结果缓存，只尝试导入一次
+    """
+    try:
+        import dmPython  # noqa: F401
+        import dmSQLAlchemy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# orjson 为可选依赖：安装后 JSON 输出使用 orjson，否则使用标准库 json
+try:
+    import orjson
 except ImportError:
-    DAMENG_AVAILABLE = False
+    orjson = None
+
+# 提取 markdown 代码块中的 SQL，模块加载时编译一次
+_SQL_FENCE_RE = re.compile(r"```(?:sql)?\s*(.*?)\s*```", re.DOTALL)
+
+# PL/SQL 等过程块（Oracle/达梦的匿名块、存储过程定义）：末尾的 END; 属于语法本身，不能去除
+_SQL_BLOCK_RE = re.compile(
+    r"^(?:BEGIN|DECLARE|CREATE\s+(?:OR\s+REPLACE\s+)?"
+    r"(?:PROCEDURE|FUNCTION|TRIGGER|PACKAGE|TYPE)\b)",
+    re.IGNORECASE,
+)
+
+# 进程级引擎缓存：每次工具调用都会新建 DatabaseService，引擎（连接池）在实例和线程间共享，
+# 避免每次请求重复初始化方言和连接池；超出容量时释放最久未使用的连接池
+_engine_cache = EngineCache(max_size=get_env_int("SQLALCHEMY_ENGINE_CACHE_SIZE", 32))
+
+
+def _pool_args() -> Dict[str, int]:
+    """
+    连接池参数，可通过环境变量覆盖
+
+    SQLAlchemy 默认 pool_size=5、max_overflow=10，并发工具调用较多时会出现
+    "QueuePool limit ... reached" 并排队等待连接
+    """
+    return {
+        "pool_size": get_env_int("SQLALCHEMY_POOL_SIZE", 10),
+        "max_overflow": get_env_int("SQLALCHEMY_MAX_OVERFLOW", 20),
+        "pool_timeout": get_env_int("SQLALCHEMY_POOL_TIMEOUT", 30),
+        "pool_recycle": get_env_int("SQLALCHEMY_POOL_RECYCLE", 3600),  # 连接回收时间（秒）
+    }
+
+
+def _json_default(value: Any) -> Any:
+    """序列化 JSON 时处理数据库驱动返回的非标准类型"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8", errors="replace")
+    return str(value)
+
+
+def _markdown_cell(value: Any) -> str:
+    """将单元格值转换为 markdown 表格文本，转义竖线并把换行替换为空格"""
+    if value is None:
+        return ""
+    text_value = value if isinstance(value, str) else str(value)
+    if "|" in text_value:
+        text_value = text_value.replace("|", "\\|")
+    if "\n" in text_value or "\r" in text_value:
+        text_value = " ".join(text_value.splitlines())
+    return text_value
+
+
+def _to_markdown(results: List[Dict], columns: List[str]) -> str:
+    """
+    将查询结果写成 markdown 管道表格
+
+    单元格按原值输出：不像 tabulate 那样把数字字符串重新解析为浮点数
+    （会把已格式化的 "12345678.90" 变成 "1.23457e+07"），也不对齐填充空格。
+    """
+    lines = [
+        "| " + " | ".join(_markdown_cell(column) for column in columns) + " |",
+        "|" + "|".join("---" for _ in columns) + "|",
+    ]
+    for row in results:
+        lines.append(
+            "| " + " | ".join(_markdown_cell(row.get(column)) for column in columns) + " |"
+        )
+    return "\n".join(lines)
 
 
 class DatabaseService:
@@ -41,12 +133,39 @@ class DatabaseService:
         "doris": "doris+pymysql",  # Apache Doris (使用 MySQL 协议)
     }
 
+    # 异步驱动映射：未列出的数据库类型（或未安装对应驱动时）异步查询在线程池中执行同步路径
+    # oracledb 同一方言名在 create_async_engine 下自动选择其异步模式
+    DB_ASYNC_DRIVERS = {
+        "mysql": "mysql+aiomysql",
+        "postgresql": "postgresql+asyncpg",
+        "oracle": "oracle+oracledb",
+    }
+
+    # 流式读取结果集时每批从服务端拉取的行数
+    STREAM_BATCH_SIZE = 1000
+
+    # execute_query_df 每次由 pandas 读取的行数
+    DATAFRAME_CHUNK_SIZE = 50_000
+
+    # 引擎编译语句缓存的容量（SQLAlchemy 默认 500）
+    QUERY_CACHE_SIZE = 1200
+
     def __init__(self):
         """初始化数据库服务"""
-        self._engine_cache: Dict[str, Engine] = {}
+        # 同步引擎缓存在模块级共享，这里只记录本实例使用过的缓存键；
+        # 异步引擎绑定事件循环，仍按实例缓存
+        self._engine_keys: Set[str] = set()
+        self._async_engine_cache: Dict[str, AsyncEngine] = {}
 
     def _build_connection_uri(
-        self, db_type: str, host: str, port: int, user: str, password: str, dbname: str
+        self,
+        db_type: str,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        dbname: str,
+        driver: Optional[str] = None,
     ) -> str:
         """
         构建 SQLAlchemy 数据库连接 URI
@@ -58,6 +177,7 @@ class DatabaseService:
             user: 用户名
             password: 密码
             dbname: 数据库名
+            driver: 可选的 SQLAlchemy 方言+驱动名，默认取 DB_DRIVERS 中的同步驱动
 
         Returns:
             SQLAlchemy 连接 URI 字符串
@@ -72,7 +192,7 @@ class DatabaseService:
         encoded_password = quote_plus(password)
         encoded_user = quote_plus(user)
 
-        driver = self.DB_DRIVERS[db_type]
+        driver = driver or self.DB_DRIVERS[db_type]
 
         # 针对不同数据库类型构建 URI
         if db_type == "oracle":
@@ -80,7 +200,7 @@ class DatabaseService:
             return f"{driver}://{encoded_user}:{encoded_password}@{host}:{port}/?service_name={dbname}"
         elif db_type == "dameng":
             # 达梦数据库特殊处理
-            if not DAMENG_AVAILABLE:
+            if not _load_dameng_driver():
                 raise ValueError(
                     "DamengDB support requires dmPython package to be installed"
                 )
@@ -97,7 +217,7 @@ class DatabaseService:
         self, db_type: str, host: str, port: int, user: str, password: str, dbname: str
     ) -> Engine:
         """
-        获取或创建 SQLAlchemy 引擎（带缓存）
+        获取或创建 SQLAlchemy 引擎（进程级有界缓存，线程安全）
 
         Args:
             db_type: 数据库类型
@@ -110,51 +230,169 @@ class DatabaseService:
         Returns:
             SQLAlchemy Engine 实例
         """
-        # 创建缓存键（不包含密码以提高安全性）
-        cache_key = f"{db_type}://{user}@{host}:{port}/{dbname}"
+        # 创建缓存键（只含密码指纹，不含明文）；密码变更后使用新的引擎
+        cache_key = engine_cache_key(db_type, host, port, user, password, dbname)
+        self._engine_keys.add(cache_key)
+        return _engine_cache.get_or_create(
+            cache_key,
+            lambda: self._create_engine(db_type, host, port, user, password, dbname),
+        )
+
+    def _create_engine(
+        self, db_type: str, host: str, port: int, user: str, password: str, dbname: str
+    ) -> Engine:
+        """创建 SQLAlchemy 引擎及其连接池，由进程级缓存在未命中时调用"""
+        uri = self._build_connection_uri(
+            db_type, host, port, user, password, dbname
+        )
+
+        # 创建引擎配置
+        engine_args = {
+            "pool_pre_ping": True,  # 连接池健康检查
+            **_pool_args(),
+            # 编译语句缓存容量：相同 SQL 文本重复执行时跳过编译
+            "query_cache_size": self.QUERY_CACHE_SIZE,
+            "echo": False,  # 不输出 SQL 日志
+        }
+
+        # 针对特定数据库的额外配置
+        if db_type == "mysql" or db_type == "doris":
+            # MySQL 和 Doris 使用相同的字符集配置
+            engine_args["connect_args"] = {"charset": "utf8mb4"}
+        elif db_type == "postgresql":
+            # psycopg2 批量执行：INSERT 使用多 VALUES，其余语句使用 execute_batch
+            engine_args["executemany_mode"] = "values_plus_batch"
+        elif db_type == "mssql":
+            # SQL Server (pymssql) 配置：charset 使用小写 utf8
+            engine_args["connect_args"] = {"charset": "utf8"}
+        elif db_type == "oracle":
+            # Oracle 使用 thin 模式，需要在 connect_args 中配置
+            engine_args["connect_args"] = {"thick_mode_dsn_passthrough": False}
+        elif db_type == "dameng":
+            # 达梦 dmPython.connect() 只接受 host/port/user/password，不接受 database/encoding
+            # dbname 对应达梦 schema，通过 SQLAlchemy 事件监听器在连接建立后执行切 schema
+            pass
+
+        engine = create_engine(uri, **engine_args)
+
+        if db_type == "dameng":
+            normalized_dbname = normalize_dameng_schema_name(dbname)
+            quoted_dbname = quote_dameng_identifier(normalized_dbname)
+
+            @event.listens_for(engine, "connect")
+            def set_schema(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute(f"ALTER SESSION SET CURRENT_SCHEMA = {quoted_dbname}")
+                cursor.close()
+
+        return engine
 
-        if cache_key not in self._engine_cache:
+    def _get_or_create_async_engine(
+        self, db_type: str, host: str, port: int, user: str, password: str, dbname: str
+    ) -> AsyncEngine:
+        """
+        获取或创建 SQLAlchemy 异步引擎（带缓存）
+
+        异步连接池绑定创建它的事件循环，应在同一个长期运行的事件循环中使用。
+
+        Args:
+            db_type: 数据库类型，必须在 DB_ASYNC_DRIVERS 中
+            host: 主机地址
+            port: 端口号
+            user: 用户名
+            password: 密码
+            dbname: 数据库名
+
+        Returns:
+            SQLAlchemy AsyncEngine 实例
+
+        Raises:
+            ImportError: 未安装对应的异步驱动
+        """
+        # 创建缓存键（只含密码指纹，不含明文）
+        cache_key = engine_cache_key(db_type, host, port, user, password, dbname)
+
+        if cache_key not in self._async_engine_cache:
             uri = self._build_connection_uri(
-                db_type, host, port, user, password, dbname
+                db_type, host, port, user, password, dbname,
+                driver=self.DB_ASYNC_DRIVERS[db_type],
             )
 
-            # 创建引擎配置
             engine_args = {
                 "pool_pre_ping": True,  # 连接池健康检查
-                "pool_recycle": 3600,  # 连接回收时间（秒）
+                **_pool_args(),
+                "query_cache_size": self.QUERY_CACHE_SIZE,
                 "echo": False,  # 不输出 SQL 日志
             }
 
-            # 针对特定数据库的额外配置
-            if db_type == "mysql" or db_type == "doris":
-                # MySQL 和 Doris 使用相同的字符集配置
+            if db_type == "mysql":
                 engine_args["connect_args"] = {"charset": "utf8mb4"}
-            elif db_type == "mssql":
-                # SQL Server (pymssql) 配置：charset 使用小写 utf8
-                engine_args["connect_args"] = {"charset": "utf8"}
             elif db_type == "oracle":
-                # Oracle 使用 thin 模式，需要在 connect_args 中配置
                 engine_args["connect_args"] = {"thick_mode_dsn_passthrough": False}
-            elif db_type == "dameng":
-                # 达梦 dmPython.connect() 只接受 host/port/user/password，不接受 database/encoding
-                # dbname 对应达梦 schema，通过 SQLAlchemy 事件监听器在连接建立后执行切 schema
-                pass
 
-            engine = create_engine(uri, **engine_args)
+            self._async_engine_cache[cache_key] = create_async_engine(
+                uri, **engine_args
+            )
+
+        return self._async_engine_cache[cache_key]
+
+    @staticmethod
+    def _clean_sql(query: str) -> str:
+        """
+        清理 SQL 语句中的 markdown 格式，并去除末尾的一个语句结束符
+
+        普通语句末尾分号不影响语义，去除后仅差一个分号的相同查询共用编译语句缓存；
+        过程块（BEGIN/DECLARE/CREATE PROCEDURE 等）必须以 END; 结尾，保持原样。
+        不折叠语句内部的空白，以免改变字符串字面量。
 
-            if db_type == "dameng":
-                normalized_dbname = normalize_dameng_schema_name(dbname)
-                quoted_dbname = quote_dameng_identifier(normalized_dbname)
+        Raises:
+            ValueError: SQL 语句为空
+        """
+        # 不含代码块标记时不进入正则引擎
+        match = _SQL_FENCE_RE.search(query) if "```" in query else None
+        if match:
+            cleaned_sql = match.group(1).strip()
+        else:
+            cleaned_sql = query.strip()
+        if cleaned_sql.endswith(";") and not _SQL_BLOCK_RE.match(cleaned_sql):
+            cleaned_sql = cleaned_sql[:-1].rstrip()
 
-                @event.listens_for(engine, "connect")
-                def set_schema(dbapi_connection, connection_record):
-                    cursor = dbapi_connection.cursor()
-                    cursor.execute(f"ALTER SESSION SET CURRENT_SCHEMA = {quoted_dbname}")
-                    cursor.close()
+        if not cleaned_sql:
+            raise ValueError("SQL query cannot be empty.")
+        return cleaned_sql
 
-            self._engine_cache[cache_key] = engine
+    @classmethod
+    def _stream_options(cls, cleaned_sql: str) -> Dict[str, Any]:
+        """
+        查询语句的执行选项：只有普通 SELECT 使用服务端游标分批拉取
 
-        return self._engine_cache[cache_key]
+        PostgreSQL 的服务端游标是 DECLARE ... CURSOR FOR <语句>，
+        对 INSERT/UPDATE/DDL/SHOW 等语句会直接报错，这些语句使用普通游标。
+        WITH 语句也使用普通游标：CTE 中可以包含 INSERT/UPDATE/DELETE ... RETURNING，
+        只看前缀无法区分。
+        """
+        if cleaned_sql[:6].lower() == "select":
+            return {"stream_results": True, "yield_per": cls.STREAM_BATCH_SIZE}
+        return {}
+
+    @staticmethod
+    def _collect_result(result: Any) -> Tuple[List[Dict], List[str]]:
+        """将执行结果转换为 (结果列表, 列名列表)"""
+        # 检查是否返回结果集
+        if result.returns_rows:
+            # 获取列名
+            columns = list(result.keys())
+
+            # 逐批读取行并直接转换为字典，不再先 fetchall 整个结果集；
+            # dict(zip(...)) 比 result.mappings() 更快，且得到可直接 JSON 序列化的普通字典
+            results = [dict(zip(columns, row)) for row in result]
+
+            return results, columns
+        else:
+            # 对于不返回行的查询（INSERT, UPDATE, DELETE 等）
+            return [{"status": "success", "rows_affected": result.rowcount}], [
+                "result"
+            ]
 
     def execute_query(
         self,
@@ -186,14 +424,7 @@ class DatabaseService:
             SQLAlchemyError: 数据库操作失败
         """
         # 清理 SQL 语句中的 markdown 格式
-        match = re.search(r"```(?:sql)?\s*(.*?)\s*```", query, re.DOTALL)
-        if match:
-            cleaned_sql = match.group(1).strip()
-        else:
-            cleaned_sql = query.strip()
-
-        if not cleaned_sql:
-            raise ValueError("SQL query cannot be empty.")
+        cleaned_sql = self._clean_sql(query)
 
         try:
             # 获取或创建数据库引擎
@@ -203,26 +434,129 @@ class DatabaseService:
 
             # 使用连接上下文执行查询
             with engine.connect() as connection:
-                # 执行 SQL 语句
-                result = connection.execute(text(cleaned_sql))
+                # 执行 SQL 语句；SELECT 使用服务端游标分批拉取（PostgreSQL 命名游标、
+                # MySQL SSCursor 等），不支持服务端游标的方言自动退回普通游标
+                result = connection.execution_options(
+                    **self._stream_options(cleaned_sql)
+                ).execute(text(cleaned_sql))
+
+                return self._collect_result(result)
+
+        except (OperationalError, ProgrammingError) as e:
+            # 数据库操作错误或 SQL 语法错误
+            raise SQLAlchemyError(f"Database operation failed: {str(e)}") from e
+        except SQLAlchemyError as e:
+            # 其他 SQLAlchemy 错误
+            raise SQLAlchemyError(f"SQLAlchemy error: {str(e)}") from e
+        except Exception as e:
+            # 其他未预期的错误
+            raise ValueError(
+                f"Unexpected error during query execution: {str(e)}"
+            ) from e
 
-                # 检查是否返回结果集
-                if result.returns_rows:
-                    # 获取列名
-                    columns = list(result.keys())
+    async def execute_query_async(
+        self,
+        db_type: str,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        dbname: str,
+        query: str,
+    ) -> Tuple[List[Dict], List[str]]:
+        """
+        异步执行查询，参数、返回值和异常与 execute_query 一致
 
-                    # 获取所有行数据
-                    rows = result.fetchall()
+        支持异步驱动的数据库（见 DB_ASYNC_DRIVERS）在事件循环上等待网络往返，
+        多个并发查询的等待时间相互重叠；其余数据库或未安装异步驱动时，
+        在线程池中执行同步的 execute_query，同样不阻塞事件循环。
 
-                    # 将行数据转换为字典列表
-                    results = [dict(zip(columns, row)) for row in rows]
+        异步驱动为可选依赖（pyproject.toml 的 async extra）。异步引擎按实例缓存并绑定
+        当前事件循环，调用方应复用同一个服务实例，并在结束时调用 close_all_connections_async。
+        """
+        cleaned_sql = self._clean_sql(query)
 
-                    return results, columns
-                else:
-                    # 对于不返回行的查询（INSERT, UPDATE, DELETE 等）
-                    return [{"status": "success", "rows_affected": result.rowcount}], [
-                        "result"
-                    ]
+        engine = None
+        if db_type in self.DB_ASYNC_DRIVERS:
+            try:
+                engine = self._get_or_create_async_engine(
+                    db_type, host, port, user, password, dbname
+                )
+            except ImportError:
+                # 异步驱动为可选依赖，缺失时退回同步驱动
+                engine = None
+
+        if engine is None:
+            return await asyncio.to_thread(
+                self.execute_query,
+                db_type, host, port, user, password, dbname, cleaned_sql,
+            )
+
+        try:
+            async with engine.connect() as connection:
+                result = await connection.execute(text(cleaned_sql))
+                return self._collect_result(result)
+
+        except (OperationalError, ProgrammingError) as e:
+            # 数据库操作错误或 SQL 语法错误
+            raise SQLAlchemyError(f"Database operation failed: {str(e)}") from e
+        except SQLAlchemyError as e:
+            # 其他 SQLAlchemy 错误
+            raise SQLAlchemyError(f"SQLAlchemy error: {str(e)}") from e
+        except Exception as e:
+            # 其他未预期的错误
+            raise ValueError(
+                f"Unexpected error during query execution: {str(e)}"
+            ) from e
+
+    def execute_query_df(
+        self,
+        db_type: str,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        dbname: str,
+        query: str,
+    ) -> "pd.DataFrame":
+        """
+        执行返回结果集的查询，直接得到 DataFrame
+
+        供只需要 DataFrame 的调用方使用：由 pandas 分块读取结果集并在 C 层组装，
+        省去 execute_query 中逐行构造字典的中间结果。
+
+        Args:
+            db_type: 数据库类型 (mysql, postgresql, mssql, oracle, dameng)
+            host: 数据库主机地址
+            port: 数据库端口
+            user: 数据库用户名
+            password: 数据库密码
+            dbname: 数据库名称
+            query: SQL 查询语句（须返回结果集）
+
+        Returns:
+            pd.DataFrame: 查询结果
+
+        Raises:
+            ValueError: 参数验证失败或 SQL 语句为空
+            SQLAlchemyError: 数据库操作失败
+        """
+        import pandas as pd
+
+        cleaned_sql = self._clean_sql(query)
+
+        try:
+            engine = self._get_or_create_engine(
+                db_type, host, port, user, password, dbname
+            )
+
+            with engine.connect() as connection:
+                chunks = pd.read_sql_query(
+                    text(cleaned_sql),
+                    connection.execution_options(**self._stream_options(cleaned_sql)),
+                    chunksize=self.DATAFRAME_CHUNK_SIZE,
+                )
+                return pd.concat(chunks, ignore_index=True)
 
         except (OperationalError, ProgrammingError) as e:
             # 数据库操作错误或 SQL 语法错误
@@ -237,10 +571,40 @@ class DatabaseService:
             ) from e
 
     def close_all_connections(self):
-        """关闭所有缓存的数据库连接"""
-        for engine in self._engine_cache.values():
-            engine.dispose()
-        self._engine_cache.clear()
+        """
+        关闭本实例使用过的数据库连接
+
+        只从进程级缓存中释放本实例用过的引擎，其他配置的引擎不受影响；
+        同一配置的其他实例下次调用时会重新创建引擎。
+        """
+        for cache_key in list(self._engine_keys):
+            _engine_cache.release(cache_key)
+        self._engine_keys.clear()
+        self._drop_async_engines()
+
+    def _drop_async_engines(self):
+        """丢弃本实例的异步连接池引用；异步连接需要在其事件循环中关闭（见 close_all_connections_async）"""
+        for async_engine in self._async_engine_cache.values():
+            async_engine.sync_engine.dispose(close=False)
+        self._async_engine_cache.clear()
+
+    async def close_all_connections_async(self):
+        """在当前事件循环中关闭所有缓存的数据库连接（包括异步连接）"""
+        for async_engine in self._async_engine_cache.values():
+            await async_engine.dispose()
+        self._async_engine_cache.clear()
+        self.close_all_connections()
+
+    def __del__(self):
+        """
+        析构时丢弃本实例的异步连接池
+
+        同步引擎由进程级缓存管理（有容量上限，淘汰时释放），其他实例可能仍在使用，析构时不释放。
+        """
+        try:
+            self._drop_async_engines()
+        except Exception:
+            pass  # 静默处理析构函数中的错误
 
     def _format_output(
         self, results: List[Dict], columns: List[str], format_type: str
@@ -259,18 +623,20 @@ class DatabaseService:
         if not results:
             return "Query executed successfully, but returned no results."
 
-        df = pd.DataFrame(results, columns=columns)
-
         if format_type == "json":
-            return df.to_json(orient="records", indent=4, force_ascii=False)
+            # 结果已是字典列表，直接序列化，不经过 DataFrame 构造和类型推断；
+            # orjson 只支持 2 空格缩进，标准库回退路径保持相同格式，日期时间输出为 ISO 8601 字符串
+            if orjson is not None:
+                return orjson.dumps(
+                    results,
+                    default=_json_default,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+                ).decode("utf-8")
+            return json.dumps(
+                results, ensure_ascii=False, indent=2, default=_json_default
+            )
         elif format_type == "md":
-            return df.to_markdown(index=False)
+            # 直接写出管道表格，不构造 DataFrame，也不经过 tabulate 逐单元格推断类型
+            return _to_markdown(results, columns)
         else:
             return "Unsupported output format. Please use 'json' or 'md'."
-
-    def __del__(self):
-        """析构函数，确保连接被正确关闭"""
-        try:
-            self.close_all_connections()
-        except Exception:
-            pass  # 静默处理析构函数中的错误
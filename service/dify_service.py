@@ -4,14 +4,13 @@ Dify服务模块
 
 import os
 import logging
-from typing import Dict
-import sys
-
-sys.path.append(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-)  # 添加上级目录到路径中
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
 from config import DifyUploadConfig
+from service.cache import CacheManager
 
 # 尝试导入dify客户端，如果失败则在需要时处理
 try:
@@ -19,11 +18,28 @@ try:
 except ImportError:
     KnowledgeBaseClient = None
 
+# 串行化数据集查找与创建：并发的上传器共用一次列表拉取，也不会重复创建同名数据集
+_DATASET_LOCK = threading.Lock()
+
+# 数据集缓存键中区分 API 密钥用的进程内随机密钥，键只包含密钥的摘要
+_API_KEY_SECRET = os.urandom(16)
+
 
 class DifyUploader:
     """Dify文件上传器"""
 
     DATASET_PAGE_SIZE = 100
+    # 已知数据集总数时并发拉取其余页的最大线程数
+    DATASET_LIST_MAX_WORKERS = 4
+    UPLOAD_MAX_WORKERS = 8
+    # 记录近期已上传的 (数据集ID, 内容摘要)，重复校验凭据时跳过相同内容的上传
+    UPLOAD_CACHE_NAME = "schema_upload_cache"
+    UPLOAD_CACHE_TTL = 3600
+    # 数据集名称到ID的映射在上传器实例间共享，避免每个新上传器重新拉取数据集列表
+    DATASET_CACHE_NAME = "dify_dataset_cache"
+    DATASET_CACHE_TTL = 300
+    # 标记数据集索引已完整加载的缓存键后缀（数据集名称不含 \0）
+    _INDEX_COMPLETE_KEY = "\0index_complete"
 
     def __init__(self, config: DifyUploadConfig, logger: logging.Logger):
         if KnowledgeBaseClient is None:
@@ -35,45 +51,82 @@ class DifyUploader:
         self.client = KnowledgeBaseClient(
             api_key=config.api_key, base_url=config.base_url
         )
-        self._dataset_cache: Dict[str, str] = {}
+        self._dataset_cache = CacheManager.get_instance(self.DATASET_CACHE_NAME)
+        # 不同 Dify 地址或 API 密钥可见的数据集不同，缓存键按两者区分
+        api_key_digest = hashlib.blake2b(
+            str(config.api_key).encode("utf-8"), key=_API_KEY_SECRET, digest_size=8
+        ).hexdigest()
+        self._dataset_key_prefix = f"dataset:{config.base_url}:{api_key_digest}:"
+        self._upload_cache = CacheManager.get_instance(self.UPLOAD_CACHE_NAME)
+
+    @classmethod
+    def clear_upload_cache(cls) -> None:
+        """清空上传记录，下次上传时强制重新上传所有文档"""
+        CacheManager.get_instance(cls.UPLOAD_CACHE_NAME).clear()
+
+    @classmethod
+    def clear_dataset_cache(cls) -> None:
+        """清空数据集名称到ID的缓存，下次上传时重新查找数据集"""
+        CacheManager.get_instance(cls.DATASET_CACHE_NAME).clear()
+
+    def _get_cached_dataset_id(self, dataset_name: str) -> Optional[str]:
+        """从共享缓存获取数据集ID"""
+        return self._dataset_cache.get(self._dataset_key_prefix + dataset_name)
+
+    def _cache_dataset_id(self, dataset_name: str, dataset_id: str) -> None:
+        """记录数据集名称到ID的映射"""
+        self._dataset_cache.set(
+            self._dataset_key_prefix + dataset_name,
+            dataset_id,
+            ttl=self.DATASET_CACHE_TTL,
+        )
+
+    @staticmethod
+    def _build_upload_cache_key(
+        dataset_id: str, documents: List[Tuple[str, str]]
+    ) -> str:
+        """根据数据集ID和文档内容摘要生成上传记录键，不包含任何凭据"""
+        hasher = hashlib.blake2b(digest_size=16)
+        for name, content in documents:
+            hasher.update(name.encode("utf-8"))
+            hasher.update(b"\0")
+            hasher.update(content.encode("utf-8"))
+            hasher.update(b"\0")
+        return f"upload:{dataset_id}:{hasher.hexdigest()}"
 
     def _get_or_create_dataset(self, dataset_name: str) -> str:
         """获取或创建Dify数据集"""
-        if dataset_name in self._dataset_cache:
+        dataset_id = self._get_cached_dataset_id(dataset_name)
+        if dataset_id:
             self.logger.info(f"从缓存中获取数据集ID: {dataset_name}")
-            return self._dataset_cache[dataset_name]
+            return dataset_id
+
+        with _DATASET_LOCK:
+            # 等待锁期间其他上传器可能已找到或创建该数据集
+            dataset_id = self._get_cached_dataset_id(dataset_name)
+            if dataset_id:
+                self.logger.info(f"从缓存中获取数据集ID: {dataset_name}")
+                return dataset_id
+            return self._find_or_create_dataset(dataset_name)
 
-        # 首先尝试分页查找现有数据集
+    def _find_or_create_dataset(self, dataset_name: str) -> str:
+        """分页查找数据集，不存在时创建；调用方持有 _DATASET_LOCK"""
         def try_find_existing_dataset():
             try:
-                page = 1
-                while True:
-                    response_data = self.client.list_datasets(
-                        page=page, page_size=self.DATASET_PAGE_SIZE
-                    ).json()
-                    datasets = response_data.get("data", [])
-                    for dataset in datasets:
-                        if dataset.get("name") == dataset_name:
-                            dataset_id = dataset.get("id")
-                            self.logger.info(
-                                f"找到现有数据集: {dataset_name} (ID: {dataset_id})"
-                            )
-                            self._dataset_cache[dataset_name] = dataset_id
-                            return dataset_id
-
-                    if not self._has_next_dataset_page(response_data, page, datasets):
-                        return None
-                    page += 1
-
-                return None
+                dataset_id = self._load_dataset_index().get(dataset_name)
             except Exception as e:
                 self.logger.warning(f"查找现有数据集时出错: {e}")
                 return None
+            if dataset_id:
+                self.logger.info(f"找到现有数据集: {dataset_name} (ID: {dataset_id})")
+            return dataset_id
 
-        # 第一次尝试查找现有数据集
-        existing_dataset_id = try_find_existing_dataset()
-        if existing_dataset_id:
-            return existing_dataset_id
+        # 完整索引仍在有效期内时，缓存未命中即说明数据集不存在，直接创建；
+        # 期间他人创建的同名数据集由下方 409 分支重新加载索引处理
+        if not self._dataset_cache.get(self._dataset_key_prefix + self._INDEX_COMPLETE_KEY):
+            existing_dataset_id = try_find_existing_dataset()
+            if existing_dataset_id:
+                return existing_dataset_id
 
         # 如果没找到，尝试创建新数据集
         self.logger.info(f"未找到现有数据集，将创建新数据集: {dataset_name}")
@@ -88,7 +141,7 @@ class DifyUploader:
             if not dataset_id:
                 raise Exception(f"创建数据集成功但未返回ID. 响应: {response_data}")
             self.logger.info(f"成功创建数据集: {dataset_name} (ID: {dataset_id})")
-            self._dataset_cache[dataset_name] = dataset_id
+            self._cache_dataset_id(dataset_name, dataset_id)
             return dataset_id
         except Exception as e:
             # 如果创建失败且错误提示数据集已存在，再次尝试查找
@@ -108,6 +161,73 @@ class DifyUploader:
             self.logger.error(f"创建数据集 {dataset_name} 失败: {e}")
             raise
 
+    def _load_dataset_index(self) -> Dict[str, str]:
+        """
+        拉取全部数据集，构建名称到ID的索引并写入共享缓存
+
+        同名数据集以先出现的为准。索引完整加载后记录标记，有效期内的查找
+        只需查询缓存。
+        """
+        index: Dict[str, str] = {}
+        for datasets in self._iter_dataset_pages():
+            for dataset in datasets:
+                name = dataset.get("name")
+                dataset_id = dataset.get("id")
+                if name and dataset_id:
+                    index.setdefault(name, dataset_id)
+
+        for name, dataset_id in index.items():
+            self._cache_dataset_id(name, dataset_id)
+        self._dataset_cache.set(
+            self._dataset_key_prefix + self._INDEX_COMPLETE_KEY,
+            True,
+            ttl=self.DATASET_CACHE_TTL,
+        )
+        return index
+
+    def _list_dataset_page(self, page: int) -> dict:
+        """拉取一页数据集列表"""
+        return self.client.list_datasets(
+            page=page, page_size=self.DATASET_PAGE_SIZE
+        ).json()
+
+    def _iter_dataset_pages(self):
+        """
+        按页序逐页返回数据集列表
+
+        首页响应给出总数时，其余页并发拉取；总数未知或拉取期间数据集增加时逐页拉取。
+        """
+        page = 1
+        response_data = self._list_dataset_page(page)
+        datasets = response_data.get("data", [])
+        yield datasets
+        if not self._has_next_dataset_page(response_data, page, datasets):
+            return
+
+        total = response_data.get("total")
+        page_size = response_data.get("limit") or len(datasets)
+        if isinstance(total, int) and isinstance(page_size, int) and page_size > 0:
+            pages = list(range(2, -(-total // page_size) + 1))
+            if pages:
+                workers = min(self.DATASET_LIST_MAX_WORKERS, len(pages))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # map 按提交顺序返回，查找结果与逐页拉取一致
+                    for page, response_data in zip(
+                        pages, executor.map(self._list_dataset_page, pages)
+                    ):
+                        datasets = response_data.get("data", [])
+                        yield datasets
+                if not self._has_next_dataset_page(response_data, page, datasets):
+                    return
+
+        while True:
+            page += 1
+            response_data = self._list_dataset_page(page)
+            datasets = response_data.get("data", [])
+            yield datasets
+            if not self._has_next_dataset_page(response_data, page, datasets):
+                return
+
     def _has_next_dataset_page(
         self, response_data: dict, page: int, datasets: list
     ) -> bool:
@@ -168,6 +288,37 @@ class DifyUploader:
             self.logger.error(f"✗ 上传文件 '{file_path}' 失败: {str(e)}")
             raise
 
+    def _build_text_extra_params(self) -> dict:
+        """构建文本上传的索引与分段参数"""
+        return {
+            "indexing_technique": self.config.indexing_technique,
+            "process_rule": {
+                "rules": {
+                    "pre_processing_rules": [
+                        {"id": "remove_extra_spaces", "enabled": False},
+                        {"id": "remove_urls_emails", "enabled": True},
+                    ],
+                    "segmentation": {
+                        "separator": "\n#",
+                        "max_tokens": int(self.config.max_tokens),
+                    },
+                },
+                "mode": self.config.process_mode,
+            },
+        }
+
+    def _create_text_document(self, name: str, content: str, extra_params: dict) -> str:
+        """在当前数据集中创建文本文档，返回文档ID"""
+        response = self.client.create_document_by_text(
+            name=name, text=content, extra_params=extra_params
+        )
+
+        # 检查HTTP响应状态，如果不是2xx，则会引发异常
+        response.raise_for_status()
+
+        response_data = response.json()
+        return response_data.get("document", {}).get("id", "N/A")
+
     def upload_text(self, name: str, content: str):
         """上传文本内容到指定的数据集"""
         dataset_name = name
@@ -176,31 +327,9 @@ class DifyUploader:
             dataset_id = self._get_or_create_dataset(dataset_name)
             self.client.dataset_id = dataset_id
 
-            extra_params = {
-                "indexing_technique": self.config.indexing_technique,
-                "process_rule": {
-                    "rules": {
-                        "pre_processing_rules": [
-                            {"id": "remove_extra_spaces", "enabled": False},
-                            {"id": "remove_urls_emails", "enabled": True},
-                        ],
-                        "segmentation": {
-                            "separator": "\n#",
-                            "max_tokens": int(self.config.max_tokens),
-                        },
-                    },
-                    "mode": self.config.process_mode,
-                },
-            }
-            response = self.client.create_document_by_text(
-                name=name, text=content, extra_params=extra_params
+            doc_id = self._create_text_document(
+                name, content, self._build_text_extra_params()
             )
-
-            # 检查HTTP响应状态，如果不是2xx，则会引发异常
-            response.raise_for_status()
-
-            response_data = response.json()
-            doc_id = response_data.get("document", {}).get("id", "N/A")
             self.logger.info(
                 f"✓ 成功上传: {name} -> 数据集: {dataset_name} (文档ID: {doc_id})"
             )
@@ -209,6 +338,62 @@ class DifyUploader:
             self.logger.error(f"✗ 上传文件 '{name}' 失败: {str(e)}")
             raise
 
+    def upload_texts(
+        self,
+        dataset_name: str,
+        documents: List[Tuple[str, str]],
+        max_workers: int = UPLOAD_MAX_WORKERS,
+    ) -> List[str]:
+        """
+        并发上传多个文本文档到同一个数据集
+
+        数据集ID在并发前解析一次，各线程只读共享的客户端配置；
+        单个文档失败不会中断其他文档的上传。
+        相同内容在有效期内已成功上传到同一数据集时跳过上传。
+
+        :param dataset_name: 数据集名称
+        :param documents: (文档名称, 文档内容) 列表
+        :param max_workers: 最大并发上传数
+        :return: 上传失败的文档名称列表
+        """
+        if not documents:
+            return []
+
+        self.logger.info(
+            f"准备上传 {len(documents)} 个文本文档到数据集 '{dataset_name}'"
+        )
+        dataset_id = self._get_or_create_dataset(dataset_name)
+        self.client.dataset_id = dataset_id
+
+        upload_key = self._build_upload_cache_key(dataset_id, documents)
+        if self._upload_cache.get(upload_key):
+            self.logger.info(
+                f"数据集 '{dataset_name}' 近期已上传相同内容，跳过重复上传"
+            )
+            return []
+
+        extra_params = self._build_text_extra_params()
+        failed: List[str] = []
+        workers = max(1, min(max_workers, len(documents)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._create_text_document, name, content, extra_params): name
+                for name, content in documents
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    doc_id = future.result()
+                    self.logger.info(
+                        f"✓ 成功上传: {name} -> 数据集: {dataset_name} (文档ID: {doc_id})"
+                    )
+                except Exception as e:
+                    self.logger.error(f"✗ 上传文档 '{name}' 失败: {str(e)}")
+                    failed.append(name)
+
+        if not failed:
+            self._upload_cache.set(upload_key, True, ttl=self.UPLOAD_CACHE_TTL)
+        return failed
 
 if __name__ == "__main__":
     # 示例：如何使用DifyUploader
@@ -0,0 +1,125 @@
+"""
+进程级数据库引擎缓存
+
+按连接配置复用 SQLAlchemy 引擎及其连接池，容量有限：
+超出容量时淘汰最久未使用的引擎并释放其连接池，
+不同连接配置或密码变更不会让连接池在进程内无限累积。
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy.engine import Engine
+
+_LOG = logging.getLogger(__name__)
+
+# 缓存键中区分密码用的进程内随机密钥：键只包含密码的 HMAC 摘要，不包含明文，
+# 摘要也无法在进程外离线还原
+_PASSWORD_KEY_SECRET = os.urandom(16)
+
+
+def _password_fingerprint(password: Optional[str]) -> str:
+    """计算密码的进程内指纹，用于区分同一账号不同密码的引擎（SQLite 等无密码时为 None）"""
+    return hmac.new(
+        _PASSWORD_KEY_SECRET, (password or "").encode("utf-8"), hashlib.sha256
+    ).hexdigest()[:16]
+
+
+def engine_cache_key(
+    db_type: str,
+    host: str,
+    port: int,
+    user: str,
+    password: Optional[str],
+    dbname: str,
+) -> str:
+    """生成引擎缓存键，只含密码指纹，不含明文；密码变更后得到新的键"""
+    return f"{db_type}://{user}@{host}:{port}/{dbname}#{_password_fingerprint(password)}"
+
+
+class EngineCache:
+    """
+    有界的 LRU 引擎缓存，线程安全
+
+    淘汰或释放引擎时调用 engine.dispose()：空闲连接立即关闭，
+    正在使用的连接不受影响，归还后随旧连接池一起关闭。
+    """
+
+    def __init__(self, max_size: int = 32):
+        """
+        初始化引擎缓存
+
+        参数:
+            max_size: 最多缓存的引擎数量
+        """
+        if max_size <= 0:
+            raise ValueError("max_size必须大于0")
+
+        self.max_size = max_size
+        self._engines: "OrderedDict[str, Engine]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: str, factory: Callable[[], Engine]) -> Engine:
+        """
+        获取缓存的引擎，不存在时调用 factory 创建
+
+        create_engine 不建立连接，创建过程在锁内完成，同一键只会创建一个引擎。
+        """
+        evicted: List[Engine] = []
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                self._engines.move_to_end(key)
+                return engine
+
+            engine = factory()
+            self._engines[key] = engine
+            while len(self._engines) > self.max_size:
+                evicted.append(self._engines.popitem(last=False)[1])
+
+        # 在锁外释放连接池，关闭连接的网络往返不阻塞其他线程取引擎
+        for old_engine in evicted:
+            self._dispose(old_engine)
+        if evicted:
+            _LOG.info(f"引擎缓存已满，释放了 {len(evicted)} 个最久未使用的连接池")
+        return engine
+
+    def release(self, key: str) -> bool:
+        """移除并释放指定键的引擎，返回是否存在"""
+        with self._lock:
+            engine = self._engines.pop(key, None)
+        if engine is None:
+            return False
+        self._dispose(engine)
+        return True
+
+    def clear(self) -> None:
+        """释放所有缓存的引擎"""
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for engine in engines:
+            self._dispose(engine)
+
+    @staticmethod
+    def _dispose(engine: Engine) -> None:
+        """释放引擎的连接池，失败时只记录日志"""
+        try:
+            engine.dispose()
+        except Exception as e:
+            _LOG.warning(f"释放数据库连接池失败: {e}")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._engines
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._engines))
+
+    def __len__(self) -> int:
+        return len(self._engines)
@@ -1,12 +1,147 @@
-import requests
 import logging
 import asyncio
+import json
+import threading
 import httpx
 import concurrent.futures
 from typing import Optional, List, Tuple
 
 from service.cache import cacheable, normalize_query, create_cache_key_from_dict, CacheManager
 
+# h2 为可选依赖（httpx[http2]）：安装后同步与异步客户端都使用 HTTP/2，
+# 并发请求在同一连接上多路复用
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# orjson 为可选依赖：安装后请求体序列化与响应解析使用 orjson，否则使用标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 检索请求中与调用参数无关的固定部分，模块加载时构建一次
+_RETRIEVAL_MODEL_DEFAULTS = {
+    "reranking_enable": False,
+    "reranking_model": {
+        "reranking_provider_name": "",
+        "reranking_model_name": "",
+    },
+    "score_threshold_enabled": False,
+}
+
+
+def _build_retrieve_payload(query: str, top_k: int, retrieval_model: str) -> bytes:
+    """构建检索 API 的 JSON 请求体"""
+    payload = {
+        "query": query,
+        "retrieval_model": {
+            "search_method": retrieval_model,
+            **_RETRIEVAL_MODEL_DEFAULTS,
+            "top_k": top_k,
+        },
+    }
+    if orjson is not None:
+        return orjson.dumps(payload)
+    # 与 httpx 的 json= 参数序列化方式一致
+    return json.dumps(
+        payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+    ).encode("utf-8")
+
+
+def _parse_json(response: httpx.Response):
+    """解析响应 JSON，安装 orjson 时直接解析响应字节"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+# 同步与异步客户端共用的连接池上限。多知识库检索并发数上限为 16，
+# 每个检索回退时最多再发 3 个片段请求，峰值约 48 个连接
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+# 异步检索各阶段的超时（秒），超时异常可直接看出卡在哪个阶段：
+# 建立连接应很快完成；读取需等待服务端完成向量检索；
+# 请求体很小，写入超时较短；等待连接池空闲连接超时说明并发超过了连接池容量
+_ASYNC_TIMEOUT = httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=10.0)
+
+# 进程级共享的同步 HTTP 客户端：每次工具调用都会新建 KnowledgeService，
+# 共享客户端使各实例复用 keep-alive 的 TCP/TLS 连接；认证头随请求传入
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def _get_http_client() -> httpx.Client:
+    """获取共享的 HTTP 客户端，首次使用时创建"""
+    global _http_client
+    client = _http_client
+    if client is None:
+        with _http_client_lock:
+            client = _http_client
+            if client is None:
+                # trust_env=False：内网 Dify 地址不经过系统代理；
+                # retries 只重试建立连接失败，不重试已发出的请求；
+                # 回退路径并发获取文档片段时，HTTP/2 下这些请求共用一个连接
+                client = _http_client = httpx.Client(
+                    timeout=30.0,
+                    trust_env=False,
+                    transport=httpx.HTTPTransport(
+                        http2=HTTP2_AVAILABLE,
+                        retries=3,
+                        limits=_HTTP_LIMITS,
+                    ),
+                )
+    return client
+
+
+# 调用线程已有运行中的事件循环时，在该执行器的线程中运行检索协程
+_async_runner: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_async_runner_lock = threading.Lock()
+
+
+def _run_async(coro):
+    """
+    在新的事件循环中执行协程并返回结果
+
+    插件运行时由 dify_plugin 以 gevent 打补丁，线程实际是同一系统线程上的协程，
+    常驻后台事件循环会被同线程的其他 asyncio.run 视为“正在运行”，因此每次调用
+    使用 asyncio.run 创建并关闭事件循环。
+    """
+    global _async_runner
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    # asyncio.run 不能嵌套在运行中的事件循环内，转到独立线程执行
+    runner = _async_runner
+    if runner is None:
+        with _async_runner_lock:
+            runner = _async_runner
+            if runner is None:
+                runner = _async_runner = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="knowledge-async"
+                )
+    return runner.submit(asyncio.run, coro).result()
+
+
+def _create_async_client() -> httpx.AsyncClient:
+    """
+    创建异步 HTTP 客户端
+
+    异步客户端绑定事件循环，每次并发检索在各自的事件循环内创建一个，
+    该次检索的所有请求共用其连接（HTTP/2 可用时多路复用同一连接）。
+    """
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=_ASYNC_TIMEOUT,
+        trust_env=False,
+        limits=_HTTP_LIMITS,
+    )
+
 
 class KnowledgeService:
     """
@@ -18,17 +153,33 @@ class KnowledgeService:
     - 支持缓存失效和统计
     """
 
-    def __init__(self, api_uri: str, api_key: str):
+    # 多知识库并发检索的默认并发上限。单个知识库回退时最多同时发出 3 个片段请求，
+    # 16 个并发检索的请求数仍在连接池上限（100）之内，不会出现 PoolTimeout
+    DEFAULT_MAX_CONCURRENCY = 16
+
+    def __init__(
+        self,
+        api_uri: str,
+        api_key: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
         """
         初始化知识库服务
 
         Args:
             api_uri: Dify API的基础URL
             api_key: API密钥
+            max_concurrency: 多知识库检索时同时进行的检索数上限
         """
         self.api_uri = api_uri.rstrip("/")
         self.api_key = api_key
+        self.max_concurrency = max(1, max_concurrency)
         self.logger = logging.getLogger(__name__)
+        # 请求头在初始化时构建一次，各请求复用
+        self._headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
 
     def retrieve_schema_from_multiple_datasets(
         self,
@@ -36,6 +187,7 @@ class KnowledgeService:
         query: str,
         top_k: int = 5,
         retrieval_model: str = "semantic_search",
+        min_content_chars: Optional[int] = None,
     ) -> str:
         """
         从多个Dify知识库异步并发检索相关的schema信息
@@ -45,6 +197,8 @@ class KnowledgeService:
             query: 查询内容
             top_k: 每个知识库返回结果数量
             retrieval_model: 检索模型类型
+            min_content_chars: 已完成的检索内容总长度达到该值时取消其余检索，
+                None 表示等待全部知识库
             
         Returns:
             检索到的schema内容，多个内容之间用\\n\\n分隔
@@ -67,27 +221,15 @@ class KnowledgeService:
         
         try:
             # 使用事件循环运行异步任务
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                results = loop.run_until_complete(
-                    self._retrieve_from_multiple_datasets_async(
-                        id_list, query, top_k, retrieval_model
-                    )
+            results = _run_async(
+                self._retrieve_from_multiple_datasets_async(
+                    id_list, query, top_k, retrieval_model,
+                    min_content_chars=min_content_chars,
                 )
-            finally:
-                loop.close()
+            )
             
             # 合并结果
-            all_content = []
-            for dataset_id, content in results:
-                if content and content.strip():
-                    all_content.append(f"=== 知识库 {dataset_id} ===\\n{content}")
-                    self.logger.info(f"知识库 {dataset_id}: 检索到内容长度 {len(content)}")
-                else:
-                    self.logger.warning(f"知识库 {dataset_id}: 未检索到内容")
-            
-            final_content = "\\n\\n".join(all_content)
+            final_content = self._merge_dataset_contents(results)
             self.logger.info(f"多知识库检索完成，总内容长度: {len(final_content)}")
             return final_content
             
@@ -104,52 +246,91 @@ class KnowledgeService:
         query: str,
         top_k: int,
         retrieval_model: str,
+        client: Optional[httpx.AsyncClient] = None,
+        min_content_chars: Optional[int] = None,
     ) -> List[Tuple[str, str]]:
         """
         异步并发从多个数据集检索内容
+
+        Dify 知识库 API 没有跨数据集的批量检索接口，每个数据集一次请求；
+        安装 h2 时这些请求在同一 HTTP/2 连接上多路复用。
         
         Args:
             dataset_ids: 数据集ID列表
             query: 查询内容
             top_k: 每个知识库返回结果数量
             retrieval_model: 检索模型类型
+            client: 异步 HTTP 客户端，默认在本次检索内新建并在结束时关闭
+            min_content_chars: 已完成的检索内容总长度达到该值时取消其余检索，
+                None 表示等待全部知识库
             
         Returns:
-            检索结果列表，每项为 (dataset_id, content) 元组
+            检索结果列表，每项为 (dataset_id, content) 元组，按 dataset_ids 顺序排列；
+            提前结束时不包含被取消的知识库
         """
-        timeout = httpx.Timeout(30.0)
-        
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            # 创建并发任务
-            tasks = [
-                self._retrieve_from_single_dataset_async(
-                    client, dataset_id, query, top_k, retrieval_model
+        if client is None:
+            async with _create_async_client() as client:
+                return await self._retrieve_from_multiple_datasets_async(
+                    dataset_ids, query, top_k, retrieval_model, client,
+                    min_content_chars,
                 )
-                for dataset_id in dataset_ids
-            ]
-            
+
+        # 各数据集的请求体相同，只序列化一次
+        payload = _build_retrieve_payload(query, top_k, retrieval_model)
+        # 限制同时进行的检索数，知识库数量较多时请求排队等待而不是占满连接池
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def retrieve(dataset_id: str) -> str:
+            async with semaphore:
+                return await self._retrieve_from_single_dataset_async(
+                    client, dataset_id, payload
+                )
+
+        # 创建并发任务
+        tasks = [asyncio.ensure_future(retrieve(dataset_id)) for dataset_id in dataset_ids]
+
+        if min_content_chars is None:
             # 等待所有任务完成
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # 处理结果
-            final_results = []
-            for i, result in enumerate(results):
-                dataset_id = dataset_ids[i]
-                if isinstance(result, Exception):
-                    self.logger.error(f"知识库 {dataset_id} 检索异常: {str(result)}")
-                    final_results.append((dataset_id, ""))
-                else:
-                    final_results.append((dataset_id, result))
-            
-            return final_results
+            await asyncio.gather(*tasks, return_exceptions=True)
+        else:
+            # 按完成顺序累计内容长度，足够时取消尚未完成的检索
+            pending = set(tasks)
+            collected = 0
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        collected += len(task.result() or "")
+                if collected >= min_content_chars and pending:
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    self.logger.info(
+                        f"已检索内容长度 {collected}，取消其余 {len(pending)} 个知识库的检索"
+                    )
+                    break
+        
+        # 处理结果，保持数据集原有顺序
+        final_results = []
+        for dataset_id, task in zip(dataset_ids, tasks):
+            if task.cancelled():
+                continue
+            error = task.exception()
+            if error is not None:
+                self.logger.error(f"知识库 {dataset_id} 检索异常: {str(error)}")
+                final_results.append((dataset_id, ""))
+            else:
+                final_results.append((dataset_id, task.result()))
+        
+        return final_results
 
     async def _retrieve_from_single_dataset_async(
         self,
         client: httpx.AsyncClient,
         dataset_id: str,
-        query: str,
-        top_k: int,
-        retrieval_model: str,
+        payload: bytes,
     ) -> str:
         """
         异步从单个数据集检索内容
@@ -157,38 +338,17 @@ class KnowledgeService:
         Args:
             client: httpx异步客户端
             dataset_id: 数据集ID
-            query: 查询内容
-            top_k: 返回结果数量
-            retrieval_model: 检索模型类型
+            payload: 由 _build_retrieve_payload 构建的请求体
             
         Returns:
             检索到的内容
         """
         url = f"{self.api_uri}/datasets/{dataset_id}/retrieve"
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        
-        data = {
-            "query": query,
-            "retrieval_model": {
-                "search_method": retrieval_model,
-                "reranking_enable": False,
-                "reranking_model": {
-                    "reranking_provider_name": "",
-                    "reranking_model_name": "",
-                },
-                "top_k": top_k,
-                "score_threshold_enabled": False,
-            },
-        }
-        
         try:
-            response = await client.post(url, headers=headers, json=data)
+            response = await client.post(url, headers=self._headers, content=payload)
             if response.status_code == 200:
-                result = response.json()
+                result = _parse_json(response)
                 
                 # 提取检索到的内容
                 schema_contents = []
@@ -200,14 +360,94 @@ class KnowledgeService:
                 return "\\n\\n".join(schema_contents)
             else:
                 self.logger.warning(
-                    f"数据集 {dataset_id} 检索失败，状态码: {response.status_code}"
+                    f"数据集 {dataset_id} 检索失败，状态码: {response.status_code}，尝试备选方法"
                 )
-                return ""
+                return await self._fallback_retrieve_documents_async(client, dataset_id)
                 
         except Exception as e:
             self.logger.error(f"数据集 {dataset_id} 异步检索异常: {str(e)}")
+            return await self._fallback_retrieve_documents_async(client, dataset_id)
+
+    async def _fallback_retrieve_documents_async(
+        self, client: httpx.AsyncClient, dataset_id: str
+    ) -> str:
+        """
+        备选方法的异步版本：获取数据集中前几个文档的片段
+
+        Args:
+            client: httpx异步客户端
+            dataset_id: 数据集ID
+
+        Returns:
+            获取到的文档内容
+        """
+        try:
+            url = f"{self.api_uri}/datasets/{dataset_id}/documents"
+            response = await client.get(url, headers=self._headers)
+
+            if response.status_code != 200:
+                self.logger.warning(f"获取文档列表失败，状态码: {response.status_code}")
+                return ""
+
+            documents = _parse_json(response)
+            doc_ids = [
+                doc.get("id")
+                for doc in documents.get("data", [])[:3]  # 限制获取前3个文档
+                if doc.get("id")
+            ]
+            # 各文档的片段请求并发发出，共用同一个客户端连接
+            segment_lists = await asyncio.gather(
+                *[
+                    self._get_document_segments_async(client, dataset_id, doc_id)
+                    for doc_id in doc_ids
+                ]
+            )
+            schema_contents = [
+                segment for segments in segment_lists for segment in segments
+            ]
+            self.logger.info(
+                f"通过备选方法获取到 {len(schema_contents)} 个文档片段"
+            )
+            return "\\n\\n".join(schema_contents)
+
+        except Exception as e:
+            self.logger.error(f"备选检索方法失败: {str(e)}")
             return ""
 
+    async def _get_document_segments_async(
+        self, client: httpx.AsyncClient, dataset_id: str, document_id: str
+    ) -> List[str]:
+        """
+        获取文档片段内容的异步版本
+
+        Args:
+            client: httpx异步客户端
+            dataset_id: 数据集ID
+            document_id: 文档ID
+
+        Returns:
+            文档片段内容列表
+        """
+        try:
+            url = (
+                f"{self.api_uri}/datasets/{dataset_id}/documents/{document_id}/segments"
+            )
+            response = await client.get(url, headers=self._headers)
+
+            if response.status_code == 200:
+                result = _parse_json(response)
+                return [
+                    segment["content"]
+                    for segment in result.get("data", [])[:5]  # 限制每个文档最多5个片段
+                    if segment.get("content")
+                ]
+
+            return []
+
+        except Exception as e:
+            self.logger.error(f"获取文档 {document_id} 片段失败: {str(e)}")
+            return []
+
     def _fallback_retrieve_multiple_datasets(
         self,
         dataset_ids: List[str],
@@ -229,17 +469,49 @@ class KnowledgeService:
         """
         self.logger.info("使用降级方案进行同步检索")
         
-        all_content = []
+        results = []
         for dataset_id in dataset_ids:
             try:
                 content = self.retrieve_schema_from_dataset(
                     dataset_id, query, top_k, retrieval_model
                 )
-                if content and content.strip():
-                    all_content.append(f"=== 知识库 {dataset_id} ===\\n{content}")
+                results.append((dataset_id, content))
             except Exception as e:
                 self.logger.error(f"数据集 {dataset_id} 同步检索异常: {str(e)}")
         
+        return self._merge_dataset_contents(results)
+
+    def _merge_dataset_contents(self, results: List[Tuple[str, str]]) -> str:
+        """
+        合并多个知识库的检索结果，去除重复片段
+
+        不同知识库常返回相同的 schema 片段，重复内容只保留首次出现的一份，
+        减少发送给 LLM 的提示词长度。
+
+        Args:
+            results: (dataset_id, content) 元组列表
+
+        Returns:
+            按知识库分节的合并内容
+        """
+        seen = set()
+        all_content = []
+        for dataset_id, content in results:
+            if not content or not content.strip():
+                self.logger.warning(f"知识库 {dataset_id}: 未检索到内容")
+                continue
+            segments = []
+            for segment in content.split("\\n\\n"):
+                if segment not in seen:
+                    seen.add(segment)
+                    segments.append(segment)
+            if not segments:
+                self.logger.info(f"知识库 {dataset_id}: 检索内容与其他知识库重复，已跳过")
+                continue
+            unique_content = "\\n\\n".join(segments)
+            all_content.append(f"=== 知识库 {dataset_id} ===\\n{unique_content}")
+            self.logger.info(f"知识库 {dataset_id}: 检索到内容长度 {len(unique_content)}")
+        
         return "\\n\\n".join(all_content)
 
     @cacheable(
@@ -286,31 +558,16 @@ class KnowledgeService:
             # 构建检索API URL
             url = f"{self.api_uri}/datasets/{dataset_id}/retrieve"
 
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-
             # 构建请求体
-            data = {
-                "query": query,
-                "retrieval_model": {
-                    "search_method": retrieval_model,
-                    "reranking_enable": False,
-                    "reranking_model": {
-                        "reranking_provider_name": "",
-                        "reranking_model_name": "",
-                    },
-                    "top_k": top_k,
-                    "score_threshold_enabled": False,
-                },
-            }
+            payload = _build_retrieve_payload(query, top_k, retrieval_model)
 
             self.logger.info(f"正在从数据集 {dataset_id} 检索内容，查询: {query}")
-            response = requests.post(url, headers=headers, json=data, timeout=30)
+            response = _get_http_client().post(
+                url, headers=self._headers, content=payload
+            )
 
             if response.status_code == 200:
-                result = response.json()
+                result = _parse_json(response)
 
                 # 提取检索到的内容
                 schema_contents = []
@@ -347,26 +604,34 @@ class KnowledgeService:
         try:
             # 首先获取数据集中的文档列表
             url = f"{self.api_uri}/datasets/{dataset_id}/documents"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-
             self.logger.info(f"使用备选方法获取数据集 {dataset_id} 的文档列表")
-            response = requests.get(url, headers=headers, timeout=30)
+            response = _get_http_client().get(url, headers=self._headers)
 
             if response.status_code == 200:
-                documents = response.json()
+                documents = _parse_json(response)
                 schema_contents = []
 
                 # 获取前几个文档的片段
                 if "data" in documents:
-                    for doc in documents["data"][:3]:  # 限制获取前3个文档
-                        doc_id = doc.get("id")
-                        if doc_id:
-                            segments = self._get_document_segments(dataset_id, doc_id)
-                            if segments:
-                                schema_contents.extend(segments)
+                    doc_ids = [
+                        doc.get("id")
+                        for doc in documents["data"][:3]  # 限制获取前3个文档
+                        if doc.get("id")
+                    ]
+                    # 各文档的片段请求相互独立，并发发出，总耗时约为最慢的一次请求；
+                    # map 按提交顺序返回，片段顺序与串行获取一致
+                    if doc_ids:
+                        with concurrent.futures.ThreadPoolExecutor(
+                            max_workers=len(doc_ids)
+                        ) as executor:
+                            for segments in executor.map(
+                                lambda doc_id: self._get_document_segments(
+                                    dataset_id, doc_id
+                                ),
+                                doc_ids,
+                            ):
+                                if segments:
+                                    schema_contents.extend(segments)
 
                 content = "\\n\\n".join(schema_contents)
                 self.logger.info(
@@ -396,15 +661,10 @@ class KnowledgeService:
             url = (
                 f"{self.api_uri}/datasets/{dataset_id}/documents/{document_id}/segments"
             )
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-
-            response = requests.get(url, headers=headers, timeout=30)
+            response = _get_http_client().get(url, headers=self._headers)
 
             if response.status_code == 200:
-                result = response.json()
+                result = _parse_json(response)
                 segments = []
 
                 if "data" in result:
@@ -432,15 +692,10 @@ class KnowledgeService:
         """
         try:
             url = f"{self.api_uri}/datasets/{dataset_id}"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-
-            response = requests.get(url, headers=headers, timeout=30)
+            response = _get_http_client().get(url, headers=self._headers)
 
             if response.status_code == 200:
-                return response.json()
+                return _parse_json(response)
             else:
                 self.logger.warning(
                     f"获取数据集信息失败，状态码: {response.status_code}"
@@ -460,15 +715,10 @@ class KnowledgeService:
         """
         try:
             url = f"{self.api_uri}/datasets"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-
-            response = requests.get(url, headers=headers, timeout=30)
+            response = _get_http_client().get(url, headers=self._headers)
 
             if response.status_code == 200:
-                result = response.json()
+                result = _parse_json(response)
                 return result.get("data", [])
             else:
                 self.logger.warning(
@@ -1,10 +1,4 @@
-import os
-from typing import Optional, List
-import sys
-
-sys.path.append(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-)  # 添加上级目录到路径中
+from typing import Optional, List, Tuple
 
 from sqlalchemy.engine import Engine
 from sqlalchemy import create_engine, event
@@ -16,6 +10,7 @@ try:
 except ImportError:
     pass  # 达梦数据库支持可选
 from config import DatabaseConfig, DifyUploadConfig, LoggerConfig
+from service.engine_cache import EngineCache, engine_cache_key
 from service.dify_service import DifyUploader
 from utils import (
     Logger,
@@ -24,6 +19,10 @@ from utils import (
     read_json,
 )
 
+# 进程级引擎缓存：插件进程内反复构建同一数据库的数据字典时复用引擎及其连接池。
+# 键只含密码指纹，不含明文；超出容量时释放最久未使用的连接池
+_engine_cache = EngineCache(max_size=32)
+
 
 class SchemaRAGBuilder:
     """
@@ -32,12 +31,16 @@ class SchemaRAGBuilder:
     也可通过from_config_file静态方法从配置文件初始化。
     """
 
+    # 并行生成数据字典时的工作线程数，不超过引擎连接池默认容量（5 + 溢出 10）
+    SCHEMA_WORKERS = 8
+
     def __init__(
         self,
         db_config: DatabaseConfig,
         logger_config: LoggerConfig,
         dify_config: Optional[DifyUploadConfig] = None,
         include_tables: Optional[List[str]] = None,
+        schema_workers: int = SCHEMA_WORKERS,
     ):
         if not isinstance(db_config, DatabaseConfig):
             raise TypeError("db_config必须为DatabaseConfig类型")
@@ -49,27 +52,49 @@ class SchemaRAGBuilder:
         self.logger_config = logger_config
         self.dify_config = dify_config
         self.include_tables = include_tables
+        self.schema_workers = schema_workers
         self.logger_manager = Logger(self.logger_config)
         self.logger = self.logger_manager.get_logger()
-        self.engine: Optional[Engine] = create_engine(
-            self.db_config.get_connection_string(),
-            **self._get_engine_args()
+        self.engine: Optional[Engine] = self._get_or_create_engine()
+
+        self.uploader: Optional[DifyUploader] = None
+        self.schema_engine: Optional[SchemaEngine] = None
+        self._initialize_components()
+
+    def _get_or_create_engine(self) -> Engine:
+        """
+        获取共享的数据库引擎，不存在时创建
+
+        Returns:
+            SQLAlchemy Engine 实例
+        """
+        config = self.db_config
+        cache_key = engine_cache_key(
+            config.type, config.host, config.port, config.user,
+            config.password, config.database,
         )
+        return _engine_cache.get_or_create(cache_key, self._create_engine)
 
-        # 达梦数据库需要在每次连接建立时切换到正确的 schema
-        if self.db_config.type == "dameng":
-            dbname = normalize_dameng_schema_name(self.db_config.database)
+    def _create_engine(self) -> Engine:
+        """创建数据库引擎，由进程级缓存在未命中时调用"""
+        config = self.db_config
+        engine = create_engine(
+            config.get_connection_string(), **self._get_engine_args()
+        )
+
+        # 达梦数据库需要在每次连接建立时切换到正确的 schema；
+        # 监听器随引擎创建注册一次，复用引擎时不会重复注册
+        if config.type == "dameng":
+            dbname = normalize_dameng_schema_name(config.database)
             quoted_dbname = quote_dameng_identifier(dbname)
 
-            @event.listens_for(self.engine, "connect")
+            @event.listens_for(engine, "connect")
             def set_dameng_schema(dbapi_connection, connection_record):
                 cursor = dbapi_connection.cursor()
                 cursor.execute(f"ALTER SESSION SET CURRENT_SCHEMA = {quoted_dbname}")
                 cursor.close()
 
-        self.uploader: Optional[DifyUploader] = None
-        self.schema_engine: Optional[SchemaEngine] = None
-        self._initialize_components()
+        return engine
 
     def _get_engine_args(self) -> dict:
         """
@@ -130,6 +155,7 @@ class SchemaRAGBuilder:
                 engine=self.engine,
                 db_name=self.db_config.database,
                 include_tables=self.include_tables,
+                max_workers=self.schema_workers,
             )
             self.logger.info("Schema引擎初始化成功")
         except Exception as e:
@@ -200,6 +226,51 @@ class SchemaRAGBuilder:
             self.logger.error(f"上传 {name} 到Dify时失败: {e}")
             raise
 
+    @staticmethod
+    def split_schema_by_table(name: str, content: str) -> List[Tuple[str, str]]:
+        """
+        按顶层 "# " 表头将数据字典拆分为多个文档。
+        数据字典头部（DB_ID/Schema）并入第一个文档，外键段落单独成文档。
+        :param name: 文档名称前缀
+        :param content: 数据字典字符串
+        :return: (文档名称, 文档内容) 列表
+        """
+        sections = content.split("\n# ")
+        documents: List[Tuple[str, str]] = []
+        header = sections[0]
+        for index, section in enumerate(sections[1:], 1):
+            section = "# " + section
+            title = section.split("\n", 1)[0]
+            if title.startswith("# Table: "):
+                doc_name = f"{name}_{title[len('# Table: '):].split(',', 1)[0]}"
+            else:
+                doc_name = f"{name}_{index}"
+            documents.append((doc_name, section))
+
+        if not documents:
+            return [(name, content)]
+        first_name, first_content = documents[0]
+        documents[0] = (first_name, f"{header}\n{first_content}")
+        return documents
+
+    def upload_schema_to_dify(self, name: str, content: str):
+        """
+        按表拆分数据字典并并发上传到Dify知识库。
+        :param name: 数据集名称
+        :param content: 数据字典字符串
+        """
+        if not self.uploader:
+            self.logger.error("Dify上传功能未启用或初始化失败，无法上传")
+            raise RuntimeError("Dify上传功能未启用或初始化失败")
+        documents = self.split_schema_by_table(name, content)
+        self.logger.info(f"准备将数据字典分 {len(documents)} 个文档上传到Dify: {name}")
+        failed = self.uploader.upload_texts(name, documents)
+        if failed:
+            self.logger.error(f"上传 {name} 到Dify时部分文档失败: {failed}")
+            raise RuntimeError(
+                f"{len(failed)}/{len(documents)} 个文档上传失败: {', '.join(failed)}"
+            )
+
     def run_full_process(self):
         """
         执行完整的生成和上传流程。
@@ -208,7 +279,7 @@ class SchemaRAGBuilder:
             schema_content = self.generate_dictionary()
             name = f"{self.db_config.database}_schema"
             if self.dify_config and schema_content:
-                self.upload_text_to_dify(name=name, content=schema_content)
+                self.upload_schema_to_dify(name=name, content=schema_content)
             self.logger.info("所有任务已成功完成！")
         except Exception as e:
             self.logger.error(f"处理流程中发生错误: {e}")
@@ -216,7 +287,7 @@ class SchemaRAGBuilder:
             self.close()
 
     def close(self):
-        """关闭数据库连接"""
+        """释放引擎引用；引擎为进程内共享，连接保留在连接池中供后续构建复用，缓存淘汰时释放"""
         if self.engine:
-            self.engine.dispose()
-            self.logger.info("数据库连接已关闭")
+            self.engine = None
+            self.logger.info("已释放数据库引擎")
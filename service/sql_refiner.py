@@ -11,6 +11,12 @@ from sqlalchemy.exc import SQLAlchemyError
 from prompt import sql_refiner_prompt
 from dify_plugin.entities.model.message import SystemPromptMessage, UserPromptMessage
 
+# SQL 清理使用的正则，模块加载时编译一次
+_MARKDOWN_RE = re.compile(r"```(?:sql)?\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+# LIMIT 关键字（按单词匹配，不把 credit_limit 之类的列名视为 LIMIT）
+_LIMIT_RE = re.compile(r"\blimit\b", re.IGNORECASE)
+
 
 class SQLRefiner:
     """
@@ -40,6 +46,9 @@ class SQLRefiner:
         self.db_service = db_service
         self.llm_session = llm_session
         self.logger = logger or logging.getLogger(__name__)
+        # SQL验证结果缓存：LLM在迭代中重新给出之前验证过的SQL时不再访问数据库。
+        # 键为数据库标识与SQL文本，不包含密码
+        self._validation_cache: Dict[Tuple, Tuple[bool, str]] = {}
         
     def refine_sql(
         self,
@@ -70,6 +79,8 @@ class SQLRefiner:
         
         current_sql = original_sql
         error_history = []
+        # 之前各轮的错误记录（不含当前轮），在每轮调用LLM之后追加，避免每轮切片复制
+        prior_errors = []
         
         for iteration in range(1, max_iterations + 1):
             self.logger.info(f"SQL修复迭代 {iteration}/{max_iterations}")
@@ -105,9 +116,10 @@ class SQLRefiner:
                     error_message=error_message,
                     dialect=dialect,
                     iteration=iteration,
-                    error_history=error_history[:-1],  # 不包括当前错误
+                    error_history=prior_errors,  # 不包括当前错误
                     llm_model=llm_model
                 )
+                prior_errors.append(error_record)
                 
                 if not refined_sql or refined_sql.strip() == "":
                     self.logger.error("LLM返回的修复SQL为空")
@@ -141,6 +153,38 @@ class SQLRefiner:
             sql: 待验证的SQL
             db_config: 数据库配置
             
+        Returns:
+            (是否有效, 错误信息)
+        """
+        cache_key = (
+            db_config['db_type'],
+            db_config['host'],
+            db_config['port'],
+            db_config['user'],
+            db_config['dbname'],
+            sql.strip(),
+        )
+        cached = self._validation_cache.get(cache_key)
+        if cached is not None:
+            self.logger.info("SQL与之前验证过的相同，复用验证结果")
+            return cached
+
+        result = self._execute_validation(sql, db_config)
+        self._validation_cache[cache_key] = result
+        return result
+
+    def _execute_validation(
+        self,
+        sql: str,
+        db_config: Dict[str, Any]
+    ) -> Tuple[bool, str]:
+        """
+        在数据库上执行验证查询
+
+        Args:
+            sql: 待验证的SQL
+            db_config: 数据库配置
+
         Returns:
             (是否有效, 错误信息)
         """
@@ -181,14 +225,12 @@ class SQLRefiner:
         Returns:
             添加LIMIT的SQL
         """
-        sql_lower = sql.lower().strip()
-        
-        # 只对SELECT查询添加LIMIT
-        if not sql_lower.startswith('select'):
+        # 只对SELECT查询添加LIMIT；只检查开头，不复制整条SQL做小写转换
+        if sql.lstrip()[:6].lower() != 'select':
             return sql
         
         # 如果已经有LIMIT，不再添加
-        if 'limit' in sql_lower:
+        if _LIMIT_RE.search(sql):
             return sql
         
         # 移除末尾的分号
@@ -245,19 +287,36 @@ class SQLRefiner:
                 SystemPromptMessage(content=system_prompt),
                 UserPromptMessage(content=user_prompt),
             ],
-            stream=False,
+            stream=True,
         )
         
         # 提取SQL
-        refined_sql = ""
-        if hasattr(response, "message") and response.message:
-            refined_sql = response.message.content.strip() if response.message.content else ""
+        refined_sql = self._read_until_closing_fence(response).strip()
         
         if not refined_sql:
             raise ValueError("LLM返回的修复SQL为空")
         
         return refined_sql
     
+    @staticmethod
+    def _read_until_closing_fence(response) -> str:
+        """
+        读取流式响应，读到代码块结束标记后即停止
+
+        提示词要求模型只输出 ```sql 代码块，结束标记之后的内容（如解释说明）
+        不参与SQL提取，不必等待其生成完毕；没有代码块时读取完整响应。
+        """
+        content = ""
+        for chunk in response:
+            message = chunk.delta.message
+            if not message or not message.content:
+                continue
+            content += message.content
+            open_index = content.find("```")
+            if open_index != -1 and content.find("```", open_index + 3) != -1:
+                break
+        return content
+
     def _clean_sql(self, sql: str) -> str:
         """
         清理SQL查询（移除markdown格式等）
@@ -271,9 +330,8 @@ class SQLRefiner:
         if not sql:
             return ""
         
-        # 移除markdown代码块
-        markdown_pattern = re.compile(r"```(?:sql)?\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
-        match = markdown_pattern.search(sql)
+        # 移除markdown代码块；不含代码块标记时跳过正则匹配
+        match = _MARKDOWN_RE.search(sql) if "```" in sql else None
         
         if match:
             cleaned_sql = match.group(1).strip()
@@ -281,7 +339,7 @@ class SQLRefiner:
             cleaned_sql = sql.strip()
         
         # 移除多余空白
-        cleaned_sql = re.sub(r"\s+", " ", cleaned_sql).strip()
+        cleaned_sql = _WS_RE.sub(" ", cleaned_sql).strip()
         
         return cleaned_sql
     
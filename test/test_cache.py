@@ -0,0 +1,600 @@
+"""
+缓存模块测试
+
+测试缓存装饰器、缓存后端和缓存管理器的行为
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from service.cache import (
+    CacheConfig, CacheManager, CompressedCache, LRUCache, ShardedLRUCache,
+    SQLiteCache, TieredCache, TTLCache, cacheable, normalize_sql
+)
+from service.cache.decorators import CachedProperty
+from service.cache.utils import (
+    create_cache_key_from_dict, generate_hash_key, normalize_query,
+    sanitize_cache_key
+)
+
+
+class TestCacheableDecorator(unittest.TestCase):
+    """缓存装饰器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.cache_name = f"test_cacheable_{self._testMethodName}"
+        CacheManager.get_instance(self.cache_name).clear()
+
+    def test_default_key_caches_by_arguments(self):
+        """默认键生成：相同参数命中缓存，不同参数重新计算"""
+        calls = []
+
+        @cacheable(name=self.cache_name)
+        def compute(x, y=0):
+            calls.append((x, y))
+            return x + y
+
+        self.assertEqual(compute(1, y=2), 3)
+        self.assertEqual(compute(1, y=2), 3)
+        self.assertEqual(compute(2, y=2), 4)
+        self.assertEqual(calls, [(1, 2), (2, 2)])
+
+    def test_default_key_is_compact_digest(self):
+        """默认键为 128 位摘要（安装 xxhash 时为整数，否则为 16 字节）"""
+        @cacheable(name=self.cache_name)
+        def compute(text):
+            return text.upper()
+
+        compute("a" * 10000)
+        keys = list(CacheManager.get_instance(self.cache_name)._backend.cache.keys())
+        self.assertEqual(len(keys), 1)
+        if isinstance(keys[0], int):
+            self.assertLess(keys[0], 1 << 128)
+        else:
+            self.assertIsInstance(keys[0], bytes)
+            self.assertEqual(len(keys[0]), 16)
+
+    def test_string_arguments_keep_boundaries_and_types(self):
+        """字符串参数直接写入摘要时仍区分参数边界和类型"""
+        calls = []
+
+        @cacheable(name=self.cache_name)
+        def concat(*parts):
+            calls.append(parts)
+            return len(parts)
+
+        concat("ab", "c")
+        concat("a", "bc")
+        concat(b"ab", "c")
+        concat("ab", "c")
+        self.assertEqual(len(calls), 3)
+
+    def test_unpicklable_arguments_fall_back(self):
+        """参数不可序列化时回退到字符串键生成"""
+        calls = []
+        lock = threading.Lock()
+
+        @cacheable(name=self.cache_name)
+        def compute(obj):
+            calls.append(obj)
+            return "ok"
+
+        self.assertEqual(compute(lock), "ok")
+        self.assertEqual(compute(lock), "ok")
+        self.assertEqual(len(calls), 1)
+
+    def test_custom_key_generator(self):
+        """自定义键生成器"""
+        @cacheable(name=self.cache_name, key_generator=lambda x: f"key:{x}")
+        def compute(x):
+            return x * 2
+
+        compute(3)
+        self.assertEqual(CacheManager.get_instance(self.cache_name).get("key:3"), 6)
+
+    def test_condition_skips_caching(self):
+        """条件函数返回False时不缓存结果"""
+        calls = []
+
+        @cacheable(name=self.cache_name, condition=lambda result: bool(result))
+        def compute(x):
+            calls.append(x)
+            return ""
+
+        compute(1)
+        compute(1)
+        self.assertEqual(len(calls), 2)
+
+    def test_none_result_is_cached(self):
+        """函数返回None时同样缓存，不会重复执行"""
+        calls = []
+
+        @cacheable(name=self.cache_name)
+        def lookup(x):
+            calls.append(x)
+            return None
+
+        self.assertIsNone(lookup(1))
+        self.assertIsNone(lookup(1))
+        self.assertEqual(len(calls), 1)
+
+    def test_concurrent_misses_compute_once(self):
+        """多个线程同时未命中同一键时只执行一次原始函数"""
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        @cacheable(name=self.cache_name)
+        def build(value):
+            calls.append(value)
+            started.set()
+            release.wait(5)
+            return value * 2
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(build(21)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(build(21)))
+            for _ in range(4)
+        ]
+        for thread in followers:
+            thread.start()
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(calls, [21])
+        self.assertEqual(results, [42] * 5)
+
+    def test_normalizer_maps_equivalent_sql_to_same_key(self):
+        """规范化函数使仅空白不同的SQL命中同一缓存"""
+        calls = []
+
+        @cacheable(name=self.cache_name, normalizer=normalize_sql)
+        def validate(sql):
+            calls.append(sql)
+            return True
+
+        validate("SELECT *  FROM users;")
+        validate("SELECT * FROM\n users")
+        validate("SELECT * FROM orders")
+        self.assertEqual(len(calls), 2)
+
+
+class TestCacheManagerStats(unittest.TestCase):
+    """缓存管理器命中统计测试类"""
+
+    def test_concurrent_hits_are_counted(self):
+        """多线程并发访问时命中计数不丢失"""
+        manager = CacheManager("test_concurrent_stats")
+        manager.set_backend(LRUCache(max_size=10))
+        manager.set("key", "value")
+
+        def worker():
+            for _ in range(1000):
+                manager.get("key")
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(manager.get_stats()["hit_count"], 8000)
+
+    def test_get_or_compute_counts_hits_and_misses(self):
+        """get_or_compute 未命中时计算并写入，命中时不再调用计算函数"""
+        manager = CacheManager("test_get_or_compute")
+        manager.set_backend(LRUCache(max_size=10))
+        calls = []
+
+        def producer():
+            calls.append(1)
+            return "value"
+
+        self.assertEqual(manager.get_or_compute("key", producer), "value")
+        self.assertEqual(manager.get_or_compute("key", producer), "value")
+        self.assertEqual(
+            manager.get_or_compute("skip", producer, condition=lambda r: False), "value"
+        )
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(manager.hit_count, 1)
+        self.assertEqual(manager.miss_count, 2)
+        self.assertIsNone(manager.get("skip"))
+
+    def test_stats_can_be_disabled(self):
+        """关闭统计后不记录命中次数"""
+        manager = CacheManager("test_disabled_stats", stats_enabled=False)
+        manager.set_backend(LRUCache(max_size=10))
+        manager.set("key", "value")
+
+        self.assertEqual(manager.get("key"), "value")
+        self.assertIsNone(manager.get("missing"))
+        self.assertEqual(manager.hit_count, 0)
+        self.assertEqual(manager.miss_count, 0)
+
+class TestCachedProperty(unittest.TestCase):
+    """缓存属性测试类"""
+
+    def test_computes_once_and_recomputes_after_delete(self):
+        """首次访问计算并缓存，删除后重新计算"""
+        class Holder:
+            def __init__(self):
+                self.calls = 0
+
+            @CachedProperty
+            def value(self):
+                self.calls += 1
+                return self.calls
+
+        holder = Holder()
+        self.assertEqual(holder.value, 1)
+        self.assertEqual(holder.value, 1)
+        del holder.value
+        self.assertEqual(holder.value, 2)
+
+        holder.value = 10
+        self.assertEqual(holder.value, 10)
+
+class TestCacheConfig(unittest.TestCase):
+    """缓存配置测试类"""
+
+    def test_reconfigure_only_rebuilds_changed_caches(self):
+        """重新配置时只重建配置变化的缓存，未变化的缓存保留内容"""
+        config = {
+            "test_config_kept": {"type": "lru", "max_size": 10},
+            "test_config_changed": {"type": "lru", "max_size": 10},
+        }
+        CacheConfig.initialize_caches(config)
+        kept = CacheManager.get_instance("test_config_kept")
+        changed = CacheManager.get_instance("test_config_changed")
+        kept.set("key", "value")
+        changed.set("key", "value")
+
+        CacheConfig.reconfigure(
+            config | {"test_config_changed": {"type": "lru", "max_size": 20}}
+        )
+
+        self.assertEqual(kept.get("key"), "value")
+        self.assertIsNone(changed.get("key"))
+        self.assertEqual(changed.get_stats()["max_size"], 20)
+
+class TestCacheKeyUtils(unittest.TestCase):
+    """缓存键工具函数测试类"""
+
+    def test_dict_key_is_stable_fingerprint(self):
+        """字典键与参数顺序无关，摘要为32位十六进制"""
+        key = create_cache_key_from_dict("schema", {"query": "users", "top_k": 5})
+        prefix, digest = key.split(":")
+
+        self.assertEqual(prefix, "schema")
+        self.assertEqual(len(digest), 32)
+        int(digest, 16)
+        self.assertEqual(
+            key, create_cache_key_from_dict("schema", {"top_k": 5, "query": "users"})
+        )
+        self.assertNotEqual(
+            key, create_cache_key_from_dict("schema", {"query": "orders", "top_k": 5})
+        )
+
+    def test_hash_key_distinguishes_types_and_boundaries(self):
+        """参数类型和切分方式不同时生成不同的键，不可序列化的参数也能生成键"""
+        self.assertNotEqual(generate_hash_key(1), generate_hash_key("1"))
+        self.assertNotEqual(generate_hash_key("a\x00b"), generate_hash_key("a", "b"))
+        self.assertEqual(
+            generate_hash_key({"ids": [1, 2]}, top_k=5),
+            generate_hash_key({"ids": [1, 2]}, top_k=5),
+        )
+        self.assertEqual(len(generate_hash_key(threading.Lock())), 32)
+
+    def test_normalize_query_removes_stopwords(self):
+        """规范化查询时折叠空白、转小写并移除停用词"""
+        self.assertEqual(normalize_query("  请 帮我  查询 用户信息  "), "用户信息")
+        self.assertEqual(normalize_query("告诉我 如何 统计\tOrders"), "统计 orders")
+        self.assertEqual(
+            normalize_query("SELECT *  FROM users", remove_stopwords=False),
+            "select * from users",
+        )
+
+    def test_normalize_query_reuses_normalized_input(self):
+        """已规范化的查询原样返回，不生成新字符串"""
+        query = "select * from users"
+        self.assertIs(normalize_query(query, remove_stopwords=False), query)
+        self.assertIs(normalize_query(query), query)
+        self.assertEqual(normalize_query(" \n "), "")
+        self.assertEqual(normalize_query("用户\n\n信息"), "用户 信息")
+
+    def test_sanitize_shortens_long_keys(self):
+        """超长键保留前后缀，中间替换为摘要"""
+        sanitized = sanitize_cache_key("k" * 500, max_length=120)
+
+        self.assertLess(len(sanitized), 120)
+        self.assertTrue(sanitized.startswith("k" * 40))
+
+
+class TestNormalizeSQL(unittest.TestCase):
+    """SQL规范化测试类"""
+
+    def test_collapses_whitespace_outside_literals(self):
+        """折叠字面量之外的空白并去除末尾分号"""
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM users\n WHERE name = 'Tom  X' ;"),
+            "SELECT * FROM users WHERE name = 'Tom  X'",
+        )
+
+    def test_mask_literals_builds_fingerprint(self):
+        """查询指纹忽略字面量取值和IN列表长度"""
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t1 WHERE id IN (1, 2, 3) AND s = 'a'", mask_literals=True),
+            normalize_sql("select * from t1 where id in (4) and s = 'b'", mask_literals=True),
+        )
+
+    def test_empty_input(self):
+        """空输入返回空字符串"""
+        self.assertEqual(normalize_sql(""), "")
+        self.assertEqual(normalize_sql(None), "")
+
+
+class TestLRUCache(unittest.TestCase):
+    """LRU缓存后端测试类"""
+
+    def test_evicts_least_recently_used(self):
+        """缓存满时淘汰最久未使用的项"""
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_expired_item_returns_none(self):
+        """过期项返回None"""
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1, ttl=-1)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get_stats()["current_size"], 0)
+
+
+    def test_concurrent_access_keeps_cache_consistent(self):
+        """多线程并发读写同一缓存时不会破坏内部结构"""
+        cache = LRUCache(max_size=50)
+        errors = []
+
+        def worker(offset):
+            try:
+                for i in range(500):
+                    key = (offset + i) % 80
+                    cache.set(key, i)
+                    cache.get(key)
+                    if i % 7 == 0:
+                        cache.delete(key)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n * 10,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(cache.get_stats()["current_size"], 50)
+
+    def test_stats_are_maintained_incrementally(self):
+        """统计中的过期项数量与内存估算与逐项计算的结果一致"""
+        import sys
+
+        cache = LRUCache(max_size=10)
+        cache.set("expired", "x" * 100, ttl=-1)
+        cache.set("valid", "y" * 200, ttl=3600)
+        cache.set("forever", [1, 2, 3])
+        cache.set("forever", "z")
+        cache.delete("missing")
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["current_size"], 3)
+        self.assertEqual(stats["expired_items"], 1)
+        self.assertEqual(stats["valid_items"], 2)
+        expected = sum(
+            sys.getsizeof(key) + sys.getsizeof(value)
+            for key, (value, _) in cache.cache.items()
+        )
+        self.assertEqual(stats["memory_estimate_bytes"], expected)
+
+        cache.cleanup_expired()
+        cache.clear()
+        self.assertEqual(cache.get_stats()["memory_estimate_bytes"], 0)
+
+    def test_cleanup_expired_skips_stale_heap_entries(self):
+        """清理过期项时只删除当前过期时间已到的项"""
+        cache = LRUCache(max_size=10)
+        cache.set("expired", 1, ttl=-1)
+        cache.set("renewed", 2, ttl=-1)
+        cache.set("renewed", 2, ttl=3600)
+        cache.set("forever", 3)
+
+        self.assertEqual(cache.cleanup_expired(), 1)
+        self.assertEqual(cache.get("renewed"), 2)
+        self.assertEqual(cache.get("forever"), 3)
+        self.assertEqual(cache.get_stats()["current_size"], 2)
+
+    def test_evicts_lowest_value_within_coldest_window(self):
+        """在最冷的10%候选区内淘汰价值最低的项，而不是最久未使用的项"""
+        cache = LRUCache(max_size=20)
+        cache.set("expensive", 1, cost=5.0)
+        cache.set("cheap", 2, cost=0.0)
+        for i in range(18):
+            cache.set(f"k{i}", i, cost=1.0)
+
+        cache.set("new", 3, cost=1.0)
+
+        self.assertEqual(cache.get("expensive"), 1)
+        self.assertIsNone(cache.get("cheap"))
+        self.assertEqual(cache.get("new"), 3)
+
+    def test_full_cache_of_hit_or_stale_items_accepts_new_keys(self):
+        """缓存被命中过或已过期的项占满时，新项仍然被接纳"""
+        cache = LRUCache(max_size=4)
+        for i in range(4):
+            cache.set(f"hot{i}", i, cost=10.0)
+            cache.get(f"hot{i}")
+        for i in range(16):
+            cache.set(f"new{i}", i, cost=0.5)
+            self.assertEqual(cache.get(f"new{i}"), i)
+
+        stale = LRUCache(max_size=4)
+        for i in range(4):
+            stale.set(f"old{i}", i, ttl=3600, cost=10.0)
+            stale.get(f"old{i}")
+            stale.set(f"old{i}", i, ttl=-1, cost=10.0)
+        stale.set("new", 1, cost=0.001)
+
+        self.assertEqual(stale.get("new"), 1)
+        self.assertEqual(stale.get_stats()["current_size"], 1)
+
+
+class TestTTLCache(unittest.TestCase):
+    """TTL缓存后端测试类"""
+
+    def test_evicts_earliest_expiring_item_when_full(self):
+        """缓存满时删除过期时间最早的项"""
+        cache = TTLCache(max_size=2, default_ttl=3600)
+        cache.set("long", 1, ttl=7200)
+        cache.set("short", 2, ttl=60)
+        cache.set("new", 3)
+
+        self.assertEqual(cache.get("long"), 1)
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("new"), 3)
+
+
+class TestShardedLRUCache(unittest.TestCase):
+    """分片LRU缓存测试类"""
+
+    def test_capacity_is_split_across_shards(self):
+        """容量平均分配到各分片，统计汇总所有分片"""
+        cache = ShardedLRUCache(max_size=32)
+        for i in range(200):
+            cache.set(i, i)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["backend_type"], "sharded_lru")
+        self.assertEqual(stats["current_size"], 32)
+        self.assertEqual(cache.get(199), 199)
+        self.assertIsNone(cache.get(0))
+
+    def test_shard_count_scales_with_capacity(self):
+        """小容量缓存减少分片，未满时热点键不会互相淘汰"""
+        self.assertEqual(ShardedLRUCache(max_size=10).get_stats()["shard_count"], 1)
+        self.assertEqual(ShardedLRUCache(max_size=1000).get_stats()["shard_count"], 16)
+
+        cache = ShardedLRUCache(max_size=50)
+        self.assertEqual(cache.get_stats()["shard_count"], 2)
+        for i in range(16):
+            cache.set(f"sql:{i}", i, cost=0.5)
+        self.assertEqual([cache.get(f"sql:{i}") for i in range(16)], list(range(16)))
+
+    def test_concurrent_access(self):
+        """多线程并发读写不丢失数据"""
+        cache = ShardedLRUCache(max_size=1600)
+
+        def worker(offset):
+            for i in range(100):
+                key = f"{offset}:{i}"
+                cache.set(key, i)
+                self.assertEqual(cache.get(key), i)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(cache.get_stats()["current_size"], 800)
+
+
+class TestCompressedCache(unittest.TestCase):
+    """压缩缓存测试类"""
+
+    def test_large_values_are_compressed_transparently(self):
+        """超过阈值的文本和字节压缩存储，读取时还原原值"""
+        inner = LRUCache(max_size=10)
+        cache = CompressedCache(inner, threshold=64)
+        schema = "# Table: users\n" * 100
+        blob = b"\x00" * 1000
+
+        cache.set("schema", schema)
+        cache.set("blob", blob)
+        cache.set("small", "short")
+
+        self.assertEqual(cache.get("schema"), schema)
+        self.assertEqual(cache.get("blob"), blob)
+        self.assertEqual(cache.get("small"), "short")
+        self.assertIsNot(inner.get("schema"), schema)
+        self.assertEqual(inner.get("small"), "short")
+        self.assertLess(
+            cache.get_stats()["memory_estimate_bytes"], len(schema) + len(blob)
+        )
+
+
+class TestTieredCache(unittest.TestCase):
+    """内存+磁盘两级缓存测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache.sqlite3")
+        self.disks = []
+
+    def tearDown(self):
+        """关闭数据库连接并清理临时目录"""
+        for disk in self.disks:
+            disk.close()
+        self.temp_dir.cleanup()
+
+    def _create_cache(self):
+        """创建使用同一磁盘文件的两级缓存"""
+        disk = SQLiteCache(self.path, max_size=10)
+        self.disks.append(disk)
+        return TieredCache(LRUCache(max_size=2), disk)
+
+    def test_restores_from_disk_after_restart(self):
+        """新实例（模拟进程重启）从磁盘读取并回填内存"""
+        self._create_cache().set(b"key", {"sql": "SELECT 1"}, ttl=60)
+
+        cache = self._create_cache()
+        self.assertEqual(cache.get(b"key"), {"sql": "SELECT 1"})
+        self.assertEqual(cache.memory.get(b"key"), {"sql": "SELECT 1"})
+
+    def test_expired_disk_item_returns_none(self):
+        """磁盘中已过期的项返回None"""
+        cache = self._create_cache()
+        cache.disk.set("key", "value", ttl=-1)
+
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.disk.get_stats()["current_size"], 0)
+
+    def test_disk_evicts_when_full(self):
+        """磁盘缓存超出容量时淘汰，容量内的项保留"""
+        disk = SQLiteCache(self.path, max_size=2)
+        self.disks.append(disk)
+        disk.set("a", 1, ttl=10)
+        disk.set("b", 2)
+        disk.set("c", 3, ttl=100)
+
+        self.assertIsNone(disk.get("a"))
+        self.assertEqual(disk.get("b"), 2)
+        self.assertEqual(disk.get("c"), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+上下文格式化组件测试
+"""
+
+import unittest
+
+from prompt.components.context_formatter import ContextFormatter
+
+
+HISTORY = [{"query": "查询所有用户", "sql": "SELECT * FROM users"}]
+
+
+class TestFormatConversationHistory(unittest.TestCase):
+    """对话历史格式化测试类"""
+
+    def test_empty_history(self):
+        """空历史返回空字符串"""
+        self.assertEqual(ContextFormatter.format_conversation_history([]), "")
+
+    def test_format_without_max_length(self):
+        """无长度限制时完整输出，缺失字段按空字符串处理"""
+        history = HISTORY + [{"query": "按区域统计"}]
+
+        result = ContextFormatter.format_conversation_history(history)
+
+        self.assertEqual(
+            result,
+            "问题 1: 查询所有用户\nSQL 1: SELECT * FROM users\n\n"
+            "问题 2: 按区域统计\nSQL 2: ",
+        )
+
+    def test_format_with_max_length_truncates(self):
+        """有长度限制时截断过长内容"""
+        result = ContextFormatter.format_conversation_history(HISTORY, max_length=6)
+
+        self.assertEqual(result, "问题 1: 查询所有用户\nSQL 1: SELECT...")
+
+
+class TestShouldIncludeContext(unittest.TestCase):
+    """上下文引用判断测试类"""
+
+    def test_empty_history_returns_false(self):
+        """没有历史对话时不包含上下文"""
+        self.assertFalse(ContextFormatter.should_include_context([], "这些用户的订单"))
+
+    def test_chinese_reference_keyword(self):
+        """中文引用词命中"""
+        self.assertTrue(ContextFormatter.should_include_context(HISTORY, "这些用户的订单"))
+
+    def test_english_reference_keyword_ignores_case(self):
+        """英文引用词大小写不敏感"""
+        self.assertTrue(ContextFormatter.should_include_context(HISTORY, "Show THIS by region"))
+        self.assertTrue(ContextFormatter.should_include_context(HISTORY, "same for 2023?"))
+
+    def test_english_keyword_inside_other_word_not_matched(self):
+        """英文引用词作为其他单词的一部分时不命中"""
+        self.assertFalse(ContextFormatter.should_include_context(HISTORY, "users with orders"))
+
+    def test_no_reference_keyword(self):
+        """不包含引用词时不包含上下文"""
+        self.assertFalse(ContextFormatter.should_include_context(HISTORY, "统计订单数量"))
+
+
+if __name__ == "__main__":
+    unittest.main()
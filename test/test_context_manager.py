@@ -12,7 +12,9 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from service.context import ContextManager, Conversation, UserContext
+from service.context import (
+    ContextManager, Conversation, MemoryContextStorage, UserContext
+)
 
 
 def test_basic_context_operations():
@@ -179,18 +181,104 @@ def test_conversation_model():
     
     assert conv_restored.query == conv.query, "恢复的问题应该相同"
     assert conv_restored.sql == conv.sql, "恢复的SQL应该相同"
+    assert conv_restored.timestamp == conv.timestamp, "恢复的时间戳应该相同"
+    assert conv_restored.timestamp_dt == conv.timestamp_dt, "恢复的对话时间应该相同"
     
     print("\n" + "=" * 50)
     print("✓ 数据模型测试通过！")
     print("=" * 50)
 
 
+def test_shared_storage_created_once_under_concurrency():
+    """测试并发创建上下文管理器时只创建一个共享存储"""
+    import threading
+
+    ContextManager._shared_storage = None
+    barrier = threading.Barrier(8)
+    storages = []
+
+    def create():
+        barrier.wait()
+        storages.append(ContextManager().storage)
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(storage) for storage in storages}) == 1
+
+
+def test_history_is_bounded():
+    """测试对话历史超过上限时丢弃最早的对话"""
+    from service.context.models import MAX_HISTORY
+
+    user_context = UserContext(user_id="bounded_user")
+    for i in range(MAX_HISTORY + 5):
+        user_context.add_conversation(Conversation(query=f"问题 {i}", sql="SELECT 1"))
+
+    assert len(user_context.conversations) == MAX_HISTORY
+    recent = user_context.get_recent_conversations(3)
+    assert [conv.query for conv in recent] == [
+        f"问题 {i}" for i in range(MAX_HISTORY + 2, MAX_HISTORY + 5)
+    ]
+    assert len(user_context.get_recent_conversations(100)) == MAX_HISTORY
+    assert user_context.get_recent_conversations(0) == []
+
+
+def test_recent_conversations_read_during_concurrent_appends():
+    """测试读取最近对话时其他线程持续追加不会出错"""
+    import threading
+
+    user_context = UserContext(user_id="concurrent_user")
+
+    def writer():
+        for i in range(50000):
+            user_context.add_conversation(Conversation(query=f"问题 {i}", sql="SELECT 1"))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(5000):
+            assert len(user_context.get_recent_conversations(5)) <= 5
+            user_context.to_dict()
+    finally:
+        thread.join()
+
+
+def test_storage_cleanup_by_last_access():
+    """测试按最后访问时间清理上下文"""
+    storage = MemoryContextStorage()
+    stale = UserContext(user_id="stale_user")
+    stale.last_access -= 7200
+    fresh = UserContext(user_id="fresh_user")
+    storage.save_context(stale)
+    storage.save_context(fresh)
+
+    # 最近访问过的上下文读取时不改写访问时间
+    last_access = fresh.last_access
+    assert storage.get_context(fresh.context_key).last_access == last_access
+
+    assert storage.cleanup_expired(3600) == 1
+    assert storage.get_context(stale.context_key) is None
+    assert storage.get_context(fresh.context_key) is fresh
+    assert storage.get_stats() == {"total_contexts": 1, "total_conversations": 0}
+
+    restored = UserContext.from_dict(fresh.to_dict())
+    assert restored.last_access == fresh.last_access
+
+
 if __name__ == "__main__":
     try:
         test_basic_context_operations()
         test_multiple_users()
         test_window_size()
         test_conversation_model()
+        test_shared_storage_created_once_under_concurrency()
+        test_history_is_bounded()
+        test_recent_conversations_read_during_concurrent_appends()
+        test_storage_cleanup_by_last_access()
         
         print("\n" + "=" * 60)
         print("🎉 所有测试通过！上下文管理功能正常工作！")
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+测试数据库查询服务
+"""
+
+import asyncio
+import datetime
+import decimal
+import json
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import service.database_service as database_service  # noqa: E402
+from service.database_service import DatabaseService  # noqa: E402
+
+
+class TestDatabaseService(unittest.TestCase):
+    """数据库查询服务测试"""
+
+    def setUp(self):
+        """创建临时 SQLite 数据库，并让服务使用该引擎"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_path = Path(self.temp_dir.name) / "test.db"
+        connection = sqlite3.connect(db_path)
+        connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        connection.executemany(
+            "INSERT INTO users (name) VALUES (?)", [("Tom",), ("Jerry",)]
+        )
+        connection.commit()
+        connection.close()
+
+        self.engine = create_engine(f"sqlite:///{db_path}")
+        self.service = DatabaseService()
+        patcher = patch.object(
+            self.service, "_get_or_create_engine", return_value=self.engine
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """释放数据库连接并清理临时目录"""
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+
+    def _execute(self, query):
+        return self.service.execute_query(
+            "mysql", "localhost", 3306, "root", "password", "test_db", query
+        )
+
+    def test_extracts_sql_from_markdown_fence(self):
+        """执行前去除 markdown 代码块标记"""
+        results, columns = self._execute(
+            "```sql\nSELECT id, name FROM users ORDER BY id\n```"
+        )
+
+        self.assertEqual(columns, ["id", "name"])
+        self.assertEqual(
+            results, [{"id": 1, "name": "Tom"}, {"id": 2, "name": "Jerry"}]
+        )
+
+    def test_trailing_semicolon_is_stripped(self):
+        """只去除末尾一个分号，语句内部内容保持不变"""
+        self.assertEqual(
+            DatabaseService._clean_sql("SELECT 'a;  b' AS v ;\n"), "SELECT 'a;  b' AS v"
+        )
+        self.assertEqual(DatabaseService._clean_sql("SELECT 1;;"), "SELECT 1;")
+        results, _ = self._execute("SELECT COUNT(*) AS total FROM users;")
+        self.assertEqual(results, [{"total": 2}])
+
+    def test_block_statement_keeps_terminator(self):
+        """过程块末尾的 END; 保持不变"""
+        for sql in (
+            "BEGIN\n  NULL;\nEND;",
+            "declare v NUMBER; begin v := 1; end;",
+            "CREATE OR REPLACE PROCEDURE p AS BEGIN NULL; END p;",
+        ):
+            self.assertEqual(DatabaseService._clean_sql(sql), sql)
+
+    def test_statement_without_rows_reports_affected_count(self):
+        """不返回结果集的语句返回受影响行数"""
+        results, columns = self._execute("UPDATE users SET name = 'Spike'")
+
+        self.assertEqual(columns, ["result"])
+        self.assertEqual(results, [{"status": "success", "rows_affected": 2}])
+
+    def test_only_row_queries_use_server_side_cursor(self):
+        """只有普通 SELECT 启用服务端游标，其他语句使用普通游标"""
+        for sql in ("SELECT 1", "select * from users"):
+            self.assertTrue(DatabaseService._stream_options(sql)["stream_results"], sql)
+        for sql in (
+            "UPDATE users SET name = 'a'",
+            "CREATE TABLE t (id INT)",
+            "SHOW TABLES",
+            "WITH t AS (SELECT 1) SELECT * FROM t",
+            "WITH x AS (DELETE FROM t RETURNING id) SELECT * FROM x",
+        ):
+            self.assertEqual(DatabaseService._stream_options(sql), {}, sql)
+
+    def test_query_df_returns_dataframe(self):
+        """execute_query_df 直接返回 DataFrame，空结果保留列名"""
+        df = self.service.execute_query_df(
+            "mysql", "localhost", 3306, "root", "password", "test_db",
+            "SELECT id, name FROM users ORDER BY id",
+        )
+        self.assertEqual(list(df.columns), ["id", "name"])
+        self.assertEqual(df["name"].tolist(), ["Tom", "Jerry"])
+
+        empty = self.service.execute_query_df(
+            "mysql", "localhost", 3306, "root", "password", "test_db",
+            "SELECT id FROM users WHERE id < 0",
+        )
+        self.assertTrue(empty.empty)
+        self.assertEqual(list(empty.columns), ["id"])
+
+    def test_empty_query_is_rejected(self):
+        """空 SQL 抛出 ValueError"""
+        with self.assertRaises(ValueError):
+            self._execute("```sql\n```")
+
+    def test_async_query_without_async_driver_uses_sync_engine(self):
+        """无异步驱动的数据库类型在线程池中执行同步查询"""
+        results, columns = asyncio.run(
+            self.service.execute_query_async(
+                "mssql", "localhost", 1433, "sa", "password", "test_db",
+                "```sql\nSELECT name FROM users WHERE id = 2\n```",
+            )
+        )
+
+        self.assertEqual(columns, ["name"])
+        self.assertEqual(results, [{"name": "Jerry"}])
+
+    def test_json_output_serializes_driver_types(self):
+        """JSON 输出直接序列化字典列表，处理 Decimal 与日期类型"""
+        output = self.service._format_output(
+            [
+                {
+                    "name": "张三",
+                    "amount": decimal.Decimal("9.50"),
+                    "created_at": datetime.date(2024, 1, 2),
+                }
+            ],
+            ["name", "amount", "created_at"],
+            "json",
+        )
+
+        self.assertEqual(
+            json.loads(output),
+            [{"name": "张三", "amount": 9.5, "created_at": "2024-01-02"}],
+        )
+        self.assertIn("张三", output)
+        self.assertTrue(output.startswith('[\n  {\n    "name": '))
+
+    def test_markdown_output_keeps_formatted_values(self):
+        """markdown 输出保留已格式化的数值文本，转义竖线，空值输出为空"""
+        output = self.service._format_output(
+            [
+                {"name": "a|b", "amount": "12345678.90", "note": None},
+                {"name": "多行\n文本", "amount": "3", "note": "ok"},
+            ],
+            ["name", "amount", "note"],
+            "md",
+        )
+
+        self.assertEqual(
+            output.splitlines(),
+            [
+                "| name | amount | note |",
+                "|---|---|---|",
+                "| a\\|b | 12345678.90 |  |",
+                "| 多行 文本 | 3 | ok |",
+            ],
+        )
+
+class TestEngineCache(unittest.TestCase):
+    """进程级引擎缓存测试"""
+
+    def setUp(self):
+        database_service._engine_cache.clear()
+        self.addCleanup(database_service._engine_cache.clear)
+        patcher = patch.object(
+            database_service, "create_engine", side_effect=lambda *a, **kw: MagicMock()
+        )
+        self.create_engine = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _engine(self, service, password="secret", dbname="sales"):
+        return service._get_or_create_engine(
+            "postgresql", "db.local", 5432, "admin", password, dbname
+        )
+
+    def test_engine_shared_across_instances(self):
+        """不同服务实例复用同一引擎"""
+        engine = self._engine(DatabaseService())
+
+        self.assertIs(self._engine(DatabaseService()), engine)
+        self.assertEqual(self.create_engine.call_count, 1)
+
+    def test_password_change_creates_new_engine_without_plaintext_key(self):
+        """密码不同时创建新引擎，缓存键不包含密码明文"""
+        service = DatabaseService()
+        old_engine = self._engine(service, "old-secret")
+        new_engine = self._engine(service, "new-secret")
+
+        self.assertIsNot(old_engine, new_engine)
+        for key in database_service._engine_cache:
+            self.assertNotIn("secret", key)
+
+    def test_cache_is_bounded_and_disposes_evicted_engines(self):
+        """超出容量时淘汰最久未使用的引擎并释放其连接池"""
+        service = DatabaseService()
+        with patch.object(database_service._engine_cache, "max_size", 2):
+            first = self._engine(service, dbname="a")
+            second = self._engine(service, dbname="b")
+            self.assertIs(self._engine(service, dbname="a"), first)
+            self._engine(service, dbname="c")
+
+        self.assertEqual(len(database_service._engine_cache), 2)
+        second.dispose.assert_called_once()
+        first.dispose.assert_not_called()
+
+    def test_close_releases_only_own_engines(self):
+        """close_all_connections 只释放本实例使用过的引擎"""
+        service, other = DatabaseService(), DatabaseService()
+        own = self._engine(service, dbname="own")
+        shared = self._engine(other, dbname="other")
+
+        service.close_all_connections()
+
+        own.dispose.assert_called_once()
+        shared.dispose.assert_not_called()
+        self.assertIs(self._engine(other, dbname="other"), shared)
+
+    def test_pool_sizing_defaults_and_env_override(self):
+        """连接池参数使用显式默认值，可由环境变量覆盖"""
+        self._engine(DatabaseService())
+        engine_args = self.create_engine.call_args.kwargs
+        self.assertEqual(engine_args["pool_size"], 10)
+        self.assertEqual(engine_args["max_overflow"], 20)
+        self.assertEqual(engine_args["pool_timeout"], 30)
+        self.assertEqual(engine_args["pool_recycle"], 3600)
+
+        database_service._engine_cache.clear()
+        with patch.dict("os.environ", {"SQLALCHEMY_POOL_SIZE": "3"}):
+            self._engine(DatabaseService())
+        self.assertEqual(self.create_engine.call_args.kwargs["pool_size"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
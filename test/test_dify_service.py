@@ -21,16 +21,21 @@ from service.dify_service import DifyUploader  # noqa: E402
 class TestDifyUploader(unittest.TestCase):
     """Dify 上传服务测试"""
 
+    def setUp(self):
+        """测试前准备"""
+        DifyUploader.clear_upload_cache()
+        DifyUploader.clear_dataset_cache()
+
     def _response(self, data):
         """创建响应 Mock"""
         response = Mock()
         response.json.return_value = data
         return response
 
-    def _create_uploader(self):
+    def _create_uploader(self, api_key="dataset-key"):
         """创建测试上传器"""
         config = DifyUploadConfig(
-            api_key="dataset-key",
+            api_key=api_key,
             base_url="http://dify.example/v1",
         )
         return DifyUploader(config, logging.getLogger("test.dify_uploader"))
@@ -67,6 +72,56 @@ class TestDifyUploader(unittest.TestCase):
         self.assertEqual(client.list_datasets.call_count, 2)
         client.create_dataset.assert_not_called()
 
+    @patch("service.dify_service.KnowledgeBaseClient")
+    def test_remaining_pages_fetched_when_total_known(self, client_class):
+        """首页给出总数时拉取其余各页，并按页序查找"""
+        client = client_class.return_value
+
+        def list_datasets(page, page_size):
+            name = "haitian_schema" if page >= 3 else f"other_{page}"
+            return self._response(
+                {
+                    "data": [{"id": f"id-{page}", "name": name}],
+                    "page": page,
+                    "limit": 1,
+                    "total": 4,
+                    "has_more": page < 4,
+                }
+            )
+
+        client.list_datasets.side_effect = list_datasets
+        uploader = self._create_uploader()
+
+        dataset_id = uploader._get_or_create_dataset("haitian_schema")
+
+        self.assertEqual(dataset_id, "id-3")
+        requested = sorted(c.kwargs["page"] for c in client.list_datasets.call_args_list)
+        self.assertEqual(requested, [1, 2, 3, 4])
+
+    @patch("service.dify_service.KnowledgeBaseClient")
+    def test_new_datasets_created_without_relisting(self, client_class):
+        """完整索引有效期内，新名称直接创建，不重复拉取数据集列表"""
+        client = client_class.return_value
+        client.list_datasets.return_value = self._response(
+            {"data": [{"id": "other-id", "name": "other_schema"}], "has_more": False}
+        )
+        client.create_dataset.side_effect = lambda name, **kwargs: self._response(
+            {"id": f"{name}-id"}
+        )
+
+        self.assertEqual(
+            self._create_uploader()._get_or_create_dataset("users_schema"), "users_schema-id"
+        )
+        self.assertEqual(
+            self._create_uploader()._get_or_create_dataset("orders_schema"), "orders_schema-id"
+        )
+        self.assertEqual(
+            self._create_uploader()._get_or_create_dataset("other_schema"), "other-id"
+        )
+
+        client.list_datasets.assert_called_once()
+        self.assertEqual(client.create_dataset.call_count, 2)
+
     @patch("service.dify_service.KnowledgeBaseClient")
     def test_conflict_creation_retries_paginated_lookup(self, client_class):
         """创建知识库撞名后重新分页查找已存在知识库"""
@@ -110,6 +165,80 @@ class TestDifyUploader(unittest.TestCase):
         self.assertEqual(dataset_id, "target-id")
         client.create_dataset.assert_called_once()
 
+    @patch("service.dify_service.KnowledgeBaseClient")
+    def test_upload_texts_continues_after_single_failure(self, client_class):
+        """批量上传时单个文档失败不影响其他文档"""
+        client = client_class.return_value
+        client.list_datasets.return_value = self._response(
+            {"data": [{"id": "target-id", "name": "haitian_schema"}], "has_more": False}
+        )
+
+        def create_document(name, text, extra_params):
+            if name == "bad":
+                raise ValueError("API请求失败: HTTP 500")
+            return self._response({"document": {"id": f"doc-{name}"}})
+
+        client.create_document_by_text.side_effect = create_document
+        uploader = self._create_uploader()
+
+        failed = uploader.upload_texts(
+            "haitian_schema",
+            [("users", "# Table: users"), ("bad", "# Table: bad"), ("orders", "# Table: orders")],
+        )
+
+        self.assertEqual(failed, ["bad"])
+        self.assertEqual(client.create_document_by_text.call_count, 3)
+        self.assertEqual(client.dataset_id, "target-id")
+        client.list_datasets.assert_called_once()
+
+
+    @patch("service.dify_service.KnowledgeBaseClient")
+    def test_upload_texts_skips_unchanged_content(self, client_class):
+        """相同内容已成功上传到同一数据集时跳过重复上传"""
+        client = client_class.return_value
+        client.list_datasets.return_value = self._response(
+            {"data": [{"id": "target-id", "name": "haitian_schema"}], "has_more": False}
+        )
+        client.create_document_by_text.return_value = self._response(
+            {"document": {"id": "doc-id"}}
+        )
+        documents = [("users", "# Table: users")]
+
+        self._create_uploader().upload_texts("haitian_schema", documents)
+        self._create_uploader().upload_texts("haitian_schema", documents)
+        self._create_uploader().upload_texts(
+            "haitian_schema", [("users", "# Table: users, 用户表")]
+        )
+
+        self.assertEqual(client.create_document_by_text.call_count, 2)
+        # 数据集ID在上传器实例间共享，只拉取一次数据集列表
+        self.assertEqual(client.list_datasets.call_count, 1)
+
+    @patch("service.dify_service.KnowledgeBaseClient")
+    def test_dataset_ids_shared_across_uploaders(self, client_class):
+        """查找时见到的所有数据集在实例间共享，不同 API 密钥互不影响"""
+        client = client_class.return_value
+        client.list_datasets.return_value = self._response(
+            {
+                "data": [
+                    {"id": "orders-id", "name": "orders_schema"},
+                    {"id": "target-id", "name": "haitian_schema"},
+                ],
+                "has_more": False,
+            }
+        )
+
+        self.assertEqual(
+            self._create_uploader()._get_or_create_dataset("haitian_schema"), "target-id"
+        )
+        self.assertEqual(
+            self._create_uploader()._get_or_create_dataset("orders_schema"), "orders-id"
+        )
+        self.assertEqual(client.list_datasets.call_count, 1)
+
+        self._create_uploader(api_key="other-key")._get_or_create_dataset("haitian_schema")
+        self.assertEqual(client.list_datasets.call_count, 2)
+        self.assertNotIn("dataset-key", self._create_uploader()._dataset_key_prefix)
 
 if __name__ == "__main__":
     unittest.main()
@@ -10,8 +10,11 @@ import unittest
 from unittest.mock import Mock, AsyncMock, patch
 import asyncio
 import sys
+import threading
 import os
 
+import httpx
+
 # 添加项目根目录到路径
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
@@ -61,31 +64,29 @@ class TestMultipleDatasetSupport(unittest.TestCase):
         )
         self.assertEqual(result, "")
 
-    @patch('httpx.AsyncClient')
-    def test_async_multiple_dataset_retrieval(self, mock_client):
+    def test_async_multiple_dataset_retrieval(self):
         """测试异步多数据集检索"""
         # 模拟异步HTTP响应
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "records": [
-                {"segment": {"content": "Test schema content"}}
-            ]
-        }
+        mock_response = httpx.Response(
+            200, json={"records": [{"segment": {"content": "Test schema content"}}]}
+        )
         
         mock_client_instance = AsyncMock()
         mock_client_instance.post.return_value = mock_response
-        mock_client.return_value.__aenter__.return_value = mock_client_instance
         
         # 测试异步检索
         dataset_ids = ["dataset1", "dataset2"]
         results = asyncio.run(
             self.knowledge_service._retrieve_from_multiple_datasets_async(
-                dataset_ids, "test query", 5, "semantic_search"
+                dataset_ids, "test query", 5, "semantic_search",
+                client=mock_client_instance,
             )
         )
         
-        self.assertEqual(len(results), 2)
+        self.assertEqual(
+            results,
+            [("dataset1", "Test schema content"), ("dataset2", "Test schema content")],
+        )
 
     def test_text2sql_tool_parameter_validation(self):
         """测试Text2SQL工具参数验证"""
@@ -144,6 +145,199 @@ class TestMultipleDatasetSupport(unittest.TestCase):
         self.assertEqual(formatted_content, expected_result)
 
 
+class TestKnowledgeServiceHttpClient(unittest.TestCase):
+    """测试知识库服务的共享 HTTP 客户端"""
+
+    def test_shared_client_ignores_proxy_env(self):
+        """共享客户端只创建一次，且不读取系统代理环境变量"""
+        from service.knowledge_service import _get_http_client
+
+        client = _get_http_client()
+        self.assertIs(_get_http_client(), client)
+        self.assertFalse(client.trust_env)
+
+    def test_requests_reuse_shared_client_with_auth_header(self):
+        """各实例通过共享客户端发送请求，并携带各自的认证头"""
+        mock_client = Mock()
+        mock_client.get.return_value = httpx.Response(200, json={"data": [{"id": "d1"}]})
+
+        with patch("service.knowledge_service._get_http_client", return_value=mock_client):
+            first = KnowledgeService("https://test-api.com/v1/", "key-a")
+            second = KnowledgeService("https://test-api.com/v1", "key-b")
+            self.assertEqual(first.list_datasets(), [{"id": "d1"}])
+            second.list_datasets()
+
+        urls = [c.args[0] for c in mock_client.get.call_args_list]
+        auth = [c.kwargs["headers"]["Authorization"] for c in mock_client.get.call_args_list]
+        self.assertEqual(urls, ["https://test-api.com/v1/datasets"] * 2)
+        self.assertEqual(auth, ["Bearer key-a", "Bearer key-b"])
+
+    def test_retrieve_posts_serialized_payload(self):
+        """检索请求体包含查询参数与固定的检索配置"""
+        import json
+
+        mock_client = Mock()
+        mock_client.post.return_value = httpx.Response(
+            200, json={"records": [{"segment": {"content": "schema"}}]}
+        )
+        service = KnowledgeService("https://test-api.com/v1", "key")
+
+        with patch("service.knowledge_service._get_http_client", return_value=mock_client):
+            content = service.retrieve_schema_from_dataset.__wrapped__(
+                service, "dataset1", "查询用户", 3, "hybrid_search"
+            )
+
+        self.assertEqual(content, "schema")
+        call = mock_client.post.call_args
+        self.assertEqual(call.args[0], "https://test-api.com/v1/datasets/dataset1/retrieve")
+        self.assertEqual(call.kwargs["headers"]["Content-Type"], "application/json")
+        self.assertEqual(
+            json.loads(call.kwargs["content"]),
+            {
+                "query": "查询用户",
+                "retrieval_model": {
+                    "search_method": "hybrid_search",
+                    "reranking_enable": False,
+                    "reranking_model": {
+                        "reranking_provider_name": "",
+                        "reranking_model_name": "",
+                    },
+                    "top_k": 3,
+                    "score_threshold_enabled": False,
+                },
+            },
+        )
+
+    def test_fallback_fetches_document_segments_concurrently(self):
+        """备选检索并发获取各文档片段，结果保持文档顺序"""
+        service = KnowledgeService("https://test-api.com/v1", "key")
+        documents = {"data": [{"id": "d1"}, {"id": "d2"}, {"id": "d3"}, {"id": "d4"}]}
+        mock_client = Mock()
+        mock_client.get.return_value = httpx.Response(200, json=documents)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def fake_segments(dataset_id, document_id):
+            # 三个请求必须同时在途才能通过屏障
+            barrier.wait()
+            return [f"{document_id}-segment"]
+
+        with patch("service.knowledge_service._get_http_client", return_value=mock_client), \
+                patch.object(service, "_get_document_segments", side_effect=fake_segments):
+            content = service._fallback_retrieve_documents("dataset1")
+
+        self.assertEqual(content, "d1-segment\\n\\nd2-segment\\n\\nd3-segment")
+
+    def test_async_retrieval_falls_back_to_document_segments(self):
+        """异步检索失败时通过同一异步客户端并发获取文档片段"""
+        def handler(request):
+            path = request.url.path
+            if path.endswith("/retrieve"):
+                return httpx.Response(500)
+            if path.endswith("/documents"):
+                return httpx.Response(200, json={"data": [{"id": "d1"}, {"id": "d2"}]})
+            document_id = path.split("/")[-2]
+            return httpx.Response(200, json={"data": [{"content": f"{document_id}-segment"}]})
+
+        async def retrieve():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await service._retrieve_from_multiple_datasets_async(
+                    ["dataset1"], "test query", 5, "semantic_search", client=client
+                )
+
+        service = KnowledgeService("https://test-api.com/v1", "key")
+        results = asyncio.run(retrieve())
+
+        self.assertEqual(results, [("dataset1", "d1-segment\\n\\nd2-segment")])
+
+    def test_merge_drops_segments_repeated_across_datasets(self):
+        """多个知识库返回的重复片段只保留首次出现的一份"""
+        service = KnowledgeService("https://test-api.com/v1", "key")
+
+        merged = service._merge_dataset_contents([
+            ("ds1", "users表\\n\\norders表"),
+            ("ds2", "orders表\\n\\nregions表"),
+            ("ds3", "users表"),
+            ("ds4", ""),
+        ])
+
+        self.assertEqual(
+            merged,
+            "=== 知识库 ds1 ===\\nusers表\\n\\norders表"
+            "\\n\\n=== 知识库 ds2 ===\\nregions表",
+        )
+
+    def test_multiple_dataset_retrieval_limits_concurrency(self):
+        """并发检索数不超过 max_concurrency，结果顺序与数据集顺序一致"""
+        service = KnowledgeService("https://test-api.com/v1", "key", max_concurrency=2)
+        active = 0
+        peak = 0
+
+        async def fake_single(client, dataset_id, payload):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return f"{dataset_id}-schema"
+
+        dataset_ids = [f"ds{i}" for i in range(6)]
+        with patch.object(service, "_retrieve_from_single_dataset_async", fake_single):
+            results = asyncio.run(
+                service._retrieve_from_multiple_datasets_async(
+                    dataset_ids, "test query", 5, "semantic_search", client=Mock()
+                )
+            )
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(results, [(d, f"{d}-schema") for d in dataset_ids])
+
+    def test_multiple_dataset_retrieval_stops_when_enough_content(self):
+        """内容长度达到 min_content_chars 后取消未完成的检索"""
+        service = KnowledgeService("https://test-api.com/v1", "key")
+        delays = {"ds1": 0.02, "ds2": 0, "ds3": 10}
+
+        async def fake_single(client, dataset_id, payload):
+            await asyncio.sleep(delays[dataset_id])
+            return f"{dataset_id}-schema"
+
+        with patch.object(service, "_retrieve_from_single_dataset_async", fake_single):
+            results = asyncio.run(
+                asyncio.wait_for(
+                    service._retrieve_from_multiple_datasets_async(
+                        ["ds1", "ds2", "ds3"], "test query", 5, "semantic_search",
+                        client=Mock(), min_content_chars=20,
+                    ),
+                    timeout=5,
+                )
+            )
+
+        self.assertEqual(results, [("ds1", "ds1-schema"), ("ds2", "ds2-schema")])
+
+    def test_multiple_dataset_calls_run_in_fresh_event_loops(self):
+        """同步入口每次调用在新的事件循环中完成并发检索，可重复调用"""
+        import service.knowledge_service as knowledge_service
+
+        def handler(request):
+            dataset_id = request.url.path.split("/")[-2]
+            return httpx.Response(
+                200, json={"records": [{"segment": {"content": f"{dataset_id}-schema"}}]}
+            )
+
+        service = KnowledgeService("https://test-api.com/v1", "key")
+        with patch.object(
+            knowledge_service,
+            "_create_async_client",
+            side_effect=lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        ) as create_client:
+            for _ in range(2):
+                content = service.retrieve_schema_from_multiple_datasets(
+                    "ds1,ds2", "查询用户"
+                )
+                self.assertIn("ds1-schema", content)
+                self.assertIn("ds2-schema", content)
+
+        self.assertEqual(create_client.call_count, 2)
+
 class TestPromptBuildingWithExamples(unittest.TestCase):
     """测试带示例的提示词构建"""
 
@@ -93,6 +93,16 @@ class TestProviderCredentials(unittest.TestCase):
         with self.assertRaises(ToolProviderCredentialValidationError):
             self.provider._validate_credentials(credentials)
 
+    def test_reports_all_missing_credentials_at_once(self):
+        """缺少多个凭据时一次性列出所有缺失项"""
+        credentials = VALID_CREDENTIALS | {"db_host": "", "db_password": ""}
+
+        with self.assertRaises(ToolProviderCredentialValidationError) as context:
+            self.provider._validate_credentials(credentials)
+
+        self.assertIn("Database host", str(context.exception))
+        self.assertIn("Database password", str(context.exception))
+
     def test_build_failure_is_wrapped_as_dify_validation_error(self):
         """Schema RAG 构建失败时包装为 Dify 官方凭据校验异常"""
         with patch.object(
@@ -123,7 +133,7 @@ class TestProviderCredentials(unittest.TestCase):
             def generate_dictionary(self):
                 return "# users"
 
-            def upload_text_to_dify(self, dataset_name, schema_content):
+            def upload_schema_to_dify(self, dataset_name, schema_content):
                 pass
 
             def close(self):
@@ -136,7 +146,7 @@ class TestProviderCredentials(unittest.TestCase):
         }
 
         with patch(
-            "provider.build_schema_rag.SchemaRAGBuilder",
+            "service.schema_builder.SchemaRAGBuilder",
             FakeSchemaRAGBuilder,
         ):
             self.provider._build_schema_rag(credentials)
@@ -154,6 +164,19 @@ class TestProviderCredentials(unittest.TestCase):
 
         self.assertIn("Database port must be a valid integer", str(context.exception))
 
+    def test_count_tables_matches_table_headers_only(self):
+        """表数量只统计表标题，不计入外键标题和注释中的 #"""
+        schema_content = (
+            "【DB_ID】 shop\n【Schema】\n"
+            "# Table: users\n[\n(id:INTEGER, #编号)\n]\n"
+            "# Table: orders\n[\n(user_id:INTEGER)\n]\n"
+            "# 【Foreign keys】\norders.user_id=users.id"
+        )
+
+        self.assertEqual(2, self.provider._count_tables(schema_content))
+        self.assertEqual(1, self.provider._count_tables("# Table: users"))
+        self.assertEqual(0, self.provider._count_tables(""))
+
 
 if __name__ == "__main__":
     unittest.main()
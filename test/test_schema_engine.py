@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+测试 M-Schema 生成引擎
+"""
+
+import importlib
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import DatabaseConfig, LoggerConfig  # noqa: E402
+from core.m_schema.schema_engine import SchemaEngine  # noqa: E402
+
+
+class TestSchemaEngine(unittest.TestCase):
+    """Schema 引擎测试"""
+
+    def setUp(self):
+        """创建包含多个表的临时 SQLite 数据库"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.temp_dir.name, "test.db")
+        connection = sqlite3.connect(db_path)
+        connection.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        connection.execute(
+            "CREATE TABLE orders (id INTEGER PRIMARY KEY, "
+            "user_id INTEGER REFERENCES users(id), amount REAL)"
+        )
+        connection.execute("CREATE TABLE regions (code TEXT, label TEXT)")
+        connection.executemany(
+            "INSERT INTO users (name) VALUES (?)", [("Tom",), ("Jerry",)]
+        )
+        connection.executemany(
+            "INSERT INTO orders (user_id, amount) VALUES (?, ?)", [(1, 9.5), (2, 20.0)]
+        )
+        connection.commit()
+        connection.close()
+        self.engine = create_engine(f"sqlite:///{db_path}")
+
+    def tearDown(self):
+        """释放数据库连接并清理临时目录"""
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+
+    def test_parallel_generation_matches_sequential(self):
+        """并行生成的 M-Schema 与串行生成结果一致"""
+        sequential = SchemaEngine(self.engine, db_name="main").mschema.to_mschema()
+        parallel = SchemaEngine(
+            self.engine, db_name="main", max_workers=4
+        ).mschema.to_mschema()
+
+        self.assertEqual(sequential, parallel)
+        self.assertIn("# Table: main.orders", parallel)
+        self.assertIn("Examples: [Tom, Jerry]", parallel)
+        self.assertIn("# 【Foreign keys】", parallel)
+
+
+class TestSchemaRAGBuilderEngineCache(unittest.TestCase):
+    """SchemaRAGBuilder 引擎复用测试"""
+
+    @classmethod
+    def setUpClass(cls):
+        # test_provider_credentials 会用桩模块替换 service.schema_builder，这里临时移除桩并导入真实模块
+        with patch.dict(sys.modules):
+            sys.modules.pop("service.schema_builder", None)
+            cls.schema_builder = importlib.import_module("service.schema_builder")
+
+    def setUp(self):
+        schema_builder = self.schema_builder
+        schema_builder._engine_cache.clear()
+        self.addCleanup(schema_builder._engine_cache.clear)
+        for target, kwargs in (
+            ("create_engine", {"side_effect": lambda *a, **kw: MagicMock()}),
+            ("SchemaEngine", {}),
+        ):
+            patcher = patch.object(schema_builder, target, **kwargs)
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def _builder(self, password="secret"):
+        db_config = DatabaseConfig(
+            type="mysql", host="db.local", port=3306,
+            user="root", password=password, database="sales",
+        )
+        return self.schema_builder.SchemaRAGBuilder(db_config, LoggerConfig())
+
+    def test_builders_share_engine_until_password_changes(self):
+        """相同连接配置的构建器复用引擎，close 不释放共享连接池"""
+        first = self._builder()
+        engine = first.engine
+        first.close()
+
+        self.assertIs(self._builder().engine, engine)
+        self.assertIsNot(self._builder("changed").engine, engine)
+        self.assertEqual(self.create_engine.call_count, 2)
+        for key in self.schema_builder._engine_cache:
+            self.assertNotIn("secret", key)
+
+    def test_evicted_engine_is_disposed(self):
+        """缓存超出容量时释放最久未使用的引擎"""
+        with patch.object(self.schema_builder._engine_cache, "max_size", 1):
+            old_engine = self._builder("first").engine
+            new_engine = self._builder("second").engine
+
+        old_engine.dispose.assert_called_once()
+        new_engine.dispose.assert_not_called()
+
+    def test_sqlite_without_password(self):
+        """SQLite 配置不带密码时也能创建并复用引擎"""
+        db_config = DatabaseConfig(
+            type="sqlite", host="", port=0, user="", password=None, database="sales.db",
+        )
+        builder = self.schema_builder.SchemaRAGBuilder(db_config, LoggerConfig())
+
+        self.assertIs(
+            self.schema_builder.SchemaRAGBuilder(db_config, LoggerConfig()).engine,
+            builder.engine,
+        )
+        self.assertEqual(self.create_engine.call_args.args[0], "sqlite:///sales.db")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,6 +10,13 @@ from service.sql_refiner import SQLRefiner
 from sqlalchemy.exc import SQLAlchemyError
 
 
+def _stream_response(*contents):
+    """构造LLM流式响应，每个元素为一个增量片段"""
+    return iter([
+        Mock(delta=Mock(message=Mock(content=content))) for content in contents
+    ])
+
+
 class TestSQLRefiner(unittest.TestCase):
     """SQL Refiner 测试类"""
     
@@ -82,6 +89,12 @@ class TestSQLRefiner(unittest.TestCase):
         result = self.refiner._add_limit_for_validation(sql)
         self.assertEqual(result, sql)
     
+    def test_add_limit_for_validation_ignores_limit_in_identifiers(self):
+        """列名中包含limit时仍添加LIMIT，SELECT判断不区分大小写"""
+        sql = "  select credit_limit from accounts;"
+        result = self.refiner._add_limit_for_validation(sql)
+        self.assertEqual(result, "select credit_limit from accounts LIMIT 0")
+    
     def test_add_limit_for_validation_non_select(self):
         """测试非SELECT查询不添加LIMIT"""
         sql = "UPDATE users SET status = 'active'"
@@ -111,6 +124,22 @@ class TestSQLRefiner(unittest.TestCase):
         self.assertFalse(is_valid)
         self.assertIn("invalid_column", error_msg)
     
+    def test_validate_sql_reuses_result_for_same_sql(self):
+        """相同SQL重复验证时不再访问数据库，缓存键不包含密码"""
+        self.mock_db_service.execute_query.side_effect = SQLAlchemyError("bad column")
+        db_config = dict(self.test_db_config, password="s3cret-pass")
+        
+        first = self.refiner._validate_sql("SELECT bad FROM users", db_config)
+        second = self.refiner._validate_sql("SELECT bad FROM users ", db_config)
+        
+        self.assertEqual(first, second)
+        self.assertEqual(self.mock_db_service.execute_query.call_count, 1)
+        for key in self.refiner._validation_cache:
+            self.assertNotIn("s3cret-pass", key)
+        
+        self.refiner._validate_sql("SELECT bad FROM orders", db_config)
+        self.assertEqual(self.mock_db_service.execute_query.call_count, 2)
+    
     def test_refine_sql_success_first_attempt(self):
         """测试第一次尝试就成功修复SQL"""
         # Mock第一次验证失败，第二次成功
@@ -121,9 +150,9 @@ class TestSQLRefiner(unittest.TestCase):
         self.refiner._validate_sql = Mock(side_effect=validation_results)
         
         # Mock LLM返回修复后的SQL
-        mock_response = Mock()
-        mock_response.message.content = "SELECT username FROM users"
-        self.mock_llm_session.model.llm.invoke.return_value = mock_response
+        self.mock_llm_session.model.llm.invoke.return_value = _stream_response(
+            "SELECT username ", "FROM users"
+        )
         
         failed_sql = "SELECT name FROM users"
         mock_llm_model = Mock()
@@ -148,9 +177,9 @@ class TestSQLRefiner(unittest.TestCase):
         self.refiner._validate_sql = Mock(return_value=(False, "Syntax error"))
         
         # Mock LLM每次都返回错误的SQL
-        mock_response = Mock()
-        mock_response.message.content = "SELECT * FROM invalid_table"
-        self.mock_llm_session.model.llm.invoke.return_value = mock_response
+        self.mock_llm_session.model.llm.invoke.side_effect = (
+            lambda **kwargs: _stream_response("SELECT * FROM invalid_table")
+        )
         
         failed_sql = "SELECT * FROM nonexistent"
         mock_llm_model = Mock()
@@ -169,15 +198,37 @@ class TestSQLRefiner(unittest.TestCase):
         self.assertEqual(len(error_history), 2)
         self.assertEqual(refined_sql, "SELECT * FROM invalid_table")
     
+    def test_refine_sql_passes_only_previous_errors_to_llm(self):
+        """每轮调用LLM时只传入之前各轮的错误记录"""
+        self.refiner._validate_sql = Mock(return_value=(False, "Syntax error"))
+        history_lengths = []
+        
+        def fake_generate(**kwargs):
+            history_lengths.append(len(kwargs["error_history"]))
+            return f"SELECT {len(history_lengths)}"
+        
+        with patch.object(self.refiner, "_generate_refined_sql", side_effect=fake_generate):
+            _, success, error_history = self.refiner.refine_sql(
+                original_sql="SELECT 0",
+                schema_info=self.test_schema,
+                question=self.test_question,
+                dialect=self.test_dialect,
+                db_config=self.test_db_config,
+                llm_model=Mock(),
+                max_iterations=4
+            )
+        
+        self.assertFalse(success)
+        self.assertEqual(history_lengths, [0, 1, 2])
+        self.assertEqual(len(error_history), 4)
+    
     def test_refine_sql_llm_returns_empty(self):
         """测试LLM返回空SQL的情况"""
         # Mock第一次验证失败
         self.refiner._validate_sql = Mock(return_value=(False, "Column error"))
         
         # Mock LLM返回空内容
-        mock_response = Mock()
-        mock_response.message.content = ""
-        self.mock_llm_session.model.llm.invoke.return_value = mock_response
+        self.mock_llm_session.model.llm.invoke.return_value = _stream_response("")
         
         failed_sql = "SELECT invalid FROM users"
         mock_llm_model = Mock()
@@ -195,6 +246,17 @@ class TestSQLRefiner(unittest.TestCase):
         self.assertFalse(success)
         self.assertEqual(len(error_history), 1)
     
+    def test_stream_reading_stops_at_closing_fence(self):
+        """读到代码块结束标记后不再读取后续片段"""
+        chunks = _stream_response(
+            "```sql\nSELECT username", " FROM users\n``", "`\n", "解释说明", "更多内容"
+        )
+        
+        content = self.refiner._read_until_closing_fence(chunks)
+        
+        self.assertEqual(content, "```sql\nSELECT username FROM users\n```\n")
+        self.assertEqual([c.delta.message.content for c in chunks], ["解释说明", "更多内容"])
+    
     def test_format_refiner_result_success(self):
         """测试成功格式化Refiner结果"""
         original_sql = "SELECT name FROM users"